@@ -1,17 +1,16 @@
 # -*- coding: utf8 -*-
 from fabric.api import hide, lcd, local, settings
 from inspect import getmembers, isfunction
+from multiprocessing import cpu_count
 from os import chmod, listdir, makedirs
 from os.path import basename, dirname, exists, expanduser, join, split, splitext
 from re import match, IGNORECASE
 from sys import modules
 from terminaltables import SingleTable
-from time import sleep
+from time import sleep, time
 
 from core import *
-
-
-reuse_bin_path = None
+from core.common.wsngenerator import generate_motes
 
 
 def get_commands(include=None, exclude=None):
@@ -111,8 +110,8 @@ def clean(name, ask=True, **kwargs):
     console = kwargs.get('console')
     if console is None or not any([i['name'] == name and i['status'] == 'PENDING' for i in console.tasklist.values()]):
         logger.debug(" > Cleaning folder...")
-        with hide(*HIDDEN_ALL):
-            local("rm -rf {}".format(kwargs['path']))
+        remove_folder(kwargs['path'])
+        update_index(kwargs['path'])
 
 
 @command(autocomplete=lambda: list_experiments(),
@@ -135,10 +134,11 @@ def cooja(name, with_malicious=True, **kwargs):
         with lcd(sim_path):
             local("make cooja TASK={}".format(kwargs['task']))
     motes_after = get_motes_from_simulation(join(sim_path, 'simulation.csc'), as_dictionary=True)
-    # if there was a change, update the other simulation in this experiment
-    if len(set(motes_before.items()) & set(motes_after.items())) > 0:
-        other_sim_path = join(kwargs['path'], 'with{}-malicious'.format(['', 'out'][with_malicious is True]))
-        set_motes_to_simulation(join(other_sim_path, 'simulation.csc'), motes_after)
+    if motes_before == motes_after:
+        return
+    # if there was a change, update the other simulation and the replicates in this experiment
+    other_sim_path = join(kwargs['path'], 'with{}-malicious'.format(['', 'out'][with_malicious is True]))
+    simfiles = [join(r, 'simulation.csc') for r in list_replicates(sim_path)[1:] + list_replicates(other_sim_path)]
     # if this experiment is part of a campaign, update this
     campaign = read_config(kwargs['path']).get('campaign')
     if campaign is not None:
@@ -146,8 +146,10 @@ def cooja(name, with_malicious=True, **kwargs):
             if experiment in ['BASE', name]:
                 continue
             exp_path = join(EXPERIMENT_FOLDER, experiment)
-            set_motes_to_simulation(join(exp_path, 'with-malicious', 'simulation.csc'), motes_after)
-            set_motes_to_simulation(join(exp_path, 'without-malicious', 'simulation.csc'), motes_after)
+            simfiles.extend(join(r, 'simulation.csc') for r in list_replicates(join(exp_path, 'with-malicious')) +
+                            list_replicates(join(exp_path, 'without-malicious')))
+    # the position map is applied to all the simulation files at once
+    set_motes_to_simulations([f for f in simfiles if exists(f)], motes_after)
 
 
 def __make(name, ask=True, **kwargs):
@@ -159,7 +161,6 @@ def __make(name, ask=True, **kwargs):
     :param path: expanded path of the experiment (dynamically filled in through 'command' decorator with 'expand'
     :param kwargs: simulation keyword arguments (see the documentation for more information)
     """
-    global reuse_bin_path
     set_logging(kwargs.get('loglevel'))
     path = kwargs['path']
     logger.debug(" > Validating parameters...")
@@ -169,70 +170,97 @@ def __make(name, ask=True, **kwargs):
         logger.error("External library does not exist !")
         logger.critical("Make aborded.")
         return False
+    # generate the WSN (if not given) and check its connectivity before compiling anything
+    try:
+        params['motes'] = params['motes'] or generate_motes(defaults=DEFAULTS, **params)
+    except ValueError as e:
+        logger.error("WSN could not be generated ({}) !".format(e))
+        logger.critical("Make aborded.")
+        return False
+    unreachable = check_connectivity(params['motes'], params["tx_range"])
+    if len(unreachable) > 0:
+        logger.error("WSN is not connected (motes that cannot reach the root: {}) !"
+                     .format(', '.join(map(str, unreachable))))
+        logger.critical("Make aborded.")
+        return False
     logger.debug(" > Creating simulation...")
-    # create experiment's directories
+    # create experiment's directories (timings of a previous make of this experiment are discarded)
     check_structure(path, create=True, remove=True)
-    templates = get_path(path, 'templates', create=True)
-    get_path(templates, 'motes', create=True)
-    # select the right malicious mote template and duplicate the simulation file
-    copy_files((TEMPLATES_FOLDER, 'experiment'), templates,
-               ('motes/{}.c'.format(params["mtype_root"]), 'motes/root.c'),
-               ('motes/{}.c'.format(params["mtype_sensor"]), 'motes/sensor.c'),
-               ('motes/{}.c'.format(params["mtype_malicious"]), 'motes/malicious.c'),
-               'motes/Makefile', 'Makefile', 'simulation.csc', 'script.js', 'report.md')
-    # create experiment's files from templates then clean the templates folder
-    replacements = render_templates(path, **params)
-    # then clean the temporary folder with templates
-    remove_folder(templates)
-    # move the report.md file (rendered in each simulation folder) to the experiment folder
-    move_files(join(path, 'with-malicious'), path, 'report.md')
-    remove_files(join(path, 'without-malicious'), 'report.md')
-    # now, write the config file without the list of motes
-    del params['motes']
-    write_config(path, params)
+    remove_files(join(path, 'results'), 'timings.json')
+    with timed(path, 'make', 'copy'):
+        templates = get_path(path, 'templates', create=True)
+        get_path(templates, 'motes', create=True)
+        # select the right malicious mote template and duplicate the simulation file
+        copy_files((TEMPLATES_FOLDER, 'experiment'), templates,
+                   ('motes/{}.c'.format(params["mtype_root"]), 'motes/root.c'),
+                   ('motes/{}.c'.format(params["mtype_sensor"]), 'motes/sensor.c'),
+                   ('motes/{}.c'.format(params["mtype_malicious"]), 'motes/malicious.c'),
+                   'motes/Makefile', 'Makefile', 'simulation.csc', 'script.js', 'report.md')
+    with timed(path, 'make', 'render'):
+        # create experiment's files from templates then clean the templates folder
+        replacements = render_templates(path, **params)
+        # then clean the temporary folder with templates
+        remove_folder(templates)
+        # move the report.md file (rendered in each simulation folder) to the experiment folder
+        move_files(join(path, 'with-malicious'), path, 'report.md')
+        remove_files(join(path, 'without-malicious'), 'report.md')
+        # now, write the config file without the list of motes
+        del params['motes']
+        write_config(path, params)
     # now compile
-    with settings(hide(*HIDDEN_ALL), warn_only=True):
+    with settings(hide(*HIDDEN_ALL), warn_only=True), timed(path, 'make', 'compile'):
         with_malicious = join(path, 'with-malicious', 'motes')
         without_malicious = join(path, 'without-malicious', 'motes')
         contiki = join(with_malicious, split(CONTIKI_FOLDER)[-1])
         contiki_rpl = join(contiki, 'core', 'net', 'rpl')
-        # copy a reduced version of Contiki where the debug flags can be set for RPL files set in DEBUG_FILES
-        copy_folder(CONTIKI_FOLDER, with_malicious,
-                    includes=get_contiki_includes(params["target"], params["malicious_target"]))
-        apply_debug_flags(contiki_rpl, debug=['NONE', 'PRINT'][params["debug"]])
-        with lcd(with_malicious):
-            # first, compile root and sensor mote types
-            croot, csensor = 'root.{}'.format(params["target"]), 'sensor.{}'.format(params["target"])
-            if reuse_bin_path is None or reuse_bin_path == with_malicious:
-                logger.debug(" > Making '{}'...".format(croot))
-                stderr(local)("make root CONTIKI={}".format(contiki), capture=True)
-                logger.debug(" > Making '{}'...".format(csensor))
-                stderr(local)("make sensor CONTIKI={}".format(contiki), capture=True)
-                # here, files are moved ; otherwise, 'make clean' would also remove *.z1
-                move_files(with_malicious, without_malicious, croot, csensor)
-                # after compiling, clean artifacts
-                local('make clean')
-                remove_files(with_malicious, 'root.c', 'sensor.c')
-            else:
-                copy_files(reuse_bin_path, without_malicious, croot, csensor)
-            # second, handle the malicious mote compilation
-            malicious = 'malicious.{}'.format(params["malicious_target"])
-            if ext_lib is not None:
-                remove_folder(contiki_rpl)
-                copy_folder(ext_lib, contiki_rpl)
-            apply_replacements(contiki_rpl, replacements)
-            logger.debug(" > Making '{}'...".format(malicious))
-            stderr(local)("make malicious CONTIKI={} TARGET={}"
-                          .format(contiki, params["malicious_target"]), capture=True)
-            # temporary move compiled malicious mote, clean the compilation artifacts, move the malicious mote back
-            #  from the temporary location and copy compiled root and sensor motes
-            move_files(with_malicious, without_malicious, malicious)
-            local('make clean')
-            move_files(without_malicious, with_malicious, malicious)
-            copy_files(without_malicious, with_malicious, croot, csensor)
-            # finally, remove compilation sources
-            remove_files(with_malicious, 'malicious.c')
+        debug = ['NONE', 'PRINT'][params["debug"]]
+        croot, csensor = 'root.{}'.format(params["target"]), 'sensor.{}'.format(params["target"])
+        malicious = 'malicious.{}'.format(params["malicious_target"])
+        # compute the keys of the binaries in the build cache and retrieve the already compiled ones
+        keys = {
+            croot: get_binary_key(with_malicious, 'root', params["target"], debug),
+            csensor: get_binary_key(with_malicious, 'sensor', params["target"], debug),
+            malicious: get_binary_key(with_malicious, 'malicious', params["malicious_target"], debug,
+                                      replacements, ext_lib),
+        }
+        missing = [b for b in [croot, csensor, malicious] if not get_cached_binary(keys[b], join(with_malicious, b))]
+        if len(missing) > 0:
+            # deploy a reduced version of Contiki where the debug flags can be set for RPL files set in DEBUG_FILES
+            deploy_contiki(with_malicious, get_contiki_includes(params["target"], params["malicious_target"]))
+            apply_debug_flags(contiki_rpl, debug=debug)
+            with lcd(with_malicious):
+                # first, compile root and sensor mote types
+                for binary in [b for b in [croot, csensor] if b in missing]:
+                    logger.debug(" > Making '{}'...".format(binary))
+                    stderr(local)("make {} CONTIKI={}".format(splitext(binary)[0], contiki), capture=True)
+                    # here, files are moved to the cache ; otherwise, 'make clean' would also remove *.z1
+                    if not set_cached_binary(keys[binary], join(with_malicious, binary)):
+                        move_files(with_malicious, without_malicious, binary)
+                    # after compiling, clean artifacts
+                    local('make clean')
+                # second, handle the malicious mote compilation
+                if malicious in missing:
+                    if ext_lib is not None:
+                        remove_folder(contiki_rpl)
+                        copy_folder(ext_lib, contiki_rpl)
+                    apply_replacements(contiki_rpl, replacements)
+                    logger.debug(" > Making '{}'...".format(malicious))
+                    stderr(local)("make malicious CONTIKI={} TARGET={}"
+                                  .format(contiki, params["malicious_target"]), capture=True)
+                    if not set_cached_binary(keys[malicious], join(with_malicious, malicious)):
+                        move_files(with_malicious, without_malicious, malicious)
+                    local('make clean')
             remove_folder(contiki)
+        # then, link the compiled binaries from the cache (or move them back from their temporary location if they
+        #  could not be cached) to the simulation folders
+        for binary in [croot, csensor]:
+            if not get_cached_binary(keys[binary], join(with_malicious, binary), join(without_malicious, binary)):
+                copy_files(without_malicious, with_malicious, binary)
+        if not get_cached_binary(keys[malicious], join(with_malicious, malicious)):
+            move_files(without_malicious, with_malicious, malicious)
+        # finally, remove compilation sources
+        remove_files(with_malicious, 'root.c', 'sensor.c', 'malicious.c')
+    update_index(path)
 _make = CommandMonitor(__make)
 make = command(
     autocomplete=lambda: list_experiments(),
@@ -282,11 +310,15 @@ def __remake(name, build=False, **kwargs):
         without_malicious = join(path, 'without-malicious', 'motes')
         contiki = join(with_malicious, split(CONTIKI_FOLDER)[-1])
         contiki_rpl = join(contiki, 'core', 'net', 'rpl')
+        debug = ['NONE', 'PRINT'][params["debug"]]
         with lcd(with_malicious):
             malicious = 'malicious.{}'.format(params["malicious_target"])
-            croot, csensor = 'root.{}'.format(params["target"]), 'sensor.{}'.format(params["target"])
+            key = get_binary_key(with_malicious, 'malicious', params["malicious_target"], debug, replacements, ext_lib)
+            # the former binary may be hard-linked from the build cache, it must thus not be overwritten in place
+            remove_files(with_malicious, malicious)
             # handle the malicious mote recompilation
-            copy_folder(CONTIKI_FOLDER, with_malicious, includes=get_contiki_includes(params["malicious_target"]))
+            deploy_contiki(with_malicious, get_contiki_includes(params["malicious_target"]))
+            apply_debug_flags(contiki_rpl, debug=debug)
             if ext_lib is not None:
                 remove_folder(contiki_rpl)
                 copy_folder(ext_lib, contiki_rpl)
@@ -302,12 +334,15 @@ def __remake(name, build=False, **kwargs):
                 logger.debug(" > Making '{}'...".format(malicious))
                 stderr(local)("make malicious CONTIKI={} TARGET={}".format(contiki, params["malicious_target"]),
                               capture=True)
-            move_files(with_malicious, without_malicious, malicious)
+            # refresh the build cache with the new binary (or temporarily move it if it cannot be cached)
+            if not set_cached_binary(key, join(with_malicious, malicious)):
+                move_files(with_malicious, without_malicious, malicious)
             local('make clean')
             remove_files(with_malicious, 'malicious.c')
-            move_files(without_malicious, with_malicious, malicious)
-            copy_files(without_malicious, with_malicious, croot, csensor)
+            if not get_cached_binary(key, join(with_malicious, malicious)):
+                move_files(without_malicious, with_malicious, malicious)
             remove_folder(contiki)
+    update_index(path)
 _remake = CommandMonitor(__remake)
 remake = command(
     autocomplete=lambda: list_experiments(),
@@ -320,70 +355,279 @@ remake = command(
 )(__remake)
 
 
-def __run(name, **kwargs):
+def __simulate(path, sim, task='run', replicate=1, force=False, batch=False, **kwargs):
     """
-    Run an experiment.
+    Run one of the simulations of an experiment in Cooja then gather its screenshots (or draw the WSN configuration
+     if screenshots are disabled).
 
-    :param name: experiment name
-    :param path: expanded path of the experiment (dynamically filled in through 'command' decorator with 'expand'
+    :param path: path of the experiment
+    :param sim: simulation to be run ('with' or 'without' the malicious mote)
+    :param task: name of the task, used for the PID file of Cooja
+    :param replicate: number of the replicate to be run (if the simulation is repeated)
+    :param force: run the simulation even if it is up to date
+    :param batch: the simulation was already run in a batch of simulations (see __simulate_batch), only its outcome
+                   is then checked and its screenshots gathered
     """
     set_logging(kwargs.get('loglevel'))
-    path = kwargs['path']
-    check_structure(path, remove=True)
     with settings(hide(*HIDDEN_ALL), warn_only=True):
-        for sim in ["without", "with"]:
-            sim_path = join(path, "{}-malicious".format(sim))
-            data, results = join(sim_path, 'data'), join(sim_path, 'results')
+        sim_path = list_replicates(join(path, "{}-malicious".format(sim)))[replicate - 1]
+        data, results = join(sim_path, 'data'), join(sim_path, 'results')
+        key = get_stamp_key([join(sim_path, fn) for fn in ['Makefile', 'simulation.csc', 'script.js', 'motes']])
+        if not force and get_stamp(sim_path, 'simulate') == key:
+            logger.debug(" > Simulation {} the malicious mote is up to date".format(sim))
+            return "Up to date"
+        if batch:
+            status = get_batch_status(sim_path)
+            remove_files(sim_path, '.batch-status')
+            if status is None:
+                raise Exception("Simulation was not run in its batch")
+            with open(join(results, 'COOJA.log')) as f:
+                if not check_cooja_output(f) or status[0] != 'OK':
+                    logger.warn("Cooja failed to execute ; 'run' interrupted (no parsing done)")
+                    raise Exception("Cooja failed to execute")
+        else:
+            remove_stamps(sim_path, 'simulate', 'parse')
+            remove_files(data, *(listdir(data) if exists(data) else []))
             # the Makefile is at experiment's root ('path')
-            logger.debug(" > Running simulation {} the malicious mote...".format(sim))
-            with lcd(sim_path):
-                output = local("make run TASK={}".format(kwargs['task']), capture=True)
-            remove_files(sim_path, '.{}'.format(kwargs['task']))
-            error, interrupt, error_buffer = False, False, []
-            for line in output.split('\n'):
-                if line.strip().startswith("FATAL") or line.strip().startswith("ERROR"):
-                    error, interrupt = True, True
-                elif line.strip().startswith("INFO"):
-                    error = False
-                    if len(error_buffer) > 0:
-                        logger.error('Cooja error:\n' + '\n'.join(error_buffer))
-                        error_buffer = []
-                if error:
-                    error_buffer.append(line)
-            if interrupt:
+            logger.debug(" > Running simulation {} the malicious mote{}..."
+                         .format(sim, ['', ' (replicate {})'.format(replicate)][replicate > 1]))
+            # Cooja's output is streamed to results/COOJA.log and Cooja is killed as soon as it fails or exceeds
+            #  its wall-clock budget (see WATCHDOG)
+            config, start = read_config(path), time()
+            n, duration = config.get('n', DEFAULTS["number-motes"]) + 2, config.get('duration', DEFAULTS["duration"])
+            with timed(path, 'simulate', 'cooja', sim, replicate):
+                succeeded = run_cooja(sim_path, task, get_simulation_budget(duration, n))
+            if not succeeded:
                 logger.warn("Cooja failed to execute ; 'run' interrupted (no parsing done)")
                 raise Exception("Cooja failed to execute")
-            # once the execution is over, gather the screenshots into a single GIF and keep the first and
-            #  the last screenshots ; move these to the results folder
-            logger.debug(" > Gathering screenshots in an animated GIF...")
-            with lcd(data):
-                local('convert -delay 10 -loop 0 network*.png wsn-{}-malicious.gif'.format(sim), capture=True)
-            network_images = {int(fn.split('.')[0].split('_')[-1]): fn for fn in listdir(data)
-                              if fn.startswith('network_')}
-            move_files(data, results, 'wsn-{}-malicious.gif'.format(sim))
-            net_start_old = network_images[min(network_images.keys())]
-            net_start, ext = splitext(net_start_old)
-            net_start_new = 'wsn-{}-malicious_start{}'.format(sim, ext)
-            net_end_old = network_images[max(network_images.keys())]
-            net_end, ext = splitext(net_end_old)
-            net_end_new = 'wsn-{}-malicious_end{}'.format(sim, ext)
-            move_files(data, results, (net_start_old, net_start_new), (net_end_old, net_end_new))
-            remove_files(data, *network_images.values())
-            # then start the parsing functions to derive more results
-            logger.debug(" > Parsing simulation results...")
-            parsing_chain(sim_path)
-            move_files(sim_path, results, 'COOJA.log')
-        # finally, generate the PDF report
+            update_cooja_speed(time() - start, (get_simulated_duration(sim_path) or (duration, ))[0], n)
+        # when screenshots are disabled, draw the WSN configuration before and after the simulation instead
+        if not read_config(path).get('screenshots', True):
+            logger.debug(" > Drawing the WSN configuration...")
+            with timed(path, 'simulate', 'draw', sim, replicate):
+                draw_network(sim_path, 'wsn-{}-malicious_start.png'.format(sim), with_edges=False)
+                draw_network(sim_path, 'wsn-{}-malicious_end.png'.format(sim))
+            set_stamp(sim_path, 'simulate', key)
+            update_index(path)
+            return
+        # once the execution is over, gather the screenshots into a single GIF and keep the first and
+        #  the last screenshots ; move these to the results folder
+        logger.debug(" > Gathering screenshots in an animated GIF...")
+        with lcd(data), timed(path, 'simulate', 'gif', sim, replicate):
+            local('convert -delay 10 -loop 0 network*.png wsn-{}-malicious.gif'.format(sim), capture=True)
+        network_images = {int(fn.split('.')[0].split('_')[-1]): fn for fn in listdir(data)
+                          if fn.startswith('network_')}
+        move_files(data, results, 'wsn-{}-malicious.gif'.format(sim))
+        net_start_old = network_images[min(network_images.keys())]
+        net_start, ext = splitext(net_start_old)
+        net_start_new = 'wsn-{}-malicious_start{}'.format(sim, ext)
+        net_end_old = network_images[max(network_images.keys())]
+        net_end, ext = splitext(net_end_old)
+        net_end_new = 'wsn-{}-malicious_end{}'.format(sim, ext)
+        move_files(data, results, (net_start_old, net_start_new), (net_end_old, net_end_new))
+        remove_files(data, *network_images.values())
+        set_stamp(sim_path, 'simulate', key)
+        update_index(path)
+_simulate = CommandMonitor(__simulate)
+
+
+def __simulate_batch(simulations, task='run', force=False, **kwargs):
+    """
+    Run a batch of simulations one after the other in a single Cooja JVM (see COOJA_BATCH) ; the outcome of each
+     simulation is then checked by the 'simulate' task (with batch=True).
+
+    :param simulations: list of tuples (path, sim, replicate) of the simulations to be run (see __simulate)
+    :param task: name of the task, used for the PID files of Cooja
+    :param force: run the simulations even if these are up to date
+    """
+    set_logging(kwargs.get('loglevel'))
+    stale, heap, budget = [], 0, 0
+    for path, sim, replicate in simulations:
+        sim_path = list_replicates(join(path, "{}-malicious".format(sim)))[replicate - 1]
+        key = get_stamp_key([join(sim_path, fn) for fn in ['Makefile', 'simulation.csc', 'script.js', 'motes']])
+        if not force and get_stamp(sim_path, 'simulate') == key:
+            continue
+        remove_stamps(sim_path, 'simulate', 'parse')
+        data = join(sim_path, 'data')
+        remove_files(data, *(listdir(data) if exists(data) else []))
+        config = read_config(path)
+        n, duration = config.get('n', DEFAULTS["number-motes"]) + 2, config.get('duration', DEFAULTS["duration"])
+        stale.append((sim_path, path, sim, replicate, n, duration))
+        heap = max(heap, get_jvm_heap(n))
+        budget += get_simulation_budget(duration, n)
+    if len(stale) == 0:
+        return "Up to date"
+    try:
+        run_cooja_batch([s[0] for s in stale], heap, budget, task)
+    finally:
+        # the simulations that completed before an eventual timeout are accounted anyway
+        for sim_path, path, sim, replicate, n, duration in stale:
+            status = get_batch_status(sim_path)
+            if status is None:
+                continue
+            record_timing(path, 'simulate', 'cooja', status[1], status[2], ['FAIL', 'SUCCESS'][status[0] == 'OK'],
+                          sim, replicate)
+            if status[0] == 'OK':
+                update_cooja_speed(status[2], (get_simulated_duration(sim_path) or (duration, ))[0], n)
+        update_index(*set(s[1] for s in stale))
+    return "{} simulation(s) run".format(len(stale))
+_simulate_batch = CommandMonitor(__simulate_batch)
+
+
+def __parse(path, sim, replicate=1, force=False, **kwargs):
+    """
+    Parse the results of one of the simulations of an experiment.
+
+    :param path: path of the experiment
+    :param sim: simulation to be parsed ('with' or 'without' the malicious mote)
+    :param replicate: number of the replicate to be parsed (if the simulation is repeated)
+    :param force: parse the results even if these are up to date
+    """
+    set_logging(kwargs.get('loglevel'))
+    sim_path = list_replicates(join(path, "{}-malicious".format(sim)))[replicate - 1]
+    key = get_stamp_key([join(sim_path, 'data')], get_stamp(sim_path, 'simulate'))
+    if not force and get_stamp(sim_path, 'parse') == key:
+        logger.debug(" > Simulation results are up to date")
+        return "Up to date"
+    remove_stamps(sim_path, 'parse')
+    # start the parsing functions to derive more results
+    logger.debug(" > Parsing simulation results...")
+    with timed(path, 'parse', 'parse', sim, replicate):
+        parsing_chain(sim_path)
+    set_stamp(sim_path, 'parse', key)
+    update_index(path)
+_parse = CommandMonitor(__parse)
+
+
+def __aggregate(path, sim, force=False, **kwargs):
+    """
+    Aggregate the results of the replicates of one of the simulations of an experiment (if repeated).
+
+    :param path: path of the experiment
+    :param sim: simulation to be aggregated ('with' or 'without' the malicious mote)
+    :param force: aggregate the results even if these are up to date
+    """
+    set_logging(kwargs.get('loglevel'))
+    sim_path = join(path, "{}-malicious".format(sim))
+    replicates = list_replicates(sim_path)
+    key = get_stamp_key([], *[get_stamp(r, 'parse') for r in replicates])
+    if not force and get_stamp(sim_path, 'aggregate') == key:
+        return "Up to date"
+    remove_stamps(sim_path, 'aggregate')
+    if len(replicates) > 1:
+        logger.debug(" > Aggregating the results of the replicates...")
+        with timed(path, 'aggregate', 'aggregate', sim):
+            aggregate_replicates(sim_path)
+    set_stamp(sim_path, 'aggregate', key)
+    update_index(path)
+_aggregate = CommandMonitor(__aggregate)
+
+
+def __report(path, force=False, **kwargs):
+    """
+    Generate the PDF report of an experiment.
+
+    :param path: path of the experiment
+    :param force: generate the report even if it is up to date
+    """
+    set_logging(kwargs.get('loglevel'))
+    key = get_stamp_key([join(path, 'report.md')], *[get_stamp(join(path, "{}-malicious".format(sim)), 'aggregate')
+                                                     for sim in ["without", "with"]])
+    if not force and get_stamp(path, 'report') == key and exists(join(path, 'report.pdf')):
+        logger.debug(" > Report is up to date")
+        return "Up to date"
+    remove_stamps(path, 'report')
+    with timed(path, 'report', 'report'):
         generate_report(path, REPORT_THEME)
-_run = CommandMonitor(__run)
+    set_stamp(path, 'report', key)
+    update_index(path)
+_report = CommandMonitor(__report)
+
+
+def __schedule_runs(scheduler, names, mode, prefix):
+    """
+    Add the tasks running experiments to a scheduler: both simulations and their replicates are independent, each
+     one is then parsed, replicates are aggregated and the report is generated once both simulations are aggregated
+     (stages that are up to date are skipped, see core.utils.stamps).
+
+    :param scheduler: CampaignScheduler instance
+    :param names: names of the experiments
+    :param mode: 'all', 'parse-only' or 'report-only' (see 'run' command)
+    :param prefix: prefix of the names of the tasks shared by several experiments (i.e. batches of simulations)
+    """
+    experiments = []
+    for name in names:
+        path = join(EXPERIMENT_FOLDER, name)
+        if not exists(path):
+            logger.error(" > Experiment '{}' does not exist !".format(name))
+            continue
+        if scheduler.is_scheduled('{}[report]'.format(name)):
+            logger.warning(" > Experiment '{}' is still running".format(name))
+            continue
+        check_structure(path, remove=True)
+        # the memory footprint of a simulation is the JVM heap rendered in its Makefile (root and malicious included)
+        jvm = get_jvm_heap(read_config(path).get('n', DEFAULTS["number-motes"]) + 2) + JVM_HEAP['overhead']
+        replicates = {sim: list_replicates(join(path, "{}-malicious".format(sim))) for sim in ["without", "with"]}
+        experiments.append((name, path, jvm, replicates))
+    params = {'loglevel': logger.level, 'force': mode != 'all'}
+    # in batch mode, the simulations are run by batches in single Cooja JVMs (see COOJA_BATCH) and each 'simulate'
+    #  task then only checks the outcome of its simulation ; without the '-batch' case in Cooja (see 'setup'), each
+    #  simulation is run in its own JVM
+    batches = {}
+    if mode == 'all' and COOJA_BATCH > 0 and not has_cooja_batch(COOJA_FOLDER):
+        logger.warning(" > Cooja has no batch mode (see 'setup'), each simulation runs in its own JVM")
+    elif mode == 'all' and COOJA_BATCH > 0:
+        simulations = [((path, sim, i), jvm, replicates[sim][i - 1]) for _, path, jvm, replicates in experiments
+                       for sim in ["without", "with"] for i in range(1, len(replicates[sim]) + 1)]
+        for k in range(0, len(simulations), COOJA_BATCH):
+            batch = simulations[k:k + COOJA_BATCH]
+            task = scheduler.add('{}[cooja-batch-{}]'.format(prefix, k // COOJA_BATCH + 1), 'simulate',
+                                 _simulate_batch, ([s for s, _, _ in batch], 'run'), params,
+                                 memory=max(m for _, m, _ in batch), pids=[join(p, '.run') for _, _, p in batch])
+            batches.update({s: task for s, _, _ in batch})
+    for name, path, jvm, replicates in experiments:
+        aggregated = []
+        for sim in ["without", "with"] if mode != 'report-only' else []:
+            parsed = []
+            for i in range(1, len(replicates[sim]) + 1):
+                label, batch, simulated = '{}-{}'.format(sim, i) if i > 1 else sim, batches.get((path, sim, i)), None
+                if mode == 'all':
+                    simulated = scheduler.add('{}[simulate-{}]'.format(name, label), 'simulate', _simulate,
+                                              (path, sim, 'run', i), dict(params, batch=batch is not None),
+                                              depends=[batch], memory=None if batch else jvm,
+                                              pids=[join(replicates[sim][i - 1], '.run')])
+                parsed.append(scheduler.add('{}[parse-{}]'.format(name, label), 'parse', _parse, (path, sim, i),
+                                            params, depends=[simulated]))
+            aggregated.append(scheduler.add('{}[aggregate-{}]'.format(name, sim), 'parse', _aggregate, (path, sim),
+                                            params, depends=parsed))
+        scheduler.add('{}[report]'.format(name), 'report', _report, (path, ), params, depends=aggregated)
+
+
+def __run(name, mode='all', jobs=None, **kwargs):
+    """
+    Run an experiment.
+
+    :param name: experiment name
+    :param mode: 'all' (resume from the first stale stage), 'parse-only' (parse again the existing simulation data
+                  and generate the report) or 'report-only' (generate the report again)
+    :param jobs: maximum number of parallel tasks with fabric, e.g. for running the replicates at the same time
+                  (in the console, the tasks are run by the scheduler of the console, along with its other tasks)
+    :param path: expanded path of the experiment (dynamically filled in through 'command' decorator with 'expand'
+    """
+    console = kwargs.get('console')
+    set_logging(kwargs.get('loglevel'))
+    if mode not in RUN_MODES:
+        logger.error(" > Unknown run mode '{}' (should be one of: {})".format(mode, ', '.join(RUN_MODES)))
+        return
+    scheduler = CampaignScheduler(jobs or cpu_count()) if console is None else console.scheduler
+    __schedule_runs(scheduler, [name], mode, name)
+    scheduler.run() if console is None else scheduler.start(console)
 run = command(
     autocomplete=lambda: list_experiments(),
     examples=["my-simulation"],
     expand=('name', {'new_arg': 'path', 'into': EXPERIMENT_FOLDER}),
     not_exists=('path', {'loglvl': 'error', 'msg': (" > Experiment '{}' does not exist !", 'name')}),
     start_msg=("PROCESSING EXPERIMENT '{}'", 'name'),
-    behavior=MultiprocessedCommand,
-    __base__=_run,
     logger=logger,
 )(__run)
 
@@ -428,14 +672,15 @@ def drop(exp_file, ask=True, **kwargs):
          expand=('exp_file', {'into': EXPERIMENT_FOLDER, 'ext': 'json'}),
          not_exists=('exp_file', {'loglvl': 'error',
                                   'msg': (" > Experiment campaign '{}' does not exist !", 'exp_file')}))
-def make_all(exp_file, **kwargs):
+def make_all(exp_file, jobs=None, **kwargs):
     """
     Make a campaign of experiments.
 
     :param exp_file: experiments JSON filename or basename (absolute or relative path ; if no path provided,
                      the JSON file is searched in the experiments folder)
+    :param jobs: maximum number of parallel tasks with fabric (in the console, the tasks are run by the scheduler of
+                  the console, along with its other tasks)
     """
-    global reuse_bin_path
     console = kwargs.get('console')
     clean_all(exp_file, silent=True) if console is None else console.do_clean_all(exp_file, silent=True)
     experiments = get_experiments(exp_file, silent=True)
@@ -444,8 +689,25 @@ def make_all(exp_file, **kwargs):
     if 'BASE' in experiments.keys():
         experiments['BASE']['silent'] = True
         sim_json = dict(experiments['BASE']['simulation'])
-        motes = generate_motes(defaults=DEFAULTS, **validated_parameters(experiments['BASE']))
+        base = validated_parameters(experiments['BASE'])
+        try:
+            motes = base['motes'] or generate_motes(defaults=DEFAULTS, **base)
+        except ValueError as e:
+            logger.error("WSN of the BASE simulation could not be generated ({}) !".format(e))
+            logger.critical("Make aborded.")
+            return False
+        # a disconnected WSN is rejected before making any experiment
+        unreachable = check_connectivity(motes, base["tx_range"])
+        if len(unreachable) > 0:
+            logger.error("WSN of the BASE simulation is not connected (motes that cannot reach the root: {}) !"
+                         .format(', '.join(map(str, unreachable))))
+            logger.critical("Make aborded.")
+            return False
         del experiments['BASE']
+    # in the console, the experiments are made by the scheduler of the console so that the memory budget applies to
+    #  all its tasks
+    scheduler = CampaignScheduler(jobs or 1) if console is None else console.scheduler
+    first_builds = {}
     for name, params in sorted(experiments.items(), key=lambda x: x[0]):
         params['campaign'] = splitext(basename(exp_file))[0]
         if sim_json is not None:
@@ -454,7 +716,18 @@ def make_all(exp_file, **kwargs):
                 if k not in params['simulation'].keys():
                     params['simulation'][k] = v
             params['motes'] = motes
-        make(name, ask=False, **params) if console is None else console.do_make(name, ask=False, **params)
+        if scheduler.is_scheduled(name):
+            logger.warning(" > Experiment '{}' is still being made".format(name))
+            continue
+        # experiments sharing the same root and sensor binaries wait for the first one that builds them so that
+        #  they can get these from the build cache (if it fails, e.g. on its malicious mote, they are made anyway)
+        shared = tuple(str((params.get('simulation') or {}).get(k, DEFAULTS[k])) for k in
+                       ['target', 'root', 'sensor', 'debug'])
+        scheduler.add(name, 'make', _make, (name, ), dict(params, ask=False, path=join(EXPERIMENT_FOLDER, name),
+                                                         task='make', loglevel=logger.level),
+                      after=[first_builds.get(shared)])
+        first_builds.setdefault(shared, name)
+    scheduler.run() if console is None else scheduler.start(console)
 
 
 @command(autocomplete=lambda: list_campaigns(),
@@ -478,17 +751,28 @@ def prepare(exp_file, ask=True, **kwargs):
          expand=('exp_file', {'into': EXPERIMENT_FOLDER, 'ext': 'json'}),
          not_exists=('exp_file', {'loglvl': 'error',
                                   'msg': (" > Experiment campaign '{}' does not exist !", 'exp_file')}))
-def remake_all(exp_file, **kwargs):
+def remake_all(exp_file, jobs=None, **kwargs):
     """
     Remake a campaign of experiments (that is, rebuild the malicious for each experiment).
 
     :param exp_file: experiments JSON filename or basename (absolute or relative path ; if no path provided,
                      the JSON file is searched in the experiments folder)
+    :param jobs: maximum number of parallel tasks with fabric (in the console, the tasks are run by the scheduler of
+                  the console, along with its other tasks)
     """
     console = kwargs.get('console')
+    scheduler = CampaignScheduler(jobs or 1) if console is None else console.scheduler
     experiments = {k: v for k, v in get_experiments(exp_file).items() if k != 'BASE'}
     for name, params in sorted(experiments.items(), key=lambda x: x[0]):
-        remake(name, **params) if console is None else console.do_remake(name, **params)
+        path = join(EXPERIMENT_FOLDER, name)
+        if not exists(path):
+            logger.error(" > Experiment '{}' does not exist !".format(name))
+            continue
+        if scheduler.is_scheduled(name):
+            logger.warning(" > Experiment '{}' is still being made".format(name))
+            continue
+        scheduler.add(name, 'make', _remake, (name, ), dict(params, path=path, loglevel=logger.level))
+    scheduler.run() if console is None else scheduler.start(console)
 
 
 @command(autocomplete=lambda: list_campaigns(),
@@ -496,17 +780,53 @@ def remake_all(exp_file, **kwargs):
          expand=('exp_file', {'into': EXPERIMENT_FOLDER, 'ext': 'json'}),
          not_exists=('exp_file', {'loglvl': 'error',
                                   'msg': (" > Experiment campaign '{}' does not exist !", 'exp_file')}))
-def run_all(exp_file, **kwargs):
+def run_all(exp_file, jobs=None, mode='all', **kwargs):
     """
     Run a campaign of experiments.
 
     :param exp_file: experiments JSON filename or basename (absolute or relative path ; if no path provided,
                      the JSON file is searched in the experiments folder)
+    :param jobs: maximum number of parallel tasks with fabric (in the console, the tasks are run by the scheduler of
+                  the console, along with its other tasks)
+    :param mode: 'all' (resume from the first stale stage), 'parse-only' or 'report-only' (see 'run' command)
     """
     console = kwargs.get('console')
-    for name in get_experiments(exp_file).keys():
-        if name != 'BASE':
-            run(name) if console is None else console.do_run(name)
+    if mode not in RUN_MODES:
+        logger.error(" > Unknown run mode '{}' (should be one of: {})".format(mode, ', '.join(RUN_MODES)))
+        return
+    # in the console, the experiments are run by the scheduler of the console so that the memory budget applies to
+    #  all its tasks
+    scheduler = CampaignScheduler(jobs or 1) if console is None else console.scheduler
+    names = [name for name in sorted(get_experiments(exp_file).keys()) if name != 'BASE']
+    __schedule_runs(scheduler, names, mode, splitext(basename(exp_file))[0])
+    scheduler.run() if console is None else scheduler.start(console)
+
+
+@command(autocomplete=lambda: list_campaigns(),
+         examples=["my-simulation-campaign"],
+         expand=('exp_file', {'into': EXPERIMENT_FOLDER, 'ext': 'json'}),
+         not_exists=('exp_file', {'loglvl': 'error',
+                                  'msg': (" > Experiment campaign '{}' does not exist !", 'exp_file')}))
+def timings(exp_file, **kwargs):
+    """
+    Summarize the time spent in each stage of a campaign of experiments (see results/timings.json in each
+     experiment).
+
+    :param exp_file: experiments JSON filename or basename (absolute or relative path ; if no path provided,
+                     the JSON file is searched in the experiments folder)
+    """
+    summary = get_campaign_timings(exp_file)
+    if len(summary) == 0:
+        logger.warning(" > No timing recorded for this campaign")
+        return
+    stages = ['make', 'simulate', 'parse', 'aggregate', 'report']
+    data = [['Stage', 'Span', 'Count', 'Failed', 'Total (s)', 'Mean (s)', 'Max (s)']]
+    for (stage, span), s in sorted(summary.items(), key=lambda x: (stages.index(x[0][0])
+                                                                    if x[0][0] in stages else len(stages), x[0])):
+        data.append([stage, span, s['count'], s['failed'], '{:.1f}'.format(s['total']),
+                     '{:.1f}'.format(s['total'] / s['count']), '{:.1f}'.format(s['max'])])
+    data.append(['Total', '', '', '', '{:.1f}'.format(sum(s['total'] for s in summary.values())), '', ''])
+    print(SingleTable(data, 'Timings of {}'.format(splitext(basename(exp_file))[0])).table)
 
 
 # ************************************** INFORMATION COMMANDS *************************************
@@ -522,7 +842,9 @@ def list(item_type, **kwargs):
     data, title = [['Name']], None
     if item_type == 'experiments':
         title = 'Available experiments'
-        data.extend([['- {}'.format(x).ljust(25)] for x in list_experiments()])
+        data[0].append('Status')
+        experiments = get_index()['experiments']
+        data.extend([['- {}'.format(x).ljust(25), experiments[x]['status']] for x in list_experiments(check=False)])
     elif item_type == 'campaigns':
         title = 'Available campaigns'
         data.extend([['- {}'.format(x).ljust(25)] for x in list_campaigns()])
@@ -567,10 +889,10 @@ def setup(silent=False, **kwargs):
     # adapt IPv6 debug mode
     modify_ipv6_debug(CONTIKI_FOLDER)
     # install Cooja modifications
-    if not check_cooja(COOJA_FOLDER):
+    if not check_cooja(COOJA_FOLDER, COOJA_BATCH > 0):
         logger.debug(" > Installing Cooja add-ons...")
         # modify Cooja.java and adapt build.xml and ~/.cooja.user.properties
-        modify_cooja(COOJA_FOLDER)
+        modify_cooja(COOJA_FOLDER, COOJA_BATCH > 0)
         update_cooja_build(COOJA_FOLDER)
         update_cooja_user_properties()
         recompile = True
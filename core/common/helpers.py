@@ -1,18 +1,25 @@
 # -*- coding: utf8 -*-
+import errno
 import re
-import sh
+import stat
 from jsmin import jsmin
 from json import loads
-from os import makedirs
-from os.path import exists, expanduser, join, split
+from os import chmod, getpid, link, makedirs, readlink, remove, rename, sep, stat as os_stat, symlink, walk
+from os.path import basename, exists, expanduser, isdir, islink, join, lexists, relpath, split
+from shutil import copy, copyfileobj, copymode, copystat, move, rmtree, Error
 from six import string_types
 from termcolor import colored
+try:
+    from fcntl import ioctl
+except ImportError:  # not available on Windows
+    ioctl = None
 
 
 __all__ = [
     'copy_files',
     'copy_folder',
     'is_valid_commented_json',
+    'link_folder',
     'move_files',
     'move_folder',
     'remove_files',
@@ -65,13 +72,91 @@ def std_input(txt="Are you sure ? (yes|no) [default: no] ", color=None, choices=
 
 
 # **************************************** FILE-RELATED HELPERS ****************************************
-def copy_files(src_path, dst_path, *files):
+# file operations are made in-process (no 'cp', 'mv' or 'rm' subprocess), which matters when making many
+#  experiments from the worker processes of a campaign
+FICLONE = 0x40049409  # Linux ioctl for cloning a file on copy-on-write filesystems (e.g. Btrfs, XFS)
+
+
+def __copy_file(src, dst, reflink=False):
+    """
+    This private function copies a file with its permission bits (as 'cp' does). If required and supported by the
+     filesystem, the file is cloned (reflink), that is, its data blocks are shared until either copy is altered.
+
+    :param src: source file path
+    :param dst: destination file path or existing folder
+    :param reflink: try to clone the file before falling back to a plain copy
+    """
+    if isdir(dst):
+        dst = join(dst, basename(src))
+    if reflink and ioctl is not None:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            try:
+                ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            except (IOError, OSError):
+                copyfileobj(fsrc, fdst)
+        copymode(src, dst)
+    else:
+        copy(src, dst)
+
+
+def __copy_tree(src, dst, reflink=False):
+    """
+    This private function copies a file or a folder recursively (as 'cp -R' does, i.e. the source is copied into
+     the destination if this is an existing folder and symbolic links are copied as such).
+
+    :param src: source path
+    :param dst: destination path
+    :param reflink: try to clone the files before falling back to plain copies
+    """
+    if isdir(dst):
+        dst = join(dst, basename(src.rstrip(sep)))
+    if islink(src):
+        symlink(readlink(src), dst)
+    elif not isdir(src):
+        __copy_file(src, dst, reflink)
+    else:
+        for root, dirs, files in walk(src):
+            dst_root = join(dst, relpath(root, src))
+            if not exists(dst_root):
+                makedirs(dst_root)
+            for fn in files + [d for d in dirs if islink(join(root, d))]:
+                if islink(join(root, fn)):
+                    if lexists(join(dst_root, fn)):
+                        remove(join(dst_root, fn))
+                    symlink(readlink(join(root, fn)), join(dst_root, fn))
+                else:
+                    __copy_file(join(root, fn), join(dst_root, fn), reflink)
+
+
+def __move(src, dst):
+    """
+    This private function moves a file or a folder (as 'mv' does, i.e. into the destination if this is an existing
+     folder), renaming it when possible. Errors (e.g. a missing source) are ignored.
+
+    :param src: source path
+    :param dst: destination path
+    """
+    if isdir(dst) and not islink(dst):
+        dst = join(dst, basename(src.rstrip(sep)))
+    try:
+        rename(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            return
+        try:
+            move(src, dst)
+        except (IOError, OSError, Error):
+            pass
+
+
+def copy_files(src_path, dst_path, *files, **kwargs):
     """
     This helper function is aimed to copy files from a source path to a destination path.
 
     :param src_path: absolute or relative source path
     :param dst_path: absolute or relative destination path
     :param files: tuples with the following format (source_filename, destination_filename)
+    :param reflink: try to clone the files (copy-on-write) before falling back to plain copies
     """
     src_path, dst_path = __expand_folders(src_path, dst_path)
     for file in files:
@@ -83,16 +168,17 @@ def copy_files(src_path, dst_path, *files):
             continue
         src, dst = join(src_path, src), join(dst_path, dst)
         if src != dst:
-            sh.cp(src, dst)
+            __copy_file(src, dst, kwargs.get('reflink', False))
 
 
-def copy_folder(src_path, dst_path, includes=None):
+def copy_folder(src_path, dst_path, includes=None, reflink=False):
     """
     This helper function is aimed to copy an entire folder from a source path to a destination path.
 
     :param src_path: absolute or relative source path
     :param dst_path: absolute or relative destination path
     :param includes: list of sub-folders and files to be included from the src_path and to be copied into dst_path
+    :param reflink: try to clone the files (copy-on-write) before falling back to plain copies
     """
     src_path, dst_path = __expand_folders(src_path, dst_path)
     if src_path != dst_path:
@@ -105,9 +191,45 @@ def copy_folder(src_path, dst_path, includes=None):
                 sub_dst_path = join(dst_path, head)
                 if not exists(sub_dst_path):
                     makedirs(sub_dst_path)
-                sh.cp('-R', join(src_path, include), sub_dst_path)
+                __copy_tree(join(src_path, include), sub_dst_path, reflink)
         else:
-            sh.cp('-R', src_path, dst_path)
+            __copy_tree(src_path, dst_path, reflink)
+
+
+def link_folder(src_path, dst_path, copies=None):
+    """
+    This helper function is aimed to mirror an entire folder from a source path to a destination path as a farm of
+     hard links (files are copied instead when they cannot be linked, e.g. across devices). Sub-folders listed in
+     'copies' are physically copied (cloned if the filesystem supports it, and made writable) so that they can be
+     altered without modifying the source.
+
+    :param src_path: absolute or relative source path
+    :param dst_path: absolute or relative destination path (created with the same content as src_path)
+    :param copies: list of sub-folders (relative to src_path) to be physically copied
+    """
+    src_path, dst_path = __expand_folders(src_path, dst_path)
+    copies = [join(src_path, c) for c in copies or []]
+    for root, dirs, files in walk(src_path):
+        dst_root = join(dst_path, relpath(root, src_path))
+        if not exists(dst_root):
+            makedirs(dst_root)
+        is_copy = any(root == c or root.startswith(c + '/') for c in copies)
+        for fn in files + [d for d in dirs if islink(join(root, d))]:
+            src, dst = join(root, fn), join(dst_root, fn)
+            if islink(src):
+                symlink(readlink(src), dst)
+                continue
+            if not is_copy:
+                try:
+                    link(src, dst)
+                    continue
+                except OSError as e:
+                    if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                        raise
+            __copy_file(src, dst, reflink=is_copy)
+            copystat(src, dst)
+            if is_copy:
+                chmod(dst, os_stat(dst).st_mode | stat.S_IWUSR)
 
 
 def move_files(src_path, dst_path, *files):
@@ -127,11 +249,8 @@ def move_files(src_path, dst_path, *files):
         else:
             continue
         src, dst = join(src_path, src), join(dst_path, dst)
-        try:
-            if src != dst:
-                sh.mv(src, dst)
-        except sh.ErrorReturnCode_1:
-            pass
+        if src != dst:
+            __move(src, dst)
 
 
 def move_folder(src_path, dst_path, new_folder_name=None):
@@ -146,11 +265,8 @@ def move_folder(src_path, dst_path, new_folder_name=None):
     src_path, dst_path = __expand_folders(src_path, dst_path)
     if new_folder_name is not None:
         dst_path = join(dst_path, new_folder_name).rstrip("/")
-    try:
-        if src_path != dst_path:
-            sh.mv(src_path, dst_path)
-    except sh.ErrorReturnCode_1:
-        pass
+    if src_path != dst_path:
+        __move(src_path, dst_path)
 
 
 def remove_files(path, *files):
@@ -164,8 +280,8 @@ def remove_files(path, *files):
     path = __expand_folders(path)
     for file in files:
         try:
-            sh.rm(join(path, file))
-        except sh.ErrorReturnCode_1:
+            remove(join(path, file))
+        except OSError:
             pass
 
 
@@ -177,57 +293,67 @@ def remove_folder(path):
     :param path: absolute or relative source path
     """
     path = __expand_folders(path)
-    try:
-        sh.rm('-r', path)
-    except sh.ErrorReturnCode_1:
-        pass
+    if islink(path) or not isdir(path):
+        try:
+            remove(path)
+        except OSError:
+            pass
+    else:
+        rmtree(path, ignore_errors=True)
 
 
 def replace_in_file(path, replacements):
     """
-    This helper function performs a line replacement in the file located at 'path'.
+    This helper function performs line replacements in the file located at 'path'. For each line, the first
+     replacement whose pattern matches (either as a simple string or as a regex) applies ; a line whose replacement
+     is empty is removed. All the patterns are compiled into a single regex whose alternatives are tried in the order
+     of the replacements, so that the group of a match tells which replacement applies, and the file is then
+     atomically replaced.
 
     :param path: path to the file to be altered
     :param replacements: list of string pairs formatted as [old_line_pattern, new_line_replacement]
+    :return: the list of the patterns that did not match any line
     """
-    tmp = path + '.tmp'
     if isinstance(replacements[0], string_types):
         replacements = [replacements]
-    regexs = []
-    for replacement in replacements:
+    # each alternative looks ahead for a pattern from the beginning of the line and captures it in a group mapped to
+    #  (replacement index, whether the replaced part is the first group of the regex pattern)
+    alternatives, groups, index = [], {}, 0
+    for i, (old, _) in enumerate(replacements):
+        # try a simple string match then a regex match (with its own groups)
+        patterns = [(re.escape(old), 0)]
         try:
-            regex = re.compile(replacement[0])
+            patterns.append((old, re.compile(old).groups))
         except re.error:
-            regex = None
-        regexs.append(regex)
-    with open(tmp, 'w+') as nf:
-        with open(path) as of:
-            for line in of.readlines():
-                skip = False
-                for replacement, regex in zip(replacements, regexs):
-                    # try a simple string match
-                    if replacement[0] in line:
-                        if replacement[1] in (None, ''):
-                            skip = True
-                        else:
-                            line = line.replace(replacement[0], replacement[1])
-                        break
-                    # then try a regex match
-                    else:
-                        if regex is not None:
-                            match = regex.search(line)
-                            if match is not None:
-                                if replacement[1] in (None, ''):
-                                    skip = True
-                                try:
-                                    line = line.replace(match.groups(0)[0], replacement[1])
-                                except IndexError:
-                                    line = line.replace(match.group(), replacement[1])
-                                break
-                if not skip:
-                    nf.write(line)
-    sh.rm(path)
-    sh.mv(tmp, path)
+            pass
+        for pattern, inner in patterns:
+            index += 1
+            alternatives.append('(?=.*?({}))'.format(pattern))
+            groups[index] = (i, inner > 0)
+            index += inner
+    combined = re.compile('|'.join(alternatives))
+    matched = set()
+    with open(path) as f:
+        lines = f.readlines()
+    output = []
+    for line in lines:
+        match = combined.match(line)
+        if match is None:
+            output.append(line)
+            continue
+        i, inner = groups[match.lastindex]
+        found = match.group(match.lastindex)
+        if inner and match.group(match.lastindex + 1) is not None:
+            found = match.group(match.lastindex + 1)
+        matched.add(i)
+        new = replacements[i][1]
+        if new not in (None, ''):
+            output.append(line.replace(found, new))
+    tmp = '{}.{}.tmp'.format(path, getpid())
+    with open(tmp, 'w') as f:
+        f.writelines(output)
+    rename(tmp, path)
+    return [old for i, (old, new) in enumerate(replacements) if i not in matched]
 
 
 # **************************************** JSON-RELATED HELPER *****************************************
@@ -1,37 +1,175 @@
 # -*- coding: utf8 -*-
-from numpy import arccos, average, cos, pi, sign, sin, sqrt
-from random import randint, shuffle
+import math
+from numpy import arccos, argsort, array, asarray, average, bincount, ceil, column_stack, cos, floor, indices, \
+    maximum, minimum, pi, sign, sin, sqrt, vstack, where, zeros
+from numpy.random import randint, uniform
+from random import randrange, shuffle, uniform as scalar_uniform
 
 WSN_DENSITY_FACTOR = 3
+# candidate positions are sampled in the sector of the mote so that the WSN keeps its ring layout, then around the
+#  last placed motes that may still have room around them (the frontier) for when the ring is full
+SECTOR_CANDIDATES = 32
+ANCHOR_CANDIDATES = 8
+FRONTIER_SIZE = 32
+# randomized topologies are drawn again until they are connected, up to this number of attempts
+MAX_ATTEMPTS = 10
 
 
 __all__ = [
     'generate_motes',
+    'get_unreachable_motes',
+    'TOPOLOGIES',
 ]
 
 
-# ************************************** NETWORK GENERATION FUNCTION ****************************************
-def generate_motes(**kwargs):
+TOPOLOGIES = {}
+
+
+def topology(name):
     """
-    This function generates a WSN with 1 root, n legitimate motes and 1 malicious mote
+    This decorator registers a topology generator, that is, a function taking the number of non-root motes, the
+     minimum distance from the root, the maximum distance from the root and the transmission range, and returning
+     an array with the positions of the non-root motes (the root being at (0, 0)).
 
-    :return: the list of motes (formatted as dictionaries like hereafter)
+    :param name: name of the topology, as in the 'topology' parameter of the simulation campaign file
+    """
+    def _wrapper(f):
+        TOPOLOGIES[name] = f
+        return f
+    return _wrapper
+
+
+# ************************************** SPATIAL INDEX FOR MOTE PLACEMENT ****************************************
+class SpatialGrid(object):
+    """
+    This class is a spatial index made of square cells holding the positions of the already placed motes. It is used
+     for checking the motes near a position without checking every mote of the WSN, i.e. only the motes of the cells
+     around this position. It is queried for one position at a time, in plain Python, as the few motes of these cells
+     are much faster to check this way than through NumPy calls.
+
+    :param side: side of the cells (e.g. the minimum distance between two motes, so that cells hold few motes)
+    """
+    def __init__(self, side):
+        self.side = float(side)
+        self.cells = {}
+
+    def add(self, x, y):
+        """ Add a mote to the index. """
+        self.cells.setdefault((int(math.floor(x / self.side)), int(math.floor(y / self.side))), []).append((x, y))
+
+    def any_within(self, x, y, distance):
+        """
+        Check if an indexed mote is at most at the given distance from a position.
+
+        :param x: abscissa of the position
+        :param y: ordinate of the position
+        :param distance: maximum distance
+        :return: True if such a mote exists, otherwise False
+        """
+        k, d = int(math.ceil(distance / self.side)), distance ** 2
+        cx, cy = int(math.floor(x / self.side)), int(math.floor(y / self.side))
+        for i in range(cx - k, cx + k + 1):
+            for j in range(cy - k, cy + k + 1):
+                for px, py in self.cells.get((i, j), ()):
+                    if (x - px) ** 2 + (y - py) ** 2 <= d:
+                        return True
+        return False
+
+
+def place_mote(grid, sector, frontier, min_range, tx_range, max_range):
+    """
+    This function selects the position of a new mote, at more than min_range from any other mote, at less than 90%
+     of tx_range from at least one of them (so that the WSN remains connected) and at most at max_range from the
+     root. Candidates are first sampled in the given sector, then around one of the last motes of the frontier, as
+     in Bridson's algorithm: a mote around which no candidate meets the constraints is removed from the frontier and
+     another one is tried.
+
+    :param grid: spatial index of the already placed motes
+    :param sector: tuple (angle_min, angle_max, range_min, range_max) in radians and meters, None if the sector is
+                    not to be sampled (e.g. if the ring of the sector is known to be full)
+    :param frontier: list of the positions of the motes around which there may still be room (updated in place)
+    :param min_range: minimum distance between two motes
+    :param tx_range: transmission range
+    :param max_range: maximum distance from the root
+    :return: the coordinates of the new mote and True if the mote was placed in its sector, or None if there is no
+              room left for it
+    """
+    def sample(origin, bounds, n, connected):
+        """ Draw up to n candidates one at a time (most motes are placed with one of the first ones). """
+        (ox, oy), (a_min, a_max, r_min, r_max) = origin, bounds
+        for _ in range(n):
+            angle, r = scalar_uniform(a_min, a_max), scalar_uniform(r_min, r_max)
+            x, y = ox + r * math.cos(angle), oy + r * math.sin(angle)
+            if x * x + y * y <= max_range ** 2 and not grid.any_within(x, y, min_range) and \
+                    (connected or grid.any_within(x, y, 0.9 * tx_range)):
+                return x, y
+
+    if sector is not None:
+        position = sample((0., 0.), sector, SECTOR_CANDIDATES, False)
+        if position is not None:
+            return position + (True, )
+    while len(frontier) > 0:
+        # a candidate at less than 90% of tx_range from its anchor is connected by construction
+        i = randrange(max(0, len(frontier) - FRONTIER_SIZE), len(frontier))
+        position = sample(frontier[i], (0., 2 * math.pi, min_range, 0.9 * tx_range), ANCHOR_CANDIDATES, True)
+        if position is not None:
+            return position + (False, )
+        frontier.pop(i)
+
+
+# ************************************** CONNECTIVITY CHECK ****************************************
+def get_unreachable_motes(positions, tx_range):
+    """
+    This function checks the connectivity of a WSN as seen by the Unit Disk Graph Medium (UDGM) of Cooja, that is,
+     two motes are neighbours if their distance is at most the transmission range. A breadth-first search is run
+     from the first mote (the root), looking for neighbours only in the surrounding cells of a grid with
+     tx_range-sized cells.
+
+    :param positions: array (or list) of (x, y) positions, the first one being the root's
+    :param tx_range: transmission range
+    :return: the indices of the positions that cannot be reached from the root (empty list if the WSN is connected)
+    """
+    positions = asarray(positions, dtype=float).reshape(-1, 2)
+    if len(positions) == 0:
+        return []
+    cells = [tuple(c) for c in floor(positions / float(tx_range)).astype(int).tolist()]
+    index, neighbourhoods = {}, {}
+    for i, c in enumerate(cells):
+        index.setdefault(c, []).append(i)
+    reached = zeros(len(positions), dtype=bool)
+    reached[0], queue = True, [0]
+    while len(queue) > 0:
+        i = queue.pop()
+        cx, cy = cells[i]
+        # the motes of the 9 surrounding cells are gathered once per cell
+        if cells[i] not in neighbourhoods:
+            neighbourhoods[cells[i]] = array([j for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                                              for j in index.get((cx + dx, cy + dy), ())])
+        near = neighbourhoods[cells[i]]
+        near = near[~reached[near]]
+        near = near[((positions[near] - positions[i]) ** 2).sum(axis=1) <= tx_range ** 2]
+        reached[near] = True
+        queue.extend(near.tolist())
+    return where(~reached)[0].tolist()
+
+
+# ************************************** TOPOLOGY GENERATORS ****************************************
+@topology('ring')
+def ring_topology(n, min_range, max_range, tx_range):
+    """
+    This generator places the motes in rings around the root, with one mote per sector of each ring. Each ring holds
+     twice as many motes as the previous one (starting with WSN_DENSITY_FACTOR * 2). Once a ring is full, the motes
+     are placed around the frontier of the WSN (see place_mote).
     """
-    defaults = kwargs.pop('defaults')
-    nodes = [{"id": 0, "type": "root", "x": 0, "y": 0, "z": 0}]
-    n = kwargs.pop('n', defaults["number-motes"])
-    min_range = kwargs.pop('min_range', defaults["minimum-distance-from-root"])
-    max_range = kwargs.pop('max_range', defaults["area-square-side"] // 2)
-    tx_range = kwargs.pop('tx_range', defaults["transmission-range"])
     # determine 'i', the number of steps for the algorithm
     # at step i, the newtork must be filled with at most sum(f * 2 ** i)
     #   e.g. if f = 3, with 10 nodes, root's proximity will hold 6 nodes then the 4 ones remaining in the next ring
     i, s, ni = 1, 0, 0
-    node_ids = list(range(1, n + 1))
-    shuffle(node_ids)
     while s <= n:
         s += WSN_DENSITY_FACTOR * 2 ** i
         i += 1
+    grid, positions, frontier = SpatialGrid(max(min_range, 0.1 * tx_range)), [(0., 0.)], [(0., 0.)]
+    grid.add(0., 0.)
     # now, generate the nodes
     # first, the range increment is defined ; it will provide the interval of ranges for the quadrants
     range_inc = min(tx_range, max_range / (i - 1))
@@ -39,36 +177,177 @@ def generate_motes(**kwargs):
         # determine the number of nodes to be generated inside the current ring
         n_step = min(WSN_DENSITY_FACTOR * 2 ** ns, n - ni)
         # determine the angle increment for the quadrants
-        angle_inc = 360 // n_step
+        angle_inc = 2 * pi / n_step
         # then, divide the ring in quadrants and generate 1 node per quadrant with a 10% margin either
         #  for the angle or for the range
-        range_min, range_max = int((ns - 0.7) * range_inc), int((ns - 0.1) * range_inc)
+        range_min = max((ns - 0.7) * range_inc, min_range)
+        range_max = max(min((ns - 0.1) * range_inc, max_range), range_min)
+        misses = 0
         for j in range(0, n_step):
             ni += 1
-            angle_min, angle_max = int((j + 0.25) * angle_inc), int((j + 0.75) * angle_inc)
-            d, k, x, y = 0, 0, 0, 0
-            while not min_range < d < tx_range * 0.9 and k < 1000:
-                node_angle = randint(angle_min, angle_max) * pi / 180
-                node_range = randint(max(range_min, min_range), min(range_max, max_range))
-                # compute the coordinates and append the new node to the list
-                x, y = node_range * cos(node_angle), node_range * sin(node_angle)
-                for node in nodes:
-                    d = min(d, sqrt((x - node['x'])**2 + (y - node['y'])**2))
-                k += 1
-            nodes.append({'id': node_ids[ni-1], 'type': 'sensor', 'x': x, 'y': y, 'z': 0})
+            # once several motes in a row could not be placed in their sector, the ring is considered as full
+            sector = ((j + 0.25) * angle_inc, (j + 0.75) * angle_inc, range_min, range_max) if misses < 3 else None
+            placed = place_mote(grid, sector, frontier, min_range, tx_range, max_range)
+            if placed is None:
+                raise ValueError("only {} motes out of {} fit in the area with a minimum distance of {}"
+                                 .format(ni - 1, n, min_range))
+            x, y, in_sector = placed
+            misses = 0 if in_sector else misses + 1
+            grid.add(x, y)
+            positions.append((x, y))
+            frontier.append((x, y))
         if ni == n:
             break
         range_inc *= 0.75
+    return array(positions[1:]).reshape(-1, 2)
+
+
+@topology('grid')
+def grid_topology(n, min_range, max_range, tx_range):
+    """
+    This generator places the motes on the nodes of a square lattice centered on the root, the nearest nodes from
+     the root first. The lattice step is 90% of the transmission range (less if the area is too small, but not less
+     than min_range), hence the WSN is connected.
+    """
+    side = int(ceil(sqrt(n + 1))) // 2 * 2 + 1
+    step = min(0.9 * tx_range, 2. * max_range / max(side - 1, 1))
+    if step < min_range:
+        raise ValueError("{} motes do not fit on a grid in the area with a minimum distance of {}"
+                         .format(n, min_range))
+    i, j = indices((side, side)).reshape(2, -1) - side // 2
+    # the first node is the root (the only one at distance 0), then each selected node has a neighbour nearer to
+    #  the root among the selected ones
+    order = argsort(i ** 2 + j ** 2, kind='mergesort')[1:n + 1]
+    return column_stack((i[order], j[order])) * step
+
+
+@topology('line')
+def line_topology(n, min_range, max_range, tx_range):
+    """
+    This generator places the motes on a line starting from the root, each mote at 90% of the transmission range
+     from the previous one (less if the area is too small, but not less than min_range), hence the WSN is connected.
+     Once the line reaches the border of the area, it is folded back and forth across the upper half of the area.
+    """
+    # with m steps from the root to the border, the folded line holds m motes then 2m + 1 motes per row above
+    m = 1
+    while m * (2 * m + 2) < n:
+        m += 1
+    step = min(0.9 * tx_range, float(max_range) / m)
+    if step < min_range:
+        raise ValueError("{} motes do not fit on a line in the area with a minimum distance of {}"
+                         .format(n, min_range))
+    m = int(floor(max_range / step + 1e-9))
+    positions = [(i, 0) for i in range(1, m + 1)]
+    for j in range(1, m + 1):
+        positions.extend((i, j) for i in (range(m, -m - 1, -1) if j % 2 == 1 else range(-m, m + 1)))
+    return array(positions[:n], dtype=float).reshape(-1, 2) * step
+
+
+@topology('random')
+def random_topology(n, min_range, max_range, tx_range):
+    """
+    This generator places the motes at random in the square area centered on the root, at more than min_range from
+     each other and at less than 90% of tx_range from at least one of them, hence the WSN is connected. Candidate
+     positions are sampled by batches, uniformly in the part of the area around the already placed motes (their
+     bounding box widened by the transmission range), and the ones that do not meet the constraints are discarded.
+    """
+    grid, positions = SpatialGrid(max(min_range, 0.1 * tx_range)), []
+    grid.add(0., 0.)
+    low, high, misses = zeros(2), zeros(2), 0
+    # the area is considered as full once several batches in a row did not place any mote
+    while misses < SECTOR_CANDIDATES:
+        placed = len(positions)
+        bounds = maximum(low - tx_range, -max_range), minimum(high + tx_range, max_range)
+        for x, y in uniform(bounds[0], bounds[1], (n, 2)).tolist():
+            if not grid.any_within(x, y, min_range) and grid.any_within(x, y, 0.9 * tx_range):
+                grid.add(x, y)
+                positions.append((x, y))
+                if len(positions) == n:
+                    return array(positions)
+        if len(positions) > placed:
+            low, high = minimum(low, array(positions).min(axis=0)), maximum(high, array(positions).max(axis=0))
+        misses = 0 if len(positions) > placed else misses + 1
+    raise ValueError("only {} motes out of {} fit in the area with a minimum distance of {}"
+                     .format(len(positions), n, min_range))
+
+
+@topology('clustered')
+def clustered_topology(n, min_range, max_range, tx_range):
+    """
+    This generator places the motes in clusters around cluster heads. Each cluster head is at 90% of the
+     transmission range from the root or from a previous cluster head, then the members of each cluster are placed
+     around its head and its already placed members (see place_mote), hence the WSN is connected.
+    """
+    n_heads = max(1, min(n, int(round(sqrt(n)))))
+    grid, heads = SpatialGrid(max(min_range, 0.1 * tx_range)), [(0., 0.)]
+    grid.add(0., 0.)
+    for k in range(n_heads):
+        for _ in range(SECTOR_CANDIDATES):
+            (hx, hy), angle = heads[randrange(len(heads))], scalar_uniform(0, 2 * math.pi)
+            x, y = hx + 0.9 * tx_range * math.cos(angle), hy + 0.9 * tx_range * math.sin(angle)
+            if x * x + y * y <= max_range ** 2 and not grid.any_within(x, y, min_range):
+                break
+        else:
+            raise ValueError("only {} cluster heads out of {} fit in the area with a minimum distance of {}"
+                             .format(k, n_heads, min_range))
+        grid.add(x, y)
+        heads.append((x, y))
+    # the members are distributed at random among the clusters ; once there is no room left around a cluster, its
+    #  members are placed around the whole WSN
+    members, frontier = [], list(heads)
+    for head, size in zip(heads[1:], bincount(randint(0, n_heads, n - n_heads), minlength=n_heads).tolist()):
+        cluster = [head]
+        for _ in range(size):
+            placed = place_mote(grid, None, cluster, min_range, tx_range, max_range)
+            if placed is None:
+                placed = place_mote(grid, None, frontier, min_range, tx_range, max_range)
+            if placed is None:
+                raise ValueError("only {} motes out of {} fit in the area with a minimum distance of {}"
+                                 .format(n_heads + len(members), n, min_range))
+            grid.add(*placed[:2])
+            for positions in [cluster, frontier, members]:
+                positions.append(placed[:2])
+    return array(heads[1:] + members).reshape(-1, 2)
+
+
+# ************************************** NETWORK GENERATION FUNCTION ****************************************
+def generate_motes(**kwargs):
+    """
+    This function generates a WSN with 1 root, n legitimate motes and 1 malicious mote, using the generator of the
+     given topology (see TOPOLOGIES). Randomized topologies are drawn again until they are connected (up to
+     MAX_ATTEMPTS times). A ValueError is raised if the motes do not fit in the area (see min_range) or if no
+     connected WSN could be drawn.
+
+    :return: the list of motes (formatted as dictionaries like hereafter)
+    """
+    defaults = kwargs.pop('defaults')
+    n = kwargs.pop('n', defaults["number-motes"])
+    min_range = kwargs.pop('min_range', defaults["minimum-distance-from-root"])
+    max_range = kwargs.pop('max_range', defaults["area-square-side"] // 2)
+    tx_range = kwargs.pop('tx_range', defaults["transmission-range"])
+    generator = TOPOLOGIES[kwargs.pop('topology', defaults.get("topology", "ring"))]
+    for _ in range(MAX_ATTEMPTS):
+        positions = vstack((zeros((1, 2)), generator(n, min_range, max_range, tx_range)))
+        unreachable = get_unreachable_motes(positions, tx_range)
+        if len(unreachable) == 0:
+            break
+    else:
+        raise ValueError("no connected WSN could be drawn in {} attempts ({} motes out of {} cannot reach the root,"
+                         " the area may be too large for this number of motes)"
+                         .format(MAX_ATTEMPTS, len(unreachable), n))
+    node_ids = list(range(1, n + 1))
+    shuffle(node_ids)
+    nodes = [{"id": 0, "type": "root", "x": 0, "y": 0, "z": 0}]
+    nodes.extend({'id': i, 'type': 'sensor', 'x': x, 'y': y, 'z': 0}
+                 for i, (x, y) in zip(node_ids, positions[1:].tolist()))
     # finally, add the malicious mote in the middle of the network
     # get the average of the squared x and y deltas
-    avg_x = average([sign(n['x']) * n['x'] ** 2 for n in nodes])
-    x = sign(avg_x) * sqrt(abs(avg_x))
-    avg_y = average([sign(n['y']) * n['y'] ** 2 for n in nodes])
-    y = sign(avg_y) * sqrt(abs(avg_y))
+    avg_x, avg_y = average(sign(positions) * positions ** 2, axis=0)
+    x, y = sign(avg_x) * sqrt(abs(avg_x)), sign(avg_y) * sqrt(abs(avg_y))
     # if malicious mote is too close by the root, just push it away
     radius = sqrt(x ** 2 + y ** 2)
     if radius < min_range:
-        angle = arccos(x / radius)
+        angle = arccos(x / radius) if radius > 0 else 0.
         x, y = min_range * cos(angle), min_range * sin(angle)
-    nodes.append({'id': len(nodes), 'type': 'malicious', 'x': x, 'y': y, 'z': 0})
+    nodes.append({'id': len(nodes), 'type': 'malicious', 'x': float(x), 'y': float(y), 'z': 0})
     return sorted(nodes, key=lambda o: o['id'])
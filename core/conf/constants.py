@@ -1,31 +1,42 @@
 # -*- coding: utf8 -*-
 from collections import OrderedDict
+from multiprocessing import cpu_count
 try:  # for Python2
     import ConfigParser as configparser
 except ImportError:  # for Python3
     import configparser
-from os import makedirs
+from os import makedirs, sysconf
 from os.path import abspath, dirname, exists, expanduser, join, pardir
 
 
 __all__ = [
     'BANNER',
+    'CACHE_FOLDER',
     'COMMAND_DOCSTRING',
     'CONTIKI_FILES',
     'CONTIKI_FOLDER',
+    'CONTIKI_SNAPSHOTS',
+    'COOJA_BATCH',
     'COOJA_FOLDER',
     'DEBUG_FILES',
     'DEFAULTS',
     'EXPERIMENT_FOLDER',
     'EXPERIMENT_STRUCTURE',
     'FRAMEWORK_FOLDER',
+    'INDEX_FILE',
+    'JVM_HEAP',
+    'MEMORY_BUDGET',
     'MIN_TERM_SIZE',
     'PIDFILE',
     'REPORT_THEME',
+    'RUN_MODES',
     'SHORTCUT',
+    'STAGE_LIMITS',
+    'STAGE_MEMORY',
     'TASK_EXPIRATION',
     'TEMPLATES',
     'TEMPLATES_FOLDER',
+    'WATCHDOG',
 ]
 
 
@@ -41,6 +52,52 @@ try:
     EXPERIMENT_FOLDER = abspath(expanduser(confparser.get("RPL Attacks Framework Configuration", "experiments_folder")))
 except (configparser.NoOptionError, configparser.NoSectionError):
     EXPERIMENT_FOLDER = expanduser('~/Experiments')
+try:
+    CACHE_FOLDER = abspath(expanduser(confparser.get("RPL Attacks Framework Configuration", "cache_folder")))
+except (configparser.NoOptionError, configparser.NoSectionError):
+    CACHE_FOLDER = join(EXPERIMENT_FOLDER, '.cache')
+# index of the experiments folder (status and structure validity of the experiments and campaigns)
+INDEX_FILE = join(EXPERIMENT_FOLDER, '.index.json')
+try:
+    CONTIKI_SNAPSHOTS = confparser.getboolean("RPL Attacks Framework Configuration", "contiki_snapshots")
+except (configparser.NoOptionError, configparser.NoSectionError, ValueError):
+    CONTIKI_SNAPSHOTS = False
+# maximum numbers of concurrent tasks per stage of a campaign (compilations are bounded by the number of cores while
+#  Cooja simulations, each running its own JVM, are rather bounded by the available memory)
+STAGE_LIMITS = {'make': cpu_count(), 'simulate': max(1, cpu_count() // 2), 'parse': cpu_count(), 'report': cpu_count()}
+for stage, option in [('make', 'max_builds'), ('simulate', 'max_simulations')]:
+    try:
+        STAGE_LIMITS[stage] = max(1, confparser.getint("RPL Attacks Framework Configuration", option))
+    except (configparser.NoOptionError, configparser.NoSectionError, ValueError):
+        pass
+# memory budget (in MB) of a campaign run with the scheduler: tasks are only started if their estimated memory
+#  footprints fit in the budget (defaults to 80% of the physical memory)
+try:
+    MEMORY_BUDGET = max(1, confparser.getint("RPL Attacks Framework Configuration", "memory_budget"))
+except (configparser.NoOptionError, configparser.NoSectionError, ValueError):
+    try:
+        MEMORY_BUDGET = int(0.8 * sysconf('SC_PAGE_SIZE') * sysconf('SC_PHYS_PAGES') / 2 ** 20)
+    except (ValueError, OSError):
+        MEMORY_BUDGET = 4096
+# estimated memory footprints (in MB) of the tasks per stage ; for simulations, the footprint is the heap of the JVM
+#  running Cooja, that is, a base size increased per emulated mote (rounded up to 'step') plus the JVM overhead
+STAGE_MEMORY = {'make': 256, 'parse': 256, 'report': 256}
+JVM_HEAP = {'base': 256, 'per_mote': 8, 'step': 64, 'overhead': 128}
+# maximum number of simulations run one after the other in the same Cooja JVM (saving the startup of a JVM and
+#  the loading of Cooja per simulation) ; 0 (default) disables this experimental mode (each simulation runs in its own
+#  JVM), which also requires Cooja to be patched by 'setup' once enabled
+try:
+    COOJA_BATCH = max(0, confparser.getint("RPL Attacks Framework Configuration", "cooja_batch"))
+except (configparser.NoOptionError, configparser.NoSectionError, ValueError):
+    COOJA_BATCH = 0
+# watchdog of the Cooja simulations: a simulation is killed once its wall-clock time exceeds its budget, that is, its
+#  duration times the historical speed of Cooja (wall-clock seconds per simulated second and per mote, as a moving
+#  average weighted by 'alpha' and stored in the cache folder ; 'speed' is used until a simulation completes) times
+#  'margin', with a budget of at least 'minimum' seconds
+WATCHDOG = {'margin': 3.0, 'minimum': 300, 'speed': 0.1, 'alpha': 0.3}
+# modes of the 'run' commands: 'all' resumes from the first stale stage (see core.utils.stamps) while the other modes
+#  force the re-analysis of existing simulation data
+RUN_MODES = ['all', 'parse-only', 'report-only']
 del confparser
 if not exists(EXPERIMENT_FOLDER):
     makedirs(EXPERIMENT_FOLDER)
@@ -94,18 +151,26 @@ MAX_DIST_BETWEEN_MOTES = 50.0
 DEFAULTS = {
     "area-square-side": 200.0,
     "building-blocks": [],
+    "convergence-tolerance": 0.05,
+    "convergence-window": None,
     "duration": 600,
+    "event-log": False,
     "external-library": None,
     "goal": "",
     "transmission-range": MAX_DIST_BETWEEN_MOTES,
     "interference-range": None,  # set to 2 * transmission_range at parameter validation
+    "log-rpl": True,
+    "log-serial": True,
     "minimum-distance-from-root": MIN_DIST_BETWEEN_MOTES,
     "notes": "",
     "number-motes": 10,
+    "random-seed": None,
     "repeat": 1,
+    "screenshots": True,
     "target": "z1",
     "malicious-target": None,
     "title": "Default title",
+    "topology": "ring",
     "root": "dummy",
     "sensor": "dummy",
     "type": "sensor",
@@ -120,9 +185,9 @@ TEMPLATES = OrderedDict([
     ("motes/sensor.c", {}),
     ("motes/malicious.c", {}),
     ("Makefile", {"contiki": CONTIKI_FOLDER}),
-    ("script.js", {}),
+    ("script.js", {"buffer_size": 65536}),
     ("simulation.csc", {
-        "random_seed": "generate",
+        "random_seed": "generated",
         "success_ratio_tx": 1.0,
         "success_ratio_rx": 1.0,
         "mote_types": [
@@ -136,29 +201,40 @@ TEMPLATES = OrderedDict([
 EXPERIMENT_STRUCTURE = {
     "simulation.conf": False,
     "report.md": False,
+    "report.pdf": None,
+    "results": {"*": True},
+    ".stamps": {"*": True},
     "with-malicious": {
         "Makefile": False,
         "simulation.csc": False,
         "script.js": False,
-        "data": {},
+        "COOJA.log": None,
+        ".batch-status": None,
+        "data": {"*": True},
         "motes": {
             "Makefile": False,
             "root.*": False,
             "sensor.*": False,
             "malicious.*": False,
         },
+        "replicates": {"*": True},
         "results": {"*": True},
+        ".stamps": {"*": True},
     },
     "without-malicious": {
         "Makefile": False,
         "simulation.csc": False,
         "script.js": False,
-        "data": {},
+        "COOJA.log": None,
+        ".batch-status": None,
+        "data": {"*": True},
         "motes": {
             "root.*": False,
             "sensor.*": False,
         },
+        "replicates": {"*": True},
         "results": {"*": True},
+        ".stamps": {"*": True},
     },
 }
 
@@ -6,6 +6,7 @@ from core.conf.logconfig import logger
 
 __all__ = [
     'check_cooja',
+    'has_cooja_batch',
     'modify_cooja',
     'modify_ipv6_debug',
     'register_new_path_in_profile',
@@ -14,29 +15,50 @@ __all__ = [
 ]
 
 
-def check_cooja(cooja_dir):
+COOJA_SNIPPETS = [
+    ('if (args.length > 0 && args[0].startsWith("-hidden="))', 'src/Cooja.java.snippet'),
+]
+# the '-batch' case is experimental (not built yet against the Cooja revision of the Contiki submodule), it is then
+#  only installed if the batch mode is enabled (see COOJA_BATCH)
+COOJA_BATCH_SNIPPET = ('if (args.length > 0 && args[0].startsWith("-batch="))', 'src/Cooja.java.batch.snippet')
+
+
+def check_cooja(cooja_dir, batch=False):
     """
-    This function checks if Cooja.java already contains the required modification.
+    This function checks if Cooja.java already contains the required modifications.
 
     :param cooja_dir: Cooja's directory
-    :return: True if the modification is present else False
+    :param batch: whether the '-batch' case is required
+    :return: True if all the modifications are present else False
     """
-    pattern = 'if (args.length > 0 && args[0].startsWith("-hidden="))'
     with open(join(cooja_dir, 'java', 'org', 'contikios', 'cooja', 'Cooja.java')) as f:
         source = f.read()
-    for line in source.split('\n'):
-        if pattern in line:
-            return True
-    return False
+    return all(pattern in source for pattern, _ in COOJA_SNIPPETS + [COOJA_BATCH_SNIPPET] * batch)
+
+
+def has_cooja_batch(cooja_dir):
+    """
+    This function checks if Cooja.java contains the '-batch' case (for running a list of simulations in the same JVM).
+
+    :param cooja_dir: Cooja's directory
+    :return: True if the '-batch' case is present else False (also if Cooja.java cannot be read)
+    """
+    try:
+        with open(join(cooja_dir, 'java', 'org', 'contikios', 'cooja', 'Cooja.java')) as f:
+            return COOJA_BATCH_SNIPPET[0] in f.read()
+    except IOError:
+        return False
 
 
-def modify_cooja(cooja_dir):
+def modify_cooja(cooja_dir, batch=False):
     """
-    This function inserts a block in the IF statement for parsing Cooja's input arguments.
-    It searches for the IF statement pattern containing the '-nogui' case and inserts
-     an IF block for a new '-hidden' case (aimed to run a simulation with the GUI hidden).
+    This function inserts blocks in the IF statement for parsing Cooja's input arguments.
+    It searches for the IF statement pattern containing the '-nogui' case and inserts, if not present yet,
+     an IF block for a new '-hidden' case (aimed to run a simulation with the GUI hidden) and, if required, an IF
+     block for a new '-batch' case (aimed to run a list of simulations one after the other in the same JVM).
 
     :param cooja_dir: Cooja's directory
+    :param batch: whether the '-batch' case is to be inserted
     :return: None
     """
     pattern = 'if (args.length > 0 && args[0].startsWith("-nogui="))'
@@ -44,11 +66,15 @@ def modify_cooja(cooja_dir):
     changed = False
     with open(cooja_file) as f:
         source = f.read()
+    snippets = []
+    for snippet_pattern, snippet in [COOJA_BATCH_SNIPPET] * batch + COOJA_SNIPPETS:
+        if snippet_pattern not in source:
+            with open(snippet) as f:
+                snippets.append(f.read().strip())
     buffer = []
     for line in source.split('\n'):
-        if pattern in line:
-            with open('src/Cooja.java.snippet') as f:
-                line = line.replace(pattern, '{} else {}'.format(f.read().strip(), pattern))
+        if pattern in line and len(snippets) > 0:
+            line = line.replace(pattern, ' else '.join(snippets + [pattern]))
             changed = True
         buffer.append(line)
     with open(cooja_file, 'w') as f:
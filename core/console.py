@@ -5,8 +5,7 @@ from cmd import Cmd
 from copy import copy
 from funcsigs import signature
 from getpass import getuser
-from multiprocessing import cpu_count, Pool
-from signal import signal, SIGINT, SIG_IGN
+from multiprocessing import cpu_count
 from six.moves import zip_longest
 from socket import gethostname
 from sys import stdout
@@ -112,7 +111,8 @@ class FrameworkConsole(Console):
             processes = cpu_count()
             self.__last_tasklist = None
             self.tasklist = {}
-            self.pool = Pool(processes, lambda: signal(SIGINT, SIG_IGN))
+            # all the multi-processed tasks of the console share the same scheduler, hence the same memory budget
+            self.scheduler = CampaignScheduler(processes)
             atexit.register(self.graceful_exit)
         self.reexec = ['status']
         self.__bind_commands()
@@ -224,26 +224,26 @@ class FrameworkConsole(Console):
             return self.onecmd(self.lastcmd)
 
     def graceful_exit(self):
-        """ Exit handler for terminating the process pool gracefully. """
+        """ Exit handler for terminating the scheduler's process pool gracefully. """
         if 'PENDING' in [x['status'] for x in self.tasklist.values()]:
             logger.info(" > Waiting for opened processes to finish...")
             logger.warning("Hit CTRL+C a second time to force process termination.")
+            thread = self.scheduler.thread
             try:
-                for task_obj in self.tasklist.keys():
-                    # see: http://stackoverflow.com/questions/1408356/keyboard-interrupts-with-pythons-multiprocessing-pool
-                    #  "The KeyboardInterrupt exception won't be delivered until wait() returns, and it never returns,
-                    #   so the interrupt never happens. KeyboardInterrupt should almost certainly interrupt a condition
-                    #   wait. Note that this doesn't happen if a timeout is specified; cond.wait(1) will receive the
-                    #   interrupt immediately. So, a workaround is to specify a timeout."
-                    task_obj.task.get(999999)
-                self.pool.close()
-                #self.pool.join()
+                # see: http://stackoverflow.com/questions/1408356/keyboard-interrupts-with-pythons-multiprocessing-pool
+                #  "The KeyboardInterrupt exception won't be delivered until wait() returns, and it never returns,
+                #   so the interrupt never happens. KeyboardInterrupt should almost certainly interrupt a condition
+                #   wait. Note that this doesn't happen if a timeout is specified; cond.wait(1) will receive the
+                #   interrupt immediately. So, a workaround is to specify a timeout."
+                while thread is not None and thread.is_alive():
+                    thread.join(1)
             except KeyboardInterrupt:
                 logger.info(" > Terminating opened processes...")
                 for task_obj in self.tasklist.keys():
                     task_obj.kill()
-                self.pool.terminate()
-                self.pool.join()
+                self.scheduler.terminate()
+                if thread is not None:
+                    thread.join()
         if not self.already_running:
             os.remove(PIDFILE)
 
@@ -4,3 +4,10 @@ from helpers import *
 from parser import *
 from report import *
 from rpla import *
+from cache import *
+from scheduler import *
+from store import *
+from stamps import *
+from csc import *
+from timings import *
+from cooja import *
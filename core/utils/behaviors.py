@@ -3,6 +3,7 @@ import dill
 import os
 import signal
 import time
+from glob import glob
 from datetime import datetime, timedelta
 from multiprocessing import TimeoutError
 
@@ -13,6 +14,7 @@ from core.conf.logconfig import logger
 __all__ = [
     'DefaultCommand',
     'MultiprocessedCommand',
+    'ScheduledCommand',
 ]
 
 
@@ -27,8 +29,8 @@ class DefaultCommand(object):
         self.tasklist = console.tasklist
         self.command = command
         self.name = name
-        self.pids = ['{}/with{}-malicious/.{}'.format(path, x, command.__name__.lstrip('_')) for x in ["out", ""]] \
-                    if path is not None else []
+        self.pids = ['{}/with{}-malicious/{}.{}'.format(path, x, r, command.__name__.lstrip('_'))
+                     for x in ["out", ""] for r in ['', 'replicates/*/']] if path is not None else []
 
     def run(self, *args, **kwargs):
         return self.command(*args, **kwargs)
@@ -37,13 +39,15 @@ class DefaultCommand(object):
 class MultiprocessedCommand(DefaultCommand):
     """
     This class handles command multi-processing and is to be attached to a console through its constructor's
-     arguments.
+     arguments. The command is submitted to the scheduler of the console (see CampaignScheduler) so that all the
+     tasks of the console are admitted within the same memory budget.
     """
     is_multiprocessed = True
+    stages = {'remake': 'make'}  # stages of the commands for the scheduler (see STAGE_LIMITS)
 
     def __init__(self, console, command, name, path):
         super(MultiprocessedCommand, self).__init__(console, command, name, path)
-        self.pool = console.pool
+        self.scheduler = console.scheduler
         self.task = None
         self.tasklist[self] = {
             'name': name,
@@ -65,7 +69,7 @@ class MultiprocessedCommand(DefaultCommand):
 
     def callback(self, state):
         if isinstance(state, tuple):
-            self.__set_info(*state)
+            self.__set_info(*state, expires=state[0] != 'PENDING')
         else:
             self.__set_info('UNDEFINED', "None")
 
@@ -79,9 +83,10 @@ class MultiprocessedCommand(DefaultCommand):
                 self.__set_info('KILLED', "None")
             except (AttributeError, TimeoutError):
                 self.__set_info('CANCELLED', "None")
+                self.scheduler.cancel(str(self))  # occurs when the command is not submitted yet
             except UnicodeEncodeError:
                 self.__set_info('CRASHED', "None")
-            for pid in self.pids:
+            for pid in [p for pattern in self.pids for p in glob(pattern)]:
                 try:
                     with open(pid) as f:
                         os.kill(int(f.read().strip()), signal.SIGTERM)
@@ -102,4 +107,57 @@ class MultiprocessedCommand(DefaultCommand):
             kwargs.pop('console', None)  # console instance must be removed as it is unpickable and will thus make
             #                               apply_async fail
             kwargs['loglevel'] = logger.level  # logging level is appended to set it in the subprocess
-            self.task = self.pool.apply_async(self.command, args, kwargs, callback=self.callback)
+            name = self.command.__name__.lstrip('_')
+            self.scheduler.add(str(self), self.stages.get(name, name), self.command, args, kwargs, command=self)
+            self.scheduler.start()
+
+
+class ScheduledCommand(object):
+    """
+    This class represents a task of a campaign scheduler (see CampaignScheduler) in the list of tasks of a console so
+     that it can be followed with 'status' and killed with 'kill' like a multi-processed command.
+    """
+    is_multiprocessed = True
+
+    def __init__(self, console, name, stage, pids=()):
+        super(ScheduledCommand, self).__init__()
+        self.tasklist = console.tasklist
+        self.name = name
+        self.stage = stage
+        self.pids = pids
+        self.task = None
+        self.tasklist[self] = {
+            'name': name,
+            'command': stage,
+            'status': 'INIT',
+            'expires': None,
+            'result': 'Not defined yet',
+        }
+
+    def __str__(self):
+        return self.name if self.name.endswith(']') else '{}[{}]'.format(self.name, self.stage)
+
+    def callback(self, state):
+        self.set_info(*state)
+
+    def is_expired(self):
+        return datetime.now() > (self.tasklist[self]['expires'] or datetime.now())
+
+    def kill(self, *args, **kwargs):
+        for pid in [p for pattern in self.pids for p in glob(pattern)]:
+            try:
+                with open(pid) as f:
+                    os.kill(int(f.read().strip()), signal.SIGTERM)
+                os.remove(pid)
+            except (IOError, OSError):
+                pass  # simply fail silently when no PID or OS cannot kill it as it is already terminated
+        self.set_info('KILLED', "None")
+
+    def set_info(self, status, result=None):
+        # the task may already be removed from the list once expired, and a killed task keeps this status
+        if self not in self.tasklist.keys() or self.tasklist[self]['status'] == 'KILLED':
+            return
+        if status not in ('INIT', 'PENDING'):
+            logger.debug(' > Process {} is over.'.format(self))
+            self.tasklist[self]['expires'] = datetime.now() + timedelta(seconds=TASK_EXPIRATION)
+        self.tasklist[self].update({'status': status, 'result': result or self.tasklist[self]['result']})
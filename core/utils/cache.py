@@ -0,0 +1,191 @@
+# -*- coding: utf8 -*-
+import errno
+import sh
+import stat
+from hashlib import sha1
+from json import dumps
+from os import chmod, getpid, link, lstat, makedirs, remove, rename, walk
+from os.path import exists, join, split
+from shutil import copy2
+
+from core.common.helpers import copy_folder, link_folder, remove_folder
+from core.conf.constants import CACHE_FOLDER, CONTIKI_FOLDER, CONTIKI_SNAPSHOTS
+from core.conf.logconfig import logger
+
+
+__all__ = [
+    'deploy_contiki',
+    'get_binary_key',
+    'get_cached_binary',
+    'set_cached_binary',
+]
+
+
+BINARIES_FOLDER = join(CACHE_FOLDER, 'binaries')
+SNAPSHOTS_FOLDER = join(CACHE_FOLDER, 'contiki')
+# ContikiRPL folder, altered by apply_debug_flags and apply_replacements, hence copied instead of being linked
+CONTIKI_OVERLAY = ['core/net/rpl']
+contiki_revision = None
+
+
+# *********************************************** HASH FUNCTIONS ***********************************************
+def __hash_folder(h, path):
+    """
+    This private function updates a hash object with the relative paths and contents of all the files of a folder.
+
+    :param h: hash object
+    :param path: path to the folder to be hashed
+    """
+    for root, dirs, files in walk(path):
+        dirs.sort()
+        for fn in sorted(files):
+            h.update(join(root[len(path):], fn).encode('utf-8'))
+            with open(join(root, fn), 'rb') as f:
+                h.update(f.read())
+
+
+def get_contiki_revision():
+    """
+    This function retrieves the revision of the Contiki folder, including its uncommitted changes (e.g. those made
+     by the 'setup' command). The result is computed only once per process.
+
+    :return: revision string or None if the Contiki folder is not a Git repository
+    """
+    global contiki_revision
+    if contiki_revision is None:
+        try:
+            head = str(sh.git('rev-parse', 'HEAD', _cwd=CONTIKI_FOLDER)).strip()
+            diff = sha1(str(sh.git('diff', 'HEAD', _cwd=CONTIKI_FOLDER)).encode('utf-8')).hexdigest()
+            contiki_revision = '{}-{}'.format(head, diff)
+        except (sh.ErrorReturnCode, sh.CommandNotFound):
+            logger.warning("Contiki revision could not be determined ; the build cache is disabled")
+            contiki_revision = False
+    return contiki_revision or None
+
+
+def get_binary_key(motes_path, mote, target, debug, replacements=None, ext_lib=None):
+    """
+    This function computes the key of a mote binary in the build cache. It is based on the rendered C source and
+     Makefile, the Contiki revision, the target, the debug flags and, for the malicious mote, the replacements made
+     in ContikiRPL files and the content of the external library if any.
+
+    :param motes_path: path to the folder holding the rendered sources of the motes
+    :param mote: mote type name ('root', 'sensor' or 'malicious')
+    :param target: the mote's platform to be used for compilation
+    :param debug: debug flag applied to ContikiRPL files in DEBUG_FILES
+    :param replacements: dictionary of replacement entries applied to ContikiRPL files
+    :param ext_lib: path to the external RPL library
+    :return: hexadecimal key or None if the binary cannot be cached
+    """
+    revision = get_contiki_revision()
+    if revision is None:
+        return
+    h = sha1()
+    for fn in ['{}.c'.format(mote), 'Makefile']:
+        with open(join(motes_path, fn), 'rb') as f:
+            h.update(f.read())
+    h.update(dumps([revision, target, debug, replacements or {}], sort_keys=True).encode('utf-8'))
+    if ext_lib is not None:
+        __hash_folder(h, ext_lib)
+    return h.hexdigest()
+
+
+# *********************************************** CACHE FUNCTIONS **********************************************
+def get_cached_binary(key, *paths):
+    """
+    This function hard-links a binary from the build cache to the given paths (or copies it if the link is not
+     possible, e.g. across devices).
+
+    :param key: binary key in the build cache
+    :param paths: destination paths of the binary
+    :return: True if the binary was found in the cache, otherwise False
+    """
+    cached = join(BINARIES_FOLDER, key or '')
+    if key is None or not exists(cached):
+        return False
+    for path in paths:
+        if exists(path):
+            remove(path)
+        try:
+            link(cached, path)
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                raise
+            copy2(cached, path)
+    return True
+
+
+def set_cached_binary(key, path):
+    """
+    This function moves a freshly compiled binary into the build cache. The move is atomic so that concurrent
+     builds of the same binary cannot corrupt the cache.
+
+    :param key: binary key in the build cache
+    :param path: path to the compiled binary
+    :return: True if the binary was cached, otherwise False
+    """
+    if key is None:
+        return False
+    if not exists(BINARIES_FOLDER):
+        try:
+            makedirs(BINARIES_FOLDER)
+        except OSError:
+            pass  # occurs if another process just created the folder
+    tmp = join(BINARIES_FOLDER, '.{}.{}.tmp'.format(key, getpid()))
+    try:
+        rename(path, tmp)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        copy2(path, tmp)
+        remove(path)
+    rename(tmp, join(BINARIES_FOLDER, key))
+    return True
+
+
+# ********************************************** CONTIKI SNAPSHOTS *********************************************
+def get_contiki_snapshot(includes):
+    """
+    This function retrieves (and creates if necessary) a pristine snapshot of the reduced version of Contiki
+     defined by the given includes. The snapshot is made read-only so that any attempt to alter it through a hard
+     link fails instead of silently corrupting it.
+
+    :param includes: list of sub-folders and files to be included from the Contiki folder
+    :return: path to the Contiki snapshot or None if it cannot be created
+    """
+    revision = get_contiki_revision()
+    if revision is None:
+        return
+    key = sha1(dumps([revision, sorted(includes)]).encode('utf-8')).hexdigest()
+    snapshot = join(SNAPSHOTS_FOLDER, key)
+    if not exists(snapshot):
+        logger.debug(" > Creating Contiki snapshot...")
+        tmp = join(SNAPSHOTS_FOLDER, '.{}.{}.tmp'.format(key, getpid()))
+        copy_folder(CONTIKI_FOLDER, tmp, includes=includes)
+        for root, dirs, files in walk(tmp):
+            for fn in files:
+                mode = lstat(join(root, fn)).st_mode
+                if not stat.S_ISLNK(mode):
+                    chmod(join(root, fn), mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+        try:
+            rename(tmp, snapshot)
+        except OSError:
+            remove_folder(tmp)  # occurs if another process just created the same snapshot
+    return join(snapshot, split(CONTIKI_FOLDER)[-1])
+
+
+def deploy_contiki(path, includes):
+    """
+    This function deploys a reduced version of Contiki into the given folder. In snapshot mode (see
+     'contiki_snapshots' in the framework configuration), it is deployed as a thin overlay of a shared snapshot,
+     that is, a farm of hard links in which only the ContikiRPL folder is physically copied. Otherwise, the required
+     parts of the Contiki folder are simply copied.
+
+    :param path: destination folder
+    :param includes: list of sub-folders and files to be included from the Contiki folder
+    """
+    snapshot = get_contiki_snapshot(includes) if CONTIKI_SNAPSHOTS else None
+    if snapshot is None:
+        copy_folder(CONTIKI_FOLDER, path, includes=includes)
+    else:
+        link_folder(snapshot, join(path, split(CONTIKI_FOLDER)[-1]), copies=CONTIKI_OVERLAY)
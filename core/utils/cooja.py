@@ -0,0 +1,322 @@
+# -*- coding: utf8 -*-
+from collections import deque
+from contextlib import contextmanager
+from fcntl import flock, LOCK_EX, LOCK_UN
+from io import open as io_open
+from json import dumps, loads
+from os import getpid, killpg, makedirs, rename, setsid
+from os.path import abspath, exists, join
+from signal import SIGTERM
+from subprocess import Popen, PIPE, STDOUT
+from tempfile import mkdtemp
+from threading import Event, Timer
+
+from core.common.helpers import remove_files, remove_folder
+from core.conf.constants import CACHE_FOLDER, CONTIKI_FOLDER, COOJA_FOLDER, WATCHDOG
+from core.conf.logconfig import logger
+
+
+__all__ = [
+    'check_cooja_output',
+    'get_batch_status',
+    'get_simulation_budget',
+    'run_cooja',
+    'run_cooja_batch',
+    'update_cooja_speed',
+    'CoojaLog',
+    'SimulationTimeout',
+]
+
+
+BATCH_MARKER = '[RPLA-BATCH]'
+BATCH_STATUS = '.batch-status'
+COOJA_LOG = join('results', 'COOJA.log')
+FILTERED_LEVELS = ('DEBUG', 'TRACE')
+SPEED_FILE = join(CACHE_FOLDER, 'cooja-speed.json')
+
+
+class SimulationTimeout(Exception):
+    """ This exception is raised when a simulation exceeds its wall-clock budget (see get_simulation_budget). """
+    status = 'TIMEOUT'
+
+
+class CoojaLog(object):
+    """
+    This class classifies the lines of Cooja's output as they come: an error block starts with a line starting with
+     FATAL or ERROR and lasts up to the next INFO line, it is then logged. The lines are also written to a log file,
+     except the empty and the debug lines.
+
+    :param f: file object (opened in text mode) the filtered lines are written to (None for no log file)
+    :param report: log the error blocks
+    """
+    def __init__(self, f=None, report=True):
+        self.f, self.report, self.failed, self.__error, self.__buffer = f, report, False, False, []
+
+    def __flush(self):
+        if len(self.__buffer) > 0 and self.report:
+            logger.error('Cooja error:\n' + '\n'.join(self.__buffer))
+        self.__buffer = []
+
+    def feed(self, line):
+        """
+        Classify a line of Cooja's output.
+
+        :param line: line (without its trailing newline)
+        :return: True if an error occurred so far, otherwise False
+        """
+        stripped = line.strip()
+        if stripped.startswith("FATAL") or stripped.startswith("ERROR"):
+            self.__error, self.failed = True, True
+        elif stripped.startswith("INFO"):
+            self.__error = False
+            self.__flush()
+        if self.__error:
+            self.__buffer.append(line)
+        if self.f is not None and stripped != '' and not stripped.startswith(FILTERED_LEVELS):
+            self.f.write(line + u'\n')
+            self.f.flush()
+        return self.failed
+
+    def close(self):
+        """ Log the pending error block, if any. """
+        self.__flush()
+
+
+def __kill(process):
+    """
+    This private function kills a process started in its own session together with its children (e.g. the JVM
+     started in background by 'make run').
+
+    :param process: Popen object
+    """
+    try:
+        killpg(process.pid, SIGTERM)
+    except OSError:
+        pass
+
+
+def __lines(process):
+    """ This private generator yields the lines of the output of a process as they come, decoded. """
+    for line in iter(process.stdout.readline, b''):
+        yield line.decode('utf-8', 'replace').rstrip('\r\n')
+
+
+@contextmanager
+def __watchdog(process, timeout):
+    """
+    This private context manager kills a process started in its own session (see __kill) if it is still running
+     after the given time, then raises SimulationTimeout.
+
+    :param process: Popen object
+    :param timeout: wall-clock budget in seconds (None means no budget)
+    """
+    expired = Event()
+
+    def expire():
+        logger.warning(" > Cooja exceeded its budget of {:.0f} seconds, killing it...".format(timeout))
+        expired.set()
+        __kill(process)
+
+    timer = Timer(timeout, expire) if timeout else None
+    if timer is not None:
+        timer.daemon = True
+        timer.start()
+    try:
+        yield
+    finally:
+        if timer is not None:
+            timer.cancel()
+    if expired.is_set():
+        raise SimulationTimeout("Cooja exceeded its budget of {:.0f} seconds".format(timeout))
+
+
+def check_cooja_output(lines):
+    """
+    This function checks the output of Cooja for errors (see CoojaLog) and logs them.
+
+    :param lines: iterable of lines of Cooja's output (e.g. a log file)
+    :return: True if no error occurred, otherwise False
+    """
+    log = CoojaLog()
+    for line in lines:
+        log.feed(line.rstrip('\r\n'))
+    log.close()
+    return not log.failed
+
+
+def get_batch_status(sim_path):
+    """
+    This function gets the outcome of a simulation run in a batch of simulations (see run_cooja_batch).
+
+    :param sim_path: path to the simulation
+    :return: tuple (status, start, duration) with status 'OK' or 'FAIL' and start and duration in seconds, or None
+              if the simulation was not run in a batch
+    """
+    try:
+        with open(join(sim_path, BATCH_STATUS)) as f:
+            status, start, duration = f.read().split()
+        return status, int(start) / 1000., int(duration) / 1000.
+    except (IOError, OSError, ValueError):
+        return
+
+
+def __read_speed():
+    """ This private function reads the historical speed of Cooja (see WATCHDOG), if any. """
+    try:
+        with open(SPEED_FILE) as f:
+            return float(loads(f.read())['speed'])
+    except (IOError, OSError, KeyError, TypeError, ValueError):
+        return
+
+
+def get_simulation_budget(duration, n_motes):
+    """
+    This function computes the wall-clock budget of a simulation from its duration and the historical speed of
+     Cooja (see WATCHDOG).
+
+    :param duration: simulated duration in seconds
+    :param n_motes: number of emulated motes
+    :return: budget in seconds
+    """
+    speed = __read_speed() or WATCHDOG['speed']
+    return max(WATCHDOG['minimum'], WATCHDOG['margin'] * speed * duration * n_motes)
+
+
+def update_cooja_speed(wall, simulated, n_motes):
+    """
+    This function updates the historical speed of Cooja (an exponentially weighted moving average, see WATCHDOG)
+     with the speed of a completed simulation. As simulations may complete in parallel processes, this is made
+     under an exclusive lock.
+
+    :param wall: wall-clock duration of the simulation in seconds
+    :param simulated: simulated duration in seconds
+    :param n_motes: number of emulated motes
+    """
+    if wall <= 0 or simulated <= 0 or n_motes <= 0:
+        return
+    speed = float(wall) / (simulated * n_motes)
+    try:
+        if not exists(CACHE_FOLDER):
+            makedirs(CACHE_FOLDER)
+        with open(SPEED_FILE + '.lock', 'a') as lock:
+            flock(lock, LOCK_EX)
+            try:
+                previous = __read_speed()
+                if previous is not None:
+                    speed = WATCHDOG['alpha'] * speed + (1 - WATCHDOG['alpha']) * previous
+                tmp = '{}.{}.tmp'.format(SPEED_FILE, getpid())
+                with open(tmp, 'w') as f:
+                    f.write(dumps({'speed': speed}))
+                rename(tmp, SPEED_FILE)
+            finally:
+                flock(lock, LOCK_UN)
+    except (IOError, OSError) as e:
+        logger.warning(" > Speed of Cooja could not be recorded ({})".format(e))
+
+
+def run_cooja(sim_path, task='run', timeout=None):
+    """
+    This function runs a simulation in Cooja (see 'run' in the Makefile of the simulation) and streams its output:
+     the lines are classified as they come (see CoojaLog) and stored to ./results/COOJA.log, and Cooja is killed as
+     soon as an error shows up or once its wall-clock budget is exceeded (SimulationTimeout is then raised).
+
+    :param sim_path: path to the simulation
+    :param task: name of the task, used for the PID file of Cooja
+    :param timeout: wall-clock budget in seconds (see get_simulation_budget ; None means no budget)
+    :return: True if Cooja ran without error, otherwise False
+    """
+    if not exists(join(sim_path, 'results')):
+        makedirs(join(sim_path, 'results'))
+    # the simulation gets its own session so that Cooja, started in background by make, can be killed with it
+    process = Popen(['make', 'run', 'TASK={}'.format(task)], cwd=sim_path, stdout=PIPE, stderr=STDOUT,
+                    preexec_fn=setsid)
+    try:
+        with __watchdog(process, timeout), io_open(join(sim_path, COOJA_LOG), 'w', encoding='utf-8') as f:
+            log, killed = CoojaLog(f), False
+            for line in __lines(process):
+                if log.feed(line) and not killed:
+                    logger.debug(" > Cooja failed, killing the simulation...")
+                    __kill(process)
+                    killed = True
+            log.close()
+    except BaseException:
+        __kill(process)
+        raise
+    finally:
+        process.stdout.close()
+        process.wait()
+        # Cooja's own log (in the working directory) is superseded by the filtered one
+        remove_files(sim_path, '.{}'.format(task), 'COOJA.log')
+    return not log.failed
+
+
+def run_cooja_batch(sim_paths, heap, timeout=None, task='run'):
+    """
+    This function runs a list of simulations one after the other in a single Cooja JVM (see '-batch' in
+     src/Cooja.java.batch.snippet). Each simulation keeps its own data folder and gets its own Cooja log (streamed to
+     ./results/COOJA.log, see CoojaLog) and status (see get_batch_status). As for a single simulation (see 'run' in
+     its Makefile), the PID of the JVM is written to the PID file of the task in each simulation folder so that the
+     batch can be killed from any of its simulations.
+
+    :param sim_paths: list of paths to the simulations (i.e. folders holding a simulation.csc)
+    :param heap: heap size of the JVM in MB (i.e. the largest heap required by the simulations)
+    :param timeout: wall-clock budget of the whole batch in seconds (None means no budget ; SimulationTimeout is
+                     raised once exceeded)
+    :param task: name of the task, used for the PID files of Cooja
+    :return: True if Cooja ran the whole batch, otherwise False
+    """
+    sim_paths = [abspath(p) for p in sim_paths]
+    for sim_path in sim_paths:
+        remove_files(sim_path, BATCH_STATUS)
+        if not exists(join(sim_path, 'results')):
+            makedirs(join(sim_path, 'results'))
+    if not exists(CACHE_FOLDER):
+        makedirs(CACHE_FOLDER)
+    batch = mkdtemp(prefix='cooja-batch-', dir=CACHE_FOLDER)
+    try:
+        with open(join(batch, 'simulations.txt'), 'w') as f:
+            f.write('\n'.join(join(p, 'simulation.csc') for p in sim_paths))
+        logger.debug(" > Running {} simulations in a single Cooja JVM...".format(len(sim_paths)))
+        process = Popen(['java', '-mx{}m'.format(heap), '-jar', join(COOJA_FOLDER, 'dist', 'cooja.jar'),
+                         '-batch=simulations.txt', '-contiki={}'.format(CONTIKI_FOLDER)], cwd=batch, stdout=PIPE,
+                        stderr=STDOUT, preexec_fn=setsid)
+        for sim_path in sim_paths:
+            with open(join(sim_path, '.{}'.format(task)), 'w') as f:
+                f.write(str(process.pid))
+        # split the output of Cooja per simulation so that each one gets its own log ; the last lines out of any
+        #  simulation are kept for reporting a JVM that stops before the end of the batch
+        started, log, others = set(), None, deque(maxlen=50)
+        try:
+            with __watchdog(process, timeout):
+                for line in __lines(process):
+                    if line.startswith(BATCH_MARKER):
+                        event, sim_path = line[len(BATCH_MARKER):].strip().split(' ', 1)
+                        if log is not None:
+                            log.close()
+                            log.f.close()
+                            log = None
+                        if event == 'START':
+                            started.add(sim_path)
+                            # errors are reported by the task checking the outcome of the simulation
+                            log = CoojaLog(io_open(join(sim_path, COOJA_LOG), 'w', encoding='utf-8'), report=False)
+                    elif log is not None:
+                        log.feed(line)
+                    else:
+                        others.append(line)
+        except BaseException:
+            __kill(process)
+            raise
+        finally:
+            if log is not None:
+                log.close()
+                log.f.close()
+            process.stdout.close()
+            process.wait()
+            for sim_path in sim_paths:
+                remove_files(sim_path, '.{}'.format(task))
+        if len(started) < len(sim_paths):
+            logger.error(" > Cooja stopped before the end of the batch:\n" + '\n'.join(others))
+            return False
+        return True
+    finally:
+        remove_folder(batch)
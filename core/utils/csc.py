@@ -0,0 +1,82 @@
+# -*- coding: utf8 -*-
+from collections import OrderedDict
+from os import getpid, rename
+from re import compile as re_compile, DOTALL
+
+
+__all__ = [
+    'SimulationFile',
+]
+
+
+MOTE_BLOCK = re_compile(r'<mote>(?P<block>.*?)</mote>', DOTALL)
+MOTE_FIELDS = OrderedDict((f, re_compile(r'<{0}>(?P<value>[^<]*)</{0}>'.format(f)))
+                          for f in ['id', 'x', 'y', 'motetype_identifier'])
+
+
+class SimulationFile(object):
+    """
+    This class is a model of a Cooja simulation file (.csc), parsed once. The content is split into text chunks
+     where each mote coordinate has its own chunk, so that positions can be changed by mote id and the file
+     written back in a single pass, leaving the rest of the content untouched (byte for byte).
+
+    :param path: path to the simulation file
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path) as f:
+            content = f.read()
+        self.motes, slots = OrderedDict(), []
+        # note: the blocks without an <id> (e.g. the list of motes in the visualizer plugin's config) are ignored
+        for block in MOTE_BLOCK.finditer(content):
+            start, end = block.span('block')
+            fields = {f: r.search(content, start, end) for f, r in MOTE_FIELDS.items()}
+            if fields['id'] is None:
+                continue
+            mote_id = int(fields['id'].group('value'))
+            self.motes[mote_id] = {f: m.group('value').strip() for f, m in fields.items() if m is not None}
+            slots.extend((fields[c].span('value'), mote_id, c) for c in ['x', 'y'] if fields[c] is not None)
+        # split the content so that chunks with odd indices are coordinates
+        self.chunks, self.slots, last = [], {}, 0
+        for (start, end), mote_id, coord in sorted(slots):
+            self.chunks.append(content[last:start])
+            self.slots[(mote_id, coord)] = len(self.chunks)
+            self.chunks.append(content[start:end])
+            last = end
+        self.chunks.append(content[last:])
+
+    @property
+    def positions(self):
+        """ Dictionary with each mote id as the key and its tuple (x, y) as the value. """
+        return {i: (float(m['x']), float(m['y'])) for i, m in self.motes.items() if 'x' in m and 'y' in m}
+
+    def set_positions(self, motes):
+        """
+        Set the positions of the motes (the motes that are not in the simulation are ignored, e.g. the malicious
+         mote when updating the simulation without the malicious mote).
+
+        :param motes: dictionary with each mote id as the key and its tuple (x, y) as the value
+        :return: the number of changed coordinates
+        """
+        changed = 0
+        for mote_id, position in motes.items():
+            for coord, value in zip(['x', 'y'], position):
+                slot = self.slots.get((int(mote_id), coord))
+                if slot is None or self.chunks[slot].strip() == str(value):
+                    continue
+                self.chunks[slot] = self.motes[int(mote_id)][coord] = str(value)
+                changed += 1
+        return changed
+
+    def save(self, path=None):
+        """
+        Write the simulation file (through a temporary file which is then renamed so that Cooja never reads a
+         partially written file).
+
+        :param path: destination path (defaults to the path of the parsed file)
+        """
+        path = path or self.path
+        tmp = '{}.{}.tmp'.format(path, getpid())
+        with open(tmp, 'w') as f:
+            f.write(''.join(self.chunks))
+        rename(tmp, path)
@@ -1,8 +1,9 @@
 # -*- coding: utf8 -*-
 from cmd import Cmd
+from copy import deepcopy
 from funcsigs import signature
 from functools import update_wrapper, wraps
-from os import system
+from os import stat, system
 from os.path import dirname, exists, expanduser, join
 from re import match
 
@@ -14,6 +15,7 @@ from core.utils.behaviors import DefaultCommand, MultiprocessedCommand
 
 __all__ = [
     'command',
+    'mtime_cached',
     'no_arg_command',
     'no_arg_command_except',
     'stderr',
@@ -176,7 +178,9 @@ def command(**params):
 class CommandMonitor(object):
     """
     This ugly class decorator is aimed to make a function 'f' pickable (required for multiprocessing) while
-     using a decoration that handles exceptions and returns a tuple ([status], [result/error message]).
+     using a decoration that handles exceptions and returns a tuple ([status], [result/error message]). The status
+     of a failed task is 'FAIL' unless the raised exception defines its own (e.g. 'TIMEOUT' for SimulationTimeout) ;
+     a function returning False (e.g. when 'make' is aborted, after logging why) also fails.
 
     :param f: the decorated function
     """
@@ -189,9 +193,10 @@ class CommandMonitor(object):
 
     def __call__(self, *args, **kwargs):
         try:
-            return 'SUCCESS', self.f(*args, **kwargs) or 'No result'
+            result = self.f(*args, **kwargs)
+            return ('FAIL', "Aborted") if result is False else ('SUCCESS', result or 'No result')
         except Exception as e:
-            return 'FAIL', '{}: {}'.format(e.__class__.__name__, str(e))
+            return getattr(e, 'status', 'FAIL'), '{}: {}'.format(e.__class__.__name__, str(e))
 
 
 def no_arg_command(f):
@@ -253,3 +258,36 @@ def stderr(f):
                             .format(cmd, out.return_code) + '\n'.join(filtered))
             raise Exception("Command '{}' failed.".format(cmd))
     return wrapper
+
+
+# ***************************************** MEMOIZATION DECORATOR ******************************************
+def mtime_cached(*paths):
+    """
+    This decorator memoizes (per process and per arguments) the result of a function depending on the content of
+     some files or folders. The cached result is invalidated as soon as the modification time or the size of any of
+     these paths changes (for a folder, this happens when an entry is added, removed or renamed). A copy of the
+     result is returned so that callers cannot alter the cache.
+
+    :param paths: paths to the files and folders the function depends on
+    :return: the decorator function
+    """
+    def decorator(f):
+        cache = {}
+
+        def signature_of(path):
+            try:
+                s = stat(path)
+                return s.st_mtime, s.st_size
+            except OSError:
+                return
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            signatures = tuple(signature_of(path) for path in paths)
+            if key not in cache or cache[key][0] != signatures:
+                cache[key] = signatures, f(*args, **kwargs)
+            return deepcopy(cache[key][1])
+        wrapper.cache = cache
+        return wrapper
+    return decorator
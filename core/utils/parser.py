@@ -1,88 +1,275 @@
 # -*- coding: utf8 -*-
 import networkx
 import numpy
-from csv import DictReader, DictWriter
+from csv import DictWriter, writer as writer_
 from matplotlib import pyplot
 from matplotlib.patches import FancyArrowPatch
-from os.path import basename, join, normpath
-from re import finditer, match, MULTILINE
-from subprocess import Popen, PIPE
+from os.path import exists, getsize, join, normpath, sep
+from re import compile as re_compile, match
+from subprocess import Popen
 
-from core.utils.rpla import get_available_platforms, get_motes_from_simulation
+from core.conf.logconfig import logger
+from core.utils.rpla import get_available_platforms, get_motes_from_simulation, list_replicates
+from core.utils.store import read_results, write_results
 
 
 __all__ = [
+    'aggregate_replicates',
+    'draw_network',
+    'get_power_averages',
+    'get_power_series',
+    'get_powertracker_results',
+    'get_simulated_duration',
     'parsing_chain',
+    'read_events',
 ]
 
 
 # *************************************** MAIN PARSING FUNCTION ****************************************
 def parsing_chain(path):
     convert_pcap_to_csv(path)
-    convert_powertracker_log_to_csv(path)
+    write_results(path, 'powertracker', convert_powertracker_log_to_csv(path, as_array=True))
     draw_dodag(path)
     draw_power_barchart(path)
 
 
+# ********************************** REPLICATES AGGREGATION FUNCTION ***********************************
+# two-sided 95% quantiles of Student's t-distribution for 1 to 30 degrees of freedom (normal quantile beyond)
+T_QUANTILES_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228, 2.201, 2.179, 2.160, 2.145,
+                  2.131, 2.120, 2.110, 2.101, 2.093, 2.086, 2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048,
+                  2.045, 2.042]
+
+
+def aggregate_replicates(path):
+    """
+    This function aggregates the power tracking results of the replicates of a simulation into a CSV file (to
+     ./results) holding, for each mote, the mean over the replicates of the average times and their 95% confidence
+     intervals.
+
+    :param path: path to the experiment (including [with-|without-malicious])
+    """
+    items = ['on', 'tx', 'rx', 'int']
+    replicates = list_replicates(path)
+    # compute the average times per mote for each replicate
+    averages = {}
+    for replicate in replicates:
+        for mid, average in zip(*get_power_averages(replicate, items)):
+            averages.setdefault(int(mid), []).append(average)
+    fields = ['mote_id', 'replicates'] + ['{}_time_{}'.format(i, s) for i in items for s in ['mean', 'ci95']]
+    with open(join(path, 'results', 'powertracker-replicates.csv'), 'w') as f:
+        writer = DictWriter(f, delimiter=',', fieldnames=fields)
+        writer.writeheader()
+        for mid, values in sorted(averages.items(), key=lambda x: x[0]):
+            values, n = numpy.array(values), len(values)
+            means = values.mean(axis=0)
+            t = T_QUANTILES_95[n - 2] if n - 1 <= len(T_QUANTILES_95) else 1.96
+            cis = t * values.std(axis=0, ddof=1) / numpy.sqrt(n) if n > 1 else numpy.zeros(len(items))
+            row = {'mote_id': mid, 'replicates': n}
+            for i, item in enumerate(items):
+                row['{}_time_mean'.format(item)], row['{}_time_ci95'.format(item)] = means[i], cis[i]
+            writer.writerow(row)
+
+
 # *********************************** SIMULATION PARSING FUNCTIONS *************************************
+PCAP_FIELDS = ['frame.time', 'frame.len', 'wpan.src64', 'wpan.dst64', 'icmpv6.type', 'ipv6.src', 'ipv6.dst',
+               'icmpv6.code', 'data.data']
+
+
 def convert_pcap_to_csv(path):
     """
     This function creates a CSV file (to ./results) from a PCAP file (from ./data).
     This is inspired from https://github.com/sieben/makesense/blob/master/makesense/parser.py.
 
+    The output of tshark is streamed to the CSV file so that memory remains bounded regardless the size of the
+     capture.
+
     :param path: path to the experiment (including [with-|without-malicious])
     """
     data, results = join(path, 'data'), join(path, 'results')
+    pcap = join(data, 'output.pcap')
+    cmd = ['tshark', '-T', 'fields', '-E', 'header=y', '-E', 'separator=,']
+    for field in PCAP_FIELDS:
+        cmd.extend(['-e', field])
     with open(join(results, 'pcap.csv'), 'wb') as f:
-        p = Popen(['tshark',
-                   '-T', 'fields',
-                   '-E', 'header=y',
-                   '-E', 'separator=,',
-                   '-e', 'frame.time',
-                   '-e', 'frame.len',
-                   '-e', 'wpan.src64',
-                   '-e', 'wpan.dst64',
-                   '-e', 'icmpv6.type',
-                   '-e', 'ipv6.src',
-                   '-e', 'ipv6.dst',
-                   '-e', 'icmpv6.code',
-                   '-e', 'data.data',
-                   '-r', join(data, 'output.pcap')], stdout=PIPE)
-        out, _ = p.communicate()
-        f.write(out)
+        p = Popen(cmd + ['-r', pcap], stdout=f)
+        if p.wait() != 0:
+            logger.warning("tshark returned error code {} while converting {}".format(p.returncode, pcap))
+
+
+# fixed-width records of the binary event log written by the simulation script (Java's DataOutputStream writes
+#  big-endian values)
+EVENT_DTYPE = numpy.dtype([('time', '>i8'), ('mote_id', '>i4'), ('type', '>i4'), ('values', '>i8', (5, ))])
+EVENT_TYPES = {'relationship': 1, 'power': 2}
+
+
+def read_events(path, event_type=None):
+    """
+    This function memory-maps the binary event log (from ./data) written by the simulation script when 'event-log'
+     is enabled. An eventual incomplete trailing record (e.g. if the simulation was interrupted) is ignored.
+
+    :param path: path to the experiment (including [with-|without-malicious])
+    :param event_type: name of the type of events to be selected (see EVENT_TYPES ; None means all the events)
+    :return: array of records formatted as EVENT_DTYPE or None if there is no event log
+    """
+    events = join(path, 'data', 'events.bin')
+    if not exists(events):
+        return
+    n = getsize(events) // EVENT_DTYPE.itemsize
+    records = numpy.memmap(events, dtype=EVENT_DTYPE, mode='r', shape=(n, )) if n > 0 else \
+        numpy.zeros(0, dtype=EVENT_DTYPE)
+    return records if event_type is None else records[records['type'] == EVENT_TYPES[event_type]]
 
 
 PT_ITEMS = ['monitored', 'on', 'tx', 'rx', 'int']
-PT_REGEX = r'^({})_(?P<mote_id>\d+) {} (?P<{}>\d+)'
+PT_REGEX = r'^(?:{})_(?P<mote_id>\d+) (?P<item>{}) (?P<time>\d+)'
+PT_DTYPE = [('mote_id', 'i4'), ('sample', 'i4')] + [('{}_time'.format(it), 'f8') for it in PT_ITEMS]
+
+
+def parse_powertracker_log(path):
+    """
+    This generator parses a PowerTracker log file (from ./data) line by line in a single pass and yields one record
+     per mote and per sample once all the items of this record are collected. An incomplete record (e.g. due to a
+     missing line) is dropped instead of misaligning the next ones.
+
+    :param path: path to the experiment (including [with-|without-malicious])
+    :return: tuples formatted as (mote_id, sample, monitored_time, on_time, tx_time, rx_time, int_time) with times
+              in seconds
+    """
+    platforms = [p.capitalize() for p in get_available_platforms()]
+    regex = re_compile(PT_REGEX.format('|'.join(platforms), '|'.join(it.upper() for it in PT_ITEMS)))
+    records, samples = {}, {}
+    with open(join(path, 'data', 'powertracker.log')) as f:
+        for line in f:
+            m = regex.match(line)
+            if m is None:
+                continue
+            mote_id, item = int(m.group('mote_id')), m.group('item').lower()
+            record = records.setdefault(mote_id, {})
+            if item in record.keys():
+                logger.warning("Incomplete PowerTracker record for mote {} (dropped)".format(mote_id))
+                record.clear()
+            record[item] = int(m.group('time')) / 10.0 ** 6
+            if len(record) == len(PT_ITEMS):
+                samples[mote_id] = samples.get(mote_id, -1) + 1
+                yield tuple([mote_id, samples[mote_id]] + [record[it] for it in PT_ITEMS])
+                record.clear()
+
+
+def parse_power_events(path):
+    """
+    This function gets the power tracking records from the binary event log (from ./data), if any.
+
+    :param path: path to the experiment (including [with-|without-malicious])
+    :return: array of records formatted as PT_DTYPE or None if there is no event log
+    """
+    power = read_events(path, 'power')
+    if power is None:
+        return
+    records = numpy.zeros(len(power), dtype=PT_DTYPE)
+    records['mote_id'] = power['mote_id']
+    # the sample number of a record is its rank amongst the records of the same mote
+    order = numpy.argsort(records['mote_id'], kind='mergesort')
+    ids = records['mote_id'][order]
+    records['sample'][order] = numpy.arange(len(ids)) - numpy.searchsorted(ids, ids)
+    for i, it in enumerate(PT_ITEMS):
+        records['{}_time'.format(it)] = power['values'][:, i] / 10.0 ** 6
+    return records
 
 
-def convert_powertracker_log_to_csv(path):
+def convert_powertracker_log_to_csv(path, as_array=False):
     """
     This function creates a CSV file (to ./results) from a PowerTracker log file (from ./data).
     This is inspired from https://github.com/sieben/makesense/blob/master/makesense/parser.py.
 
+    The log file is streamed (see parse_powertracker_log) and the CSV file is written incrementally. If the binary
+     event log is present (see read_events), it is used instead.
+
     :param path: path to the experiment (including [with-|without-malicious])
+    :param as_array: if True, the parsed records are also returned as a NumPy structured array (see PT_DTYPE)
+    :return: the parsed records if as_array is True, otherwise None
     """
-    platforms = [p.capitalize() for p in get_available_platforms()]
-    data, results = join(path, 'data'), join(path, 'results')
-    with open(join(data, 'powertracker.log')) as f:
-        log = f.read()
-    iterables, fields = [], ['mote_id']
-    for it in PT_ITEMS:
-        time_field = '{}_time'.format(it)
-        iterables.append(finditer(PT_REGEX.format('|'.join(platforms), it.upper(), time_field), log, MULTILINE))
-        fields.append(time_field)
-    with open(join(results, 'powertracker.csv'), 'w') as f:
-        writer = DictWriter(f, delimiter=',', fieldnames=fields)
-        writer.writeheader()
-        for matches in zip(*iterables):
-            row = {}
-            for m in matches:
-                row.update((k, int(v)) for k, v in m.groupdict().items())
-            for it in PT_ITEMS:
-                time_field = '{}_time'.format(it)
-                row[time_field] = float(row[time_field] / 10 ** 6)
+    fields, rows = [f for f, _ in PT_DTYPE], []
+    with open(join(path, 'results', 'powertracker.csv'), 'w') as f:
+        writer = writer_(f, delimiter=',')
+        writer.writerow(fields)
+        records = parse_power_events(path)
+        if records is not None:
+            writer.writerows(records.tolist())
+            return records if as_array else None
+        for row in parse_powertracker_log(path):
             writer.writerow(row)
+            if as_array:
+                rows.append(row)
+    if as_array:
+        return numpy.array(rows, dtype=PT_DTYPE)
+
+
+def get_powertracker_results(path):
+    """
+    This function gets the power tracking results of a simulation from the columnar results store (see
+     core.utils.store). If they were not stored yet (e.g. for an experiment parsed by a former version), they are
+     parsed once from the PowerTracker log and then stored.
+
+    :param path: path to the experiment (including [with-|without-malicious])
+    :return: dictionary of memory-mapped arrays with the fields of PT_DTYPE as keys
+    """
+    columns = read_results(path, 'powertracker')
+    if columns is None:
+        write_results(path, 'powertracker', convert_powertracker_log_to_csv(path, as_array=True))
+        columns = read_results(path, 'powertracker')
+    return columns
+
+
+def get_power_averages(path, items=('on', 'tx', 'rx', 'int')):
+    """
+    This function computes the average power tracking times per mote, each mote being averaged over its own number
+     of samples (these can differ between motes, e.g. if some records were dropped).
+
+    :param path: path to the experiment (including [with-|without-malicious])
+    :param items: PowerTracker items to be averaged (see PT_ITEMS)
+    :return: the sorted array of mote ids and the array of averages (one row per mote, one column per item)
+    """
+    pt = get_powertracker_results(path)
+    ids = numpy.asarray(pt['mote_id'])
+    counts = numpy.bincount(ids)
+    motes = numpy.flatnonzero(counts)
+    sums = numpy.column_stack([numpy.bincount(ids, weights=pt[i + '_time'], minlength=len(counts)) for i in items]) \
+        if len(ids) > 0 else numpy.zeros((0, len(items)))
+    return motes, sums[motes] / counts[motes][:, None]
+
+
+def get_power_series(path, item='on'):
+    """
+    This function gets the time series of a power tracking item per mote. Motes with less samples than the others
+     have their series padded with NaN's.
+
+    :param path: path to the experiment (including [with-|without-malicious])
+    :param item: PowerTracker item (see PT_ITEMS)
+    :return: the sorted array of mote ids and the array of series (one row per mote, one column per sample)
+    """
+    pt = get_powertracker_results(path)
+    motes, rows = numpy.unique(pt['mote_id'], return_inverse=True)
+    samples = numpy.asarray(pt['sample'])
+    series = numpy.full((len(motes), samples.max() + 1 if len(samples) > 0 else 0), numpy.nan)
+    series[rows, samples] = pt[item + '_time']
+    return motes, series
+
+
+def get_simulated_duration(path):
+    """
+    This function gets the actual simulated duration of a simulation (from ./data/convergence.log), recorded by the
+     simulation script when it ends, that is, at TIMEOUT or once the network reached a steady state (if
+     'convergence-window' is set).
+
+    :param path: path to the experiment (including [with-|without-malicious])
+    :return: tuple (duration in seconds, True if the simulation ended at steady state) or None if not recorded
+    """
+    try:
+        with open(join(path, 'data', 'convergence.log')) as f:
+            duration, state = f.read().split()
+        return float(duration) / 1000.0, state == 'CONVERGED'
+    except (IOError, OSError, ValueError):
+        return
 
 
 RELATIONSHIP_REGEX = r'^\d+\s+ID\:(?P<mote_id>\d+)\s+#L\s+(?P<parent_id>\d+)\s+(?P<flag>\d+)$'
@@ -95,14 +282,31 @@ def draw_dodag(path):
 
     :param path: path to the experiment (including [with-|without-malicious])
     """
+    draw_network(path, 'dodag.png')
+
+
+def draw_network(path, filename, with_edges=True):
+    """
+    This function draws the WSN (to ./results) from the list of motes (from ./simulation.csc) and, if required, the
+     last known parent of each mote (from ./data/relationships.log). This is e.g. used for drawing the WSN
+     configuration when screenshots are disabled in Cooja.
+
+    :param path: path to the experiment (including [with-|without-malicious])
+    :param filename: name of the output image
+    :param with_edges: specify whether the edges of the DODAG are to be drawn
+    """
     pyplot.clf()
-    with_malicious = (basename(normpath(path)) == 'with-malicious')
+    # the path can also be the one of a replicate (i.e. [with-|without-malicious]/replicates/[number])
+    with_malicious = 'with-malicious' in normpath(path).split(sep)
     data, results = join(path, 'data'), join(path, 'results')
-    with open(join(data, 'relationships.log')) as f:
-        relationships = f.read()
-    # first, check if the mote relationships were recorded
-    if len(relationships.strip()) == 0:
-        return
+    relationships, events = '', read_events(path, 'relationship')
+    if with_edges:
+        if events is None:
+            with open(join(data, 'relationships.log')) as f:
+                relationships = f.read()
+        # first, check if the mote relationships were recorded
+        if len(relationships.strip()) == 0 and (events is None or len(events) == 0):
+            return
     # retrieve motes and their colors
     dodag = networkx.DiGraph()
     motes = get_motes_from_simulation(join(path, 'simulation.csc'))
@@ -124,45 +328,38 @@ def draw_dodag(path):
             edges[mote] = parent
         except AttributeError:
             continue
+    if with_edges and events is not None:
+        for mote, (parent, flag) in zip(events['mote_id'], events['values'][:, :2]):
+            if flag != 0:
+                edges[int(mote)] = int(parent)
     # now, fill in the graph with edges
     dodag.add_edges_from(edges.items())
     # finally, draw the graph
     networkx.draw(dodag, motes, node_color=colors, with_labels=True)
-    pyplot.savefig(join(results, 'dodag.png'), arrow_style=FancyArrowPatch)
+    pyplot.savefig(join(results, filename), arrow_style=FancyArrowPatch)
 
 
 def draw_power_barchart(path):
     """
-    This function plots the average power tracking data from the CSV at:
-     [EXPERIMENT]/[with-|without-malicious]/results/powertracker.csv
+    This function plots the average power tracking data from the columnar results store at:
+     [EXPERIMENT]/[with-|without-malicious]/results/powertracker/
 
     :param path: path to the experiment (including [with-|without-malicious])
     :return:
     """
     pyplot.clf()
     items = ['on', 'tx', 'rx', 'int']
-    series = {i: [] for i in items}
-    averages, c = {}, 0
-    with open(join(path, 'results', 'powertracker.csv')) as f:
-        for row in DictReader(f):
-            mid = int(row['mote_id'])
-            averages.setdefault(mid, {i: 0.0 for i in items})
-            for s, k in zip(items, [i + '_time' for i in items]):
-                averages[mid][s] += float(row[k])
-            c += 1
-    n = len(averages)
-    ind = numpy.arange(n)
-    c //= n
-    averages = {mid: {k: v / c for k, v in avg.items()} for mid, avg in averages.items()}
-    for mid, avg in sorted(averages.items(), key=lambda x: x[0]):
-        for k, v in series.items():
-            v.append(avg[k])
+    motes, averages = get_power_averages(path, items)
+    if len(motes) == 0:
+        logger.warning("No power tracking data to be plotted in {}".format(path))
+        return
+    ind = numpy.arange(len(motes))
     width = 0.5
     plots = []
-    for s, color in zip(items, ['r', 'b', 'g', 'y']):
-        plots.append(pyplot.bar(ind, series[s], width, color=color))
+    for j, color in enumerate(['r', 'b', 'g', 'y']):
+        plots.append(pyplot.bar(ind, averages[:, j], width, color=color))
     pyplot.title("Power tracking per mote")
-    pyplot.xticks(ind + width / 2., tuple(sorted(averages.keys())))
+    pyplot.xticks(ind + width / 2., tuple(motes))
     pyplot.yticks(numpy.arange(0, 31, 10))
     pyplot.ylabel("Consumed power (%)")
     pyplot.legend((p[0] for p in plots), (i.upper() for i in items))
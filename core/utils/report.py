@@ -1,5 +1,10 @@
 # -*- coding: utf8 -*-
 import markdown2pdf
+from os.path import join
+
+from core.common.helpers import remove_files
+from core.utils.parser import get_simulated_duration
+from core.utils.rpla import list_replicates
 
 
 __all__ = [
@@ -7,14 +12,47 @@ __all__ = [
 ]
 
 
+DURATIONS_MARKER = '<!-- simulated-durations -->'
+
+
+def __durations_table(path):
+    """
+    This private function builds the Markdown table of the actual simulated durations of the simulations of an
+     experiment and of their replicates (see get_simulated_duration).
+
+    :param path: path to the experiment
+    :return: Markdown table
+    """
+    table = ["Simulation | Replicate | Simulated duration | Steady state", "--- | --- | --- | ---"]
+    for sim in ["without", "with"]:
+        for i, replicate in enumerate(list_replicates(join(path, "{}-malicious".format(sim))), 1):
+            duration = get_simulated_duration(replicate)
+            table.append("{} the malicious mote | {} | {} | {}".format(
+                sim.capitalize(), i, "n/a" if duration is None else "{:.1f} seconds".format(duration[0]),
+                "n/a" if duration is None else ["not reached", "reached"][duration[1]]))
+    return '\n'.join(table)
+
+
 def generate_report(path, theme=None):
     """
-    This function generates a PDF report from [EXPERIMENT]/report.md.
+    This function generates a PDF report from [EXPERIMENT]/report.md, filling in the results only known once the
+     simulations are over (i.e. the actual simulated durations).
 
     :param path: path to the experiment
     :return:
     """
-    #markdown2pdf.convert_md_2_pdf(filename, output=None, theme=None)
-    markdown2pdf.convert_md_2_pdf(join(path, 'report.md'),
-                                  join(path, 'report.pdf'),
-                                  theme)
+    with open(join(path, 'report.md')) as f:
+        report = f.read()
+    source = join(path, 'report.md')
+    if DURATIONS_MARKER in report:
+        source = join(path, '.report.md')
+        with open(source, 'w') as f:
+            f.write(report.replace(DURATIONS_MARKER, __durations_table(path)))
+    try:
+        #markdown2pdf.convert_md_2_pdf(filename, output=None, theme=None)
+        markdown2pdf.convert_md_2_pdf(source,
+                                      join(path, 'report.pdf'),
+                                      theme)
+    finally:
+        if source != join(path, 'report.md'):
+            remove_files(path, '.report.md')
@@ -1,36 +1,54 @@
 # -*- coding: utf8 -*-
 from copy import deepcopy
 from jinja2 import Environment, FileSystemLoader
+from json import dumps, loads
 from math import sqrt
-from os import listdir, makedirs, rename
-from os.path import basename, dirname, exists, expanduser, isdir, isfile, join, split, splitext
-from re import findall, finditer, search, sub, DOTALL, MULTILINE
+from multiprocessing import cpu_count, Pool
+from os import getpid, listdir, makedirs, rename, stat, symlink
+from os.path import basename, dirname, exists, expanduser, isdir, join, normpath, pardir, split, splitext
+from re import findall
 from six import string_types
 
 from core.common.helpers import *
-from core.common.wsngenerator import generate_motes
+from core.common.wsngenerator import generate_motes, get_unreachable_motes, TOPOLOGIES
 from core.conf.constants import *
 from core.conf.logconfig import logger
+from core.utils.csc import SimulationFile
+from core.utils.decorators import mtime_cached
+from core.utils.scheduler import get_jvm_heap, init_worker
+from core.utils.stamps import get_stamp, STAMPS_FOLDER
 
 
 __all__ = [
     'apply_debug_flags',
     'apply_replacements',
+    'check_connectivity',
     'check_structure',
     'get_motes_from_simulation',
     'set_motes_to_simulation',
+    'set_motes_to_simulations',
     'get_contiki_includes',
+    'get_experiment_status',
     'get_experiments',
+    'get_index',
     'get_path',
+    'get_random_seeds',
     'list_campaigns',
     'list_experiments',
+    'list_replicates',
     'render_campaign',
     'render_templates',
+    'update_index',
     'validated_parameters',
 ]
 
 
+# below this number of simulation files, these are updated sequentially (not worth starting a process pool)
+MIN_FILES_PER_POOL = 8
+
+
 # *********************************************** GET FUNCTIONS ************************************************
+@mtime_cached(join(CONTIKI_FOLDER, 'platform'))
 def get_available_platforms():
     """
     This function retrieves the list of available platforms from the Contiki directory.
@@ -44,6 +62,7 @@ def get_available_platforms():
     return platforms
 
 
+@mtime_cached(join(TEMPLATES_FOLDER, 'building-blocks.json'))
 def get_building_blocks():
     """
     This function retrieves the list of available building blocks for the malicious mote.
@@ -59,7 +78,8 @@ def get_constants_and_replacements(blocks):
     This function retrieves the constants and replacements corresponding to the building blocks provided in input.
 
     :param blocks: input building blocks
-    :return: corresponding constants and replacements to be made in ContikiRPL files
+    :return: corresponding constants and replacements to be made in ContikiRPL files (as a dictionary with the
+              filenames as keys and lists of [source_line, destination_line] as values)
     """
     available_blocks = get_building_blocks()
     constants, replacements = {}, {}
@@ -71,13 +91,16 @@ def get_constants_and_replacements(blocks):
                     logger.warning(" > Building-block '{}': '{}' is already set to {}".format(block, key, value))
                 else:
                     constants[key] = value
-            # else, it is a replacement in a file, e.g. {"rpl-icmp6.c": ["dag->version", "dag->version++"]}
+            # else, it is a replacement in a file, e.g. {"rpl-icmp6.c": ["dag->version", "dag->version++"]} or a list
+            #  of such replacements ; the replacements of all the blocks are merged per file so that each file is
+            #  processed once
             else:
-                if key in replacements.keys() and value[0] in [srcl for srcl, dstl in replacements.values()]:
-                    logger.warning(" > Building-block '{}': line '{}' is already replaced in {}"
-                                   .format(block, value[0], key))
-                else:
-                    replacements[key] = value
+                for srcl, dstl in value if isinstance(value[0], list) else [value]:
+                    if srcl in [s for s, d in replacements.get(key, [])]:
+                        logger.warning(" > Building-block '{}': line '{}' is already replaced in {}"
+                                       .format(block, srcl, key))
+                    else:
+                        replacements.setdefault(key, []).append([srcl, dstl])
     return constants, replacements
 
 
@@ -164,20 +187,10 @@ def get_motes_from_simulation(simfile, as_dictionary=True):
     :return: the list of motes formatted as dictionaries with 'id', 'x', 'y' and 'motetype_identifier' keys if
               short is False or a dictionary with each mote id as the key and its tuple (x, y) as the value
     """
-    motes = []
-    with open(simfile) as f:
-        content = f.read()
-    iterables, fields = [], ['mote_id']
-    for it in ['id', 'x', 'y', 'motetype_identifier']:
-        iterables.append(finditer(r'^\s*<{0}>(?P<{0}>.*)</{0}>\s*$'.format(it), content, MULTILINE))
-    for matches in zip(*iterables):
-        mote = {}
-        for m in matches:
-            mote.update(m.groupdict())
-        motes.append(mote)
+    simulation = SimulationFile(simfile)
     if as_dictionary:
-        motes = {int(m['id']): (float(m['x']), float(m['y'])) for m in motes}
-    return motes
+        return simulation.positions
+    return list(simulation.motes.values())
 
 
 def get_parameter(dictionary, section, key, condition, reason=None, default=None):
@@ -193,7 +206,10 @@ def get_parameter(dictionary, section, key, condition, reason=None, default=None
     :return: validated parameter
     """
     silent = dictionary.pop('silent', False)
-    param = (dictionary.get(section) or {}).get(key) or DEFAULTS.get(key)
+    param = (dictionary.get(section) or {}).get(key)
+    # note: a falsy value (e.g. false for a boolean parameter) must not be replaced by the default value
+    if param is None:
+        param = DEFAULTS.get(key)
     if param is None and default is not None:
         param = default
     if isinstance(condition, list) and isinstance(param, list):
@@ -229,29 +245,56 @@ def get_path(*args, **kwargs):
     return path
 
 
+def get_random_seeds(params):
+    """
+    This function computes the random seeds of the replicates of a simulation. When the simulation is not repeated,
+     the seed is either the one specified or generated by Cooja. Otherwise, replicates get distinct deterministic
+     seeds starting from the specified seed (or from 1 if not specified).
+
+    :param params: dictionary of validated parameters
+    :return: list of random seeds (one per replicate)
+    """
+    if params["repeat"] == 1:
+        return [params.get("random_seed") or TEMPLATES["simulation.csc"]["random_seed"]]
+    return [(params.get("random_seed") or 1) + i for i in range(params["repeat"])]
+
+
 # *********************************************** LIST FUNCTIONS ***********************************************
 def list_campaigns():
     """
-    This function gets the list of existing simulation campaign JSON files.
+    This function gets the list of existing simulation campaign JSON files (from the index of the experiments
+     folder, see get_index).
 
     :return: list of JSON files
     """
-    return sorted([basename(f) for f in listdir(EXPERIMENT_FOLDER)
-                   if isfile(join(EXPERIMENT_FOLDER, f)) and f.endswith('.json') and
-                   is_valid_commented_json(join(EXPERIMENT_FOLDER, f))])
+    return sorted([c for c, entry in get_index()['campaigns'].items() if entry['valid']])
 
 
 def list_experiments(check=True):
     """
-    This function gets the list of existing experiments.
+    This function gets the list of existing experiments (from the index of the experiments folder, see get_index).
 
+    :param check: only list the experiments with a valid structure
     :return: list of experiments
     """
-    return sorted([d for d in listdir(EXPERIMENT_FOLDER)
-                   if isdir(join(EXPERIMENT_FOLDER, d)) and not d.startswith('.') and (not check or
-                   check_structure(join(EXPERIMENT_FOLDER, d)))])
+    return sorted([e for e, entry in get_index()['experiments'].items() if not check or entry['valid']])
+
 
+def list_replicates(sim_path):
+    """
+    This function gets the list of the replicates of a simulation, that is, the simulation folder itself followed
+     by the folders of the additional replicates (if the simulation is repeated).
 
+    :param sim_path: path to the simulation folder (i.e. [EXPERIMENT]/[with-|without-malicious])
+    :return: list of replicate folders
+    """
+    replicates = join(sim_path, 'replicates')
+    if not exists(replicates):
+        return [sim_path]
+    return [sim_path] + [join(replicates, r) for r in sorted([r for r in listdir(replicates) if r.isdigit()], key=int)]
+
+
+@mtime_cached(join(TEMPLATES_FOLDER, 'experiment', 'motes'))
 def list_mote_types(mote_type, strip=True):
     """
     This function gets the list of existing non-malicious mote types.
@@ -263,6 +306,116 @@ def list_mote_types(mote_type, strip=True):
                    if f.endswith('.c') and f.startswith(mote_type)])
 
 
+# *********************************************** EXPERIMENTS INDEX ***********************************************
+def __signature(*paths):
+    """
+    This private function computes the signature of a list of files and folders, that is, their modification times
+     and sizes (None for a missing path).
+
+    :param paths: paths to the files and folders
+    :return: list of signatures (JSON-serializable)
+    """
+    signatures = []
+    for path in paths:
+        try:
+            st = stat(path)
+            signatures.append([st.st_mtime, st.st_size])
+        except OSError:
+            signatures.append(None)
+    return signatures
+
+
+def __experiment_signature(path):
+    """
+    This private function computes the signature of an experiment (see __signature). Besides the experiment and
+     simulation folders, it covers the sub-folders and files written by the stages of the experiment, as writing
+     into a sub-folder does not change the modification time of its parent folder.
+
+    :param path: path to the experiment
+    :return: list of signatures (JSON-serializable)
+    """
+    paths = [path, join(path, STAMPS_FOLDER), join(path, 'results'), join(path, 'report.pdf')]
+    for sim in ['with', 'without']:
+        sim_path = join(path, '{}-malicious'.format(sim))
+        paths.extend([sim_path] + [join(sim_path, f) for f in [STAMPS_FOLDER, 'data', 'motes', 'results']])
+    return __signature(*paths)
+
+
+def get_experiment_status(path, valid=None):
+    """
+    This function determines how far an experiment went, based on its structure and on the stamps of its stages.
+
+    :param path: path to the experiment
+    :param valid: whether the structure of the experiment is valid, if already known (see check_structure)
+    :return: 'reported', 'parsed', 'simulated', 'made' or 'incomplete' (if its structure is not valid, e.g. when
+              make was interrupted)
+    """
+    if not (check_structure(path) if valid is None else valid):
+        return 'incomplete'
+    sims = [join(path, '{}-malicious'.format(sim)) for sim in ['with', 'without']]
+    if get_stamp(path, 'report') is not None and exists(join(path, 'report.pdf')):
+        return 'reported'
+    for status, stage in [('parsed', 'aggregate'), ('simulated', 'simulate')]:
+        if all(get_stamp(sim, stage) is not None for sim in sims):
+            return status
+    return 'made'
+
+
+def get_index(force=()):
+    """
+    This function gets the index of the experiments folder, that is, the status and the structure validity of the
+     experiments and the validity of the campaigns. The index is persisted in INDEX_FILE and refreshed
+     incrementally: an entry is only computed again when the modification time of the related experiment folder
+     (or of its simulation folders and the sub-folders written by its stages) or of the campaign file changed, or
+     when it is forced (e.g. by the commands that change an experiment).
+
+    :param force: names of the experiments whose entries are to be computed again
+    :return: dictionary with keys 'experiments' and 'campaigns', holding dictionaries of entries
+    """
+    try:
+        with open(INDEX_FILE) as f:
+            index = loads(f.read())
+    except (IOError, OSError, ValueError):
+        index = {}
+    old, index = index, {'experiments': {}, 'campaigns': {}}
+    for item in listdir(EXPERIMENT_FOLDER):
+        path = join(EXPERIMENT_FOLDER, item)
+        if item.startswith('.'):
+            continue
+        if isdir(path):
+            signature = __experiment_signature(path)
+            entry = old.get('experiments', {}).get(item)
+            if item in force or entry is None or entry['signature'] != signature:
+                valid = check_structure(path)
+                entry = {'signature': signature, 'valid': valid, 'status': get_experiment_status(path, valid)}
+            index['experiments'][item] = entry
+        elif item.endswith('.json'):
+            signature = __signature(path)
+            entry = old.get('campaigns', {}).get(item)
+            if entry is None or entry['signature'] != signature:
+                entry = {'signature': signature, 'valid': is_valid_commented_json(path)}
+            index['campaigns'][item] = entry
+    if index != old:
+        tmp = '{}.{}.tmp'.format(INDEX_FILE, getpid())
+        try:
+            with open(tmp, 'w') as f:
+                f.write(dumps(index))
+            rename(tmp, INDEX_FILE)
+        except (IOError, OSError):
+            logger.debug(" > Could not write the index of the experiments folder")
+    return index
+
+
+def update_index(*paths):
+    """
+    This function computes the index entries of the given experiments again (e.g. after making, running or
+     cleaning them).
+
+    :param paths: names of or paths to the experiments
+    """
+    get_index(force=[basename(normpath(p)) for p in paths])
+
+
 # ************************************** TEMPLATE AND PARAMETER FUNCTIONS **************************************
 def apply_debug_flags(contiki_rpl, debug='NONE'):
     """
@@ -272,19 +425,35 @@ def apply_debug_flags(contiki_rpl, debug='NONE'):
     :param debug: the new value to be set for the debug flag
     """
     for filename in DEBUG_FILES:
-        replace_in_file(join(contiki_rpl, filename), (r'^#define DEBUG DEBUG_([A-Z]+)$', debug))
+        if len(replace_in_file(join(contiki_rpl, filename), (r'^#define DEBUG DEBUG_([A-Z]+)$', debug))) > 0:
+            logger.warning(" > Debug flag not found in {}".format(filename))
 
 
 def apply_replacements(contiki_rpl, replacements):
     """
     This function replaces lines in specified ContikiRPL files. Each replacement is formatted as follows:
-        {"ContikiRPL_filename": ["source_line", "destination_line"]}
+        {"ContikiRPL_filename": [["source_line", "destination_line"], ...]}
 
     :param contiki_rpl: path to ContikiRPL custom library
     :param replacements: dictionary of replacement entries
     """
     for filename, replacement in replacements.items():
-        replace_in_file(join(contiki_rpl, filename), replacement)
+        for line in replace_in_file(join(contiki_rpl, filename), replacement):
+            logger.warning(" > Line '{}' not found in {} (not replaced)".format(line, filename))
+
+
+def check_connectivity(motes, tx_range):
+    """
+    This function checks that every legitimate mote of a WSN can reach the root, given the transmission range of
+     the UDGM, so that a disconnected WSN can be rejected before compiling anything or launching Cooja.
+
+    :param motes: list of motes (formatted as dictionaries with keys 'id', 'type', 'x' and 'y')
+    :param tx_range: transmission range
+    :return: the sorted list of the identifiers of the motes that cannot reach the root
+    """
+    motes = sorted([m for m in motes if m['type'] != 'malicious'], key=lambda m: m['type'] != 'root')
+    unreachable = get_unreachable_motes([(float(m['x']), float(m['y'])) for m in motes], tx_range)
+    return sorted(int(motes[i]['id']) for i in unreachable)
 
 
 def check_structure(path, files=None, create=False, remove=False):
@@ -292,7 +461,8 @@ def check_structure(path, files=None, create=False, remove=False):
     This function checks if the file structure given by the dictionary files exists at the input path.
 
     :param path: path to be checked for the file structure
-    :param files: file structure as a dictionary
+    :param files: file structure as a dictionary (with False for a required file, None for an optional file and a
+                   dictionary for a sub-folder)
     :param create: create subfolders if they do not exist
     :param remove: if this flag is True, non-matching files are removed
     :return: True if the file structure is respected, otherwise False
@@ -304,7 +474,7 @@ def check_structure(path, files=None, create=False, remove=False):
         return True
     items = listdir(path)
     if create:
-        items = [i for i, f in files.items() if not isinstance(f, bool)] + items
+        items = [i for i, f in files.items() if isinstance(f, dict)] + items
     for item in items:
         wildcard = '{}.*'.format(splitext(item)[0])
         match = item if item in files.keys() else (wildcard if wildcard in files.keys() else None)
@@ -312,9 +482,9 @@ def check_structure(path, files=None, create=False, remove=False):
             if remove:
                 remove_files(path, item)
             continue
-        files[match] = True if isinstance(files[match], bool) else \
+        files[match] = True if not isinstance(files[match], dict) else \
             check_structure(join(path, match), deepcopy(files[match]), create, remove)
-    return all(files.values())
+    return all(f is None or f for f in files.values())
 
 
 def render_campaign(exp_file):
@@ -360,11 +530,25 @@ def render_templates(path, only_malicious=False, **params):
     # fill in simulation file templates
     templates["report.md"] = deepcopy(params)
     templates["motes/Makefile"]["target"] = params["target"]
+    # the heap of the JVM running Cooja is sized according to the number of motes
+    templates["Makefile"]["heap"] = get_jvm_heap(len(motes))
     # important note: timeout is milliseconds in the simulation script
     templates["script.js"]["timeout"] = 1000 * params["duration"]
     # important note: sampling period is relative to the measured time in the simulation, which is in microseconds ;
     #                  the '10 * ' thus means that we take 100 measures regardless the duration of the simulation
     templates["script.js"]["sampling_period"] = templates["script.js"]["timeout"] * 10
+    # the simulation can end once the network reaches a steady state (the window is in microseconds, as the measured
+    #  time in the simulation)
+    templates["script.js"]["convergence_window"] = 10 ** 6 * (params["convergence_window"] or 0)
+    templates["script.js"]["convergence_tolerance"] = params["convergence_tolerance"]
+    # screenshots (and then the VisualizerScreenshot plugin) can be disabled for speeding up the simulations
+    templates["script.js"]["screenshots"] = params["screenshots"]
+    # RPL messages and other serial messages can be left out of the logs as these are not parsed
+    templates["script.js"]["log_rpl"] = params["log_rpl"]
+    templates["script.js"]["log_serial"] = params["log_serial"]
+    # relationships and power statistics can be logged as binary records instead of text lines
+    templates["script.js"]["event_log"] = params["event_log"]
+    templates["simulation.csc"]["screenshots"] = params["screenshots"]
     templates["simulation.csc"]["title"] = params["title"] + ' (with the malicious mote)'
     templates["simulation.csc"]["goal"] = params["goal"]
     templates["simulation.csc"]["notes"] = params["notes"]
@@ -377,9 +561,12 @@ def render_templates(path, only_malicious=False, **params):
     templates["simulation.csc"]["motes"] = motes
     for mote_type in templates["simulation.csc"]["mote_types"]:
         mote_type["target"] = params["target"] if mote_type["name"] != "malicious" else params["malicious_target"]
+    seeds = get_random_seeds(params)
+    templates["simulation.csc"]["random_seed"] = seeds[0]
     # render the templates for the simulation with the malicious mote
     for name, kwargs in templates.items():
         write_template(join(path, 'with-malicious'), env, name, **kwargs)
+    render_replicates(join(path, 'with-malicious'), env, templates, seeds)
     # now, adapt the title and mote source template
     del templates["motes/Makefile"]
     del templates["motes/root.c"]
@@ -391,9 +578,32 @@ def render_templates(path, only_malicious=False, **params):
     # render the templates for the simulation without the malicious mote
     for name, kwargs in templates.items():
         write_template(join(path, 'without-malicious'), env, name, **kwargs)
+    render_replicates(join(path, 'without-malicious'), env, templates, seeds)
     return replacements
 
 
+def render_replicates(sim_path, env, templates, seeds):
+    """
+    This function renders the simulation templates of the additional replicates of a simulation (if repeated), each
+     one with its own random seed. Each replicate gets its own data and results folders while motes are shared with
+     the simulation folder. Former replicates (e.g. from a previous make with a larger 'repeat') are removed first.
+
+    :param sim_path: path to the simulation folder (i.e. [EXPERIMENT]/[with-|without-malicious])
+    :param env: template environment
+    :param templates: dictionary of templates already filled in for the simulation
+    :param seeds: list of random seeds (one per replicate)
+    """
+    remove_folder(join(sim_path, 'replicates'))
+    for i, seed in enumerate(seeds[1:], 2):
+        replicate = get_path(sim_path, 'replicates', str(i), create=True)
+        for folder in ['data', 'results']:
+            get_path(replicate, folder, create=True)
+        symlink(join(pardir, pardir, 'motes'), join(replicate, 'motes'))
+        for name in ["Makefile", "script.js", "simulation.csc"]:
+            kwargs = dict(templates[name], random_seed=seed) if name == "simulation.csc" else templates[name]
+            write_template(replicate, env, name, **kwargs)
+
+
 def set_motes_to_simulation(simfile, motes):
     """
     This function replaces motes data from a list of motes (formatted as dictionaries with 'id', 'x', 'y' and
@@ -401,29 +611,48 @@ def set_motes_to_simulation(simfile, motes):
 
     :param simfile: path to the simulation file
     :param motes: list or dictionary of motes
+    :return: the number of changed coordinates
     """
     if isinstance(motes, list):
         motes = {int(m['id']): (float(m['x']), float(m['y'])) for m in motes}
-    tmp = simfile + '.tmp'
-    with open(simfile) as of:
-        content = of.read()
-    for m in finditer(r'^\s*<mote>(?P<block>.*?)</mote>\s*$', content, DOTALL | MULTILINE):
-        block = m.groups('block')[0]
-        idmatch = search(r'^\s*<id>(?P<mote_id>\d+?)</id>\s*$', block, MULTILINE)
-        if idmatch is None:
-            continue
-        mote_id = int(idmatch.groups('mote_id')[0])
-        # e.g. occurs when modifying the simulation without malicious and the simulation with malicious has to be
-        #  update ; id of malicious mote is found in the simulation file but not in the dictionary of motes
-        if mote_id not in motes.keys():
-            continue
-        mote_pos = motes[mote_id]
-        block = sub(r'<x>(.*?)</x>', '<x>{}</x>'.format(mote_pos[0]), block, flags=MULTILINE)
-        block = sub(r'<y>(.*?)</y>', '<y>{}</y>'.format(mote_pos[1]), block, flags=MULTILINE)
-        content = content.replace(m.groups('block')[0], block)
-    with open(tmp, 'w+') as nf:
-        nf.write(content)
-    move_files('', '', (tmp, simfile))
+    simulation = SimulationFile(simfile)
+    changed = simulation.set_positions(motes)
+    # e.g. the simulation without the malicious mote only lacks the malicious mote, hence nothing may have changed
+    if changed > 0:
+        simulation.save()
+    return changed
+
+
+def __set_motes_to_simulation(args):
+    """ This private function unpacks the arguments of set_motes_to_simulation (for Pool.map). """
+    return set_motes_to_simulation(*args)
+
+
+def set_motes_to_simulations(simfiles, motes, processes=None):
+    """
+    This function applies the same motes data to several simulation files (.csc), e.g. to all the simulations of a
+     campaign. Files are processed in parallel when there are enough of them to be worth a process pool.
+
+    :param simfiles: list of paths to the simulation files
+    :param motes: list or dictionary of motes
+    :param processes: number of processes (defaults to the number of CPU's)
+    :return: dictionary with each simulation file as the key and its number of changed coordinates as the value
+    """
+    if isinstance(motes, list):
+        motes = {int(m['id']): (float(m['x']), float(m['y'])) for m in motes}
+    args = [(simfile, motes) for simfile in simfiles]
+    if processes == 1 or len(args) < MIN_FILES_PER_POOL:
+        return dict(zip(simfiles, map(__set_motes_to_simulation, args)))
+    pool = Pool(min(processes or cpu_count(), len(args)), init_worker)
+    try:
+        results = pool.map(__set_motes_to_simulation, args)
+        pool.close()
+    except KeyboardInterrupt:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return dict(zip(simfiles, results))
 
 
 def write_template(path, env, name, **kwargs):
@@ -461,10 +690,30 @@ def validated_parameters(dictionary):
                                     lambda x: isinstance(x, string_types), "is not a string")
     params["duration"] = get_parameter(dictionary, "simulation", "duration",
                                        lambda x: isinstance(x, int) and x > 0, "is not an integer greater than 0")
+    params["convergence_window"] = get_parameter(dictionary, "simulation", "convergence-window",
+                                                 lambda x: x is None or isinstance(x, int) and
+                                                 0 < x < params["duration"],
+                                                 "is not an integer greater than 0 and less than the duration")
+    params["convergence_tolerance"] = get_parameter(dictionary, "simulation", "convergence-tolerance",
+                                                    lambda x: isinstance(x, (int, float)) and 0 <= x < 1,
+                                                    "is not a number between 0 and 1")
     params["n"] = get_parameter(dictionary, "simulation", "number-motes",
                                 lambda x: isinstance(x, int) and x > 0, "is not an integer greater than 0")
     params["repeat"] = get_parameter(dictionary, "simulation", "repeat",
                                      lambda x: isinstance(x, int) and x > 0, "is not an integer greater than 0")
+    params["event_log"] = get_parameter(dictionary, "simulation", "event-log",
+                                        lambda x: isinstance(x, bool), "is not a boolean")
+    params["log_rpl"] = get_parameter(dictionary, "simulation", "log-rpl",
+                                      lambda x: isinstance(x, bool), "is not a boolean")
+    params["log_serial"] = get_parameter(dictionary, "simulation", "log-serial",
+                                         lambda x: isinstance(x, bool), "is not a boolean")
+    params["screenshots"] = get_parameter(dictionary, "simulation", "screenshots",
+                                          lambda x: isinstance(x, bool), "is not a boolean")
+    params["topology"] = get_parameter(dictionary, "simulation", "topology",
+                                       lambda x: x in TOPOLOGIES.keys(), "is not an available topology")
+    params["random_seed"] = get_parameter(dictionary, "simulation", "random-seed",
+                                          lambda x: x is None or isinstance(x, int) and x > 0,
+                                          "is not an integer greater than 0")
     params["target"] = get_parameter(dictionary, "simulation", "target",
                                      lambda x: x in get_available_platforms(), "is not a valid platform")
     params["malicious_target"] = get_parameter(dictionary, "malicious", "target",
@@ -0,0 +1,267 @@
+# -*- coding: utf8 -*-
+from multiprocessing import Pool
+from signal import signal, SIGINT, SIG_IGN
+from six.moves.queue import Empty, Queue
+from threading import RLock, Thread
+
+from core.conf.constants import JVM_HEAP, MEMORY_BUDGET, STAGE_LIMITS, STAGE_MEMORY
+from core.conf.logconfig import logger
+from core.utils.behaviors import ScheduledCommand
+
+
+__all__ = [
+    'get_jvm_heap',
+    'CampaignScheduler',
+]
+
+
+def get_jvm_heap(n_motes):
+    """
+    This function estimates the heap size of the JVM running Cooja for a simulation (see JVM_HEAP).
+
+    :param n_motes: number of emulated motes
+    :return: heap size in MB
+    """
+    heap = JVM_HEAP['base'] + JVM_HEAP['per_mote'] * n_motes
+    return -(-heap // JVM_HEAP['step']) * JVM_HEAP['step']
+
+
+def init_worker():
+    """ Initializer of the scheduler's worker processes (interrupts are handled by the parent process). """
+    signal(SIGINT, SIG_IGN)
+
+
+def run_task(func, args, kwargs):
+    """
+    This function runs a task in a worker process. Any exception raised by the task, even one that is not an
+     Exception (e.g. SystemExit), makes it fail instead of being lost with the worker.
+
+    :param func: function of the task
+    :param args: positional arguments of the function
+    :param kwargs: keyword-arguments of the function
+    :return: the tuple (status, result) returned by the function or ('FAIL', [error message])
+    """
+    try:
+        return func(*args, **kwargs)
+    except BaseException as e:
+        return 'FAIL', '{}: {}'.format(e.__class__.__name__, str(e))
+
+
+class CampaignScheduler(object):
+    """
+    This class runs a campaign as a Directed Acyclic Graph of tasks on a bounded process pool. A task is only
+     submitted once all its dependencies succeeded, when its stage has a free slot (see STAGE_LIMITS) and when its
+     estimated memory footprint fits in what remains of the memory budget (see MEMORY_BUDGET) ; if one of its
+     dependencies fails, it is cancelled (unlike its soft dependencies, which only order the tasks). A task
+     exceeding the whole budget is run alone. Tasks may also be added while the graph is run in background (see
+     start), e.g. by the console whose tasks all share one scheduler.
+
+    :param jobs: maximum number of tasks running at the same time
+    :param limits: dictionary with the maximum number of running tasks per stage (overrides STAGE_LIMITS)
+    :param memory: memory budget in MB (overrides MEMORY_BUDGET)
+    """
+    def __init__(self, jobs=1, limits=None, memory=None):
+        self.jobs = max(1, int(jobs))
+        self.limits = dict(STAGE_LIMITS, **(limits or {}))
+        self.memory = memory or MEMORY_BUDGET
+        self.tasks, self.order, self.commands = {}, [], {}
+        self.lock, self.thread, self.terminated = RLock(), None, False
+
+    def add(self, name, stage, func, args=(), kwargs=None, depends=(), memory=None, pids=(), command=None, after=()):
+        """
+        Add a task to the graph. A task that is over can be added again (e.g. when an experiment is run again from
+         the console).
+
+        :param name: unique name of the task
+        :param stage: name of the stage the task belongs to (used for concurrency limits)
+        :param func: picklable function returning a tuple (status, result), e.g. decorated by CommandMonitor
+        :param args: positional arguments of the function
+        :param kwargs: keyword-arguments of the function
+        :param depends: names of the (already added) tasks to be successfully completed before running this one
+        :param memory: estimated memory footprint of the task in MB (defaults to the footprint of its stage, see
+                        STAGE_MEMORY)
+        :param pids: patterns of the PID files of the processes started by the task (e.g. Cooja), used for killing
+                      it from the console (see ScheduledCommand)
+        :param command: object following the task in the console (with a 'callback' method taking the tuple
+                         (status, result) and a 'task' attribute set to the task once submitted), if any
+        :param after: names of the (already added) tasks to be over, whatever their outcome, before running this one
+                       (e.g. for getting binaries from the build cache)
+        :return: the name of the task
+        """
+        depends, after = [d for d in depends if d is not None], [a for a in after if a is not None]
+        with self.lock:
+            if self.is_scheduled(name):
+                raise ValueError("Task '{}' is already scheduled".format(name))
+            for d in depends + after:
+                if d not in self.tasks.keys():
+                    raise ValueError("Task '{}' depends on an unknown task ('{}')".format(name, d))
+            if name in self.tasks.keys():
+                self.order.remove(name)
+                self.commands.pop(name, None)
+            self.tasks[name] = {
+                'stage': stage,
+                'func': func,
+                'args': args,
+                'kwargs': kwargs or {},
+                'depends': depends,
+                'after': after,
+                'memory': memory if memory is not None else STAGE_MEMORY.get(stage, 0),
+                'pids': pids,
+                'status': 'INIT',
+                'result': None,
+            }
+            self.order.append(name)
+            if command is not None:
+                self.commands[name] = command
+        return name
+
+    def cancel(self, name):
+        """
+        Cancel a task that is not submitted yet (its dependents are then cancelled too).
+
+        :param name: name of the task
+        :return: True if the task was cancelled, otherwise False
+        """
+        with self.lock:
+            if self.tasks.get(name, {}).get('status') != 'INIT':
+                return False
+            self.__set_status(name, 'CANCELLED', "Killed")
+            return True
+
+    def is_scheduled(self, name):
+        """
+        Check if a task is waiting or running.
+
+        :param name: name of the task
+        :return: True if the task is waiting or running, otherwise False
+        """
+        return self.tasks.get(name, {}).get('status') in ('INIT', 'PENDING')
+
+    def __cancel_orphans(self):
+        """ Cancel the tasks depending on a task that did not succeed (this propagates through the graph). """
+        changed = True
+        while changed:
+            changed = False
+            for name in self.order:
+                task = self.tasks[name]
+                # note: a dependency is over without success when failed, timed out, cancelled or undefined
+                if task['status'] == 'INIT' and any(self.tasks[d]['status'] not in ('INIT', 'PENDING', 'SUCCESS')
+                                                    for d in task['depends']):
+                    self.__set_status(name, 'CANCELLED', "Dependency failed")
+                    changed = True
+
+    def __ready(self, running):
+        """ Select the tasks that can be submitted now, in order of addition, and mark them as running. """
+        ready = []
+        for name in self.order:
+            task = self.tasks[name]
+            if len(running) >= self.jobs:
+                break
+            if task['status'] != 'INIT' or any(self.tasks[d]['status'] != 'SUCCESS' for d in task['depends']) or \
+                    any(self.is_scheduled(a) for a in task['after']):
+                continue
+            # a task that does not fit in the remaining memory waits, unless nothing is running
+            used = sum(self.tasks[r]['memory'] for r in running)
+            if len(running) > 0 and used + task['memory'] > self.memory:
+                continue
+            if len([r for r in running if self.tasks[r]['stage'] == task['stage']]) < \
+                    self.limits.get(task['stage'], self.jobs):
+                if task['memory'] > self.memory:
+                    logger.warning(" > {} needs more memory ({} MB) than the budget ({} MB)"
+                                   .format(name, task['memory'], self.memory))
+                running.add(name)
+                ready.append(name)
+        return ready
+
+    def __set_status(self, name, status, result=None):
+        self.tasks[name].update({'status': status, 'result': result})
+        if name in self.commands.keys():
+            self.commands[name].callback((status, result))
+        if status != 'PENDING':
+            over = len([t for t in self.tasks.values() if t['status'] not in ('INIT', 'PENDING')])
+            getattr(logger, ['info', 'error'][status != 'SUCCESS'])(
+                " > [{}/{}] {} ({}): {}".format(over, len(self.tasks), name, self.tasks[name]['stage'],
+                                                status if status == 'SUCCESS' else '{} - {}'.format(status, result)))
+
+    def start(self, console=None):
+        """
+        Run the graph of tasks in a background thread (e.g. for keeping the console responsive). If the graph is
+         already run in background, the tasks added since then are simply picked up by the running thread.
+
+        :param console: console whose list of tasks the waiting tasks are added to (see ScheduledCommand), if any
+        :return: the thread running the graph
+        """
+        with self.lock:
+            if console is not None:
+                for name in self.order:
+                    task = self.tasks[name]
+                    if task['status'] == 'INIT' and name not in self.commands.keys():
+                        self.commands[name] = ScheduledCommand(console, name, task['stage'], task['pids'])
+            if self.thread is None:
+                self.thread = Thread(target=self.run)
+                self.thread.daemon = True  # the console waits for it when exiting (see FrameworkConsole.graceful_exit)
+                self.thread.start()
+            return self.thread
+
+    def terminate(self):
+        """ Cancel the waiting tasks and kill the running ones (e.g. when the console is interrupted). """
+        with self.lock:
+            self.terminated = self.thread is not None
+            for name in self.order:
+                self.cancel(name)
+
+    def run(self):
+        """
+        Run the graph of tasks and wait for its completion.
+
+        :return: dictionary with, for each task, its final status and its result
+        """
+        done, running, results = Queue(), set(), {}
+        pool = Pool(self.jobs, init_worker)
+        try:
+            while True:
+                with self.lock:
+                    if self.terminated:
+                        for name in running:
+                            self.__set_status(name, 'KILLED', "Terminated")
+                        raise KeyboardInterrupt
+                    self.__cancel_orphans()
+                    for name in self.__ready(running):
+                        task = self.tasks[name]
+                        self.__set_status(name, 'PENDING')
+                        results[name] = pool.apply_async(run_task, (task['func'], task['args'], task['kwargs']),
+                                                         callback=lambda state, name=name: done.put((name, state)))
+                        if name in self.commands.keys():
+                            self.commands[name].task = results[name]
+                    # the tasks added from now on are run by a new thread (see start)
+                    if len(running) == 0:
+                        self.thread = None
+                        break
+                # see the note in FrameworkConsole.graceful_exit about the timeout (for KeyboardInterrupt)
+                try:
+                    name, state = done.get(True, 1)
+                except Empty:
+                    # a task may also fail outside of its worker (e.g. if its arguments cannot be pickled), in which
+                    #  case the callback is never made
+                    with self.lock:
+                        for name in [n for n in running if results[n].ready() and not results[n].successful()]:
+                            running.discard(name)
+                            try:
+                                results[name].get(0)
+                            except Exception as e:
+                                self.__set_status(name, 'FAIL', '{}: {}'.format(e.__class__.__name__, str(e)))
+                    continue
+                with self.lock:
+                    running.discard(name)
+                    self.__set_status(name, *(state if isinstance(state, tuple) else ('UNDEFINED', "None")))
+            pool.close()
+        except KeyboardInterrupt:
+            logger.warning(" > Campaign interrupted, terminating opened processes...")
+            pool.terminate()
+            if not self.terminated:
+                raise
+        finally:
+            pool.join()
+            with self.lock:
+                self.thread, self.terminated = None, False
+        return {name: (t['status'], t['result']) for name, t in self.tasks.items()}
@@ -0,0 +1,97 @@
+# -*- coding: utf8 -*-
+from hashlib import sha1
+from os import makedirs, walk
+from os.path import exists, isdir, isfile, join
+
+from core.common.helpers import remove_files
+
+
+__all__ = [
+    'get_stamp',
+    'get_stamp_key',
+    'remove_stamps',
+    'set_stamp',
+]
+
+
+STAMPS_FOLDER = '.stamps'
+
+
+def __hash_file(h, path, chunk_size=2**20):
+    """
+    This private function updates a hash object with the content of a file, read by chunks.
+
+    :param h: hash object
+    :param path: path to the file to be hashed
+    :param chunk_size: size of the chunks
+    """
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+
+
+def get_stamp_key(paths, *keys):
+    """
+    This function computes the key of the inputs of a stage, that is, a hash of the given files and folders (whole
+     content, recursively) and of the keys of the upstream stages.
+
+    :param paths: list of paths to the input files and folders (missing paths are accounted as such)
+    :param keys: keys of the upstream stages
+    :return: hexadecimal key
+    """
+    h = sha1()
+    for path in paths:
+        h.update(path.encode('utf-8'))
+        if isdir(path):
+            for root, dirs, files in walk(path):
+                dirs.sort()
+                for fn in sorted(files):
+                    h.update(join(root[len(path):], fn).encode('utf-8'))
+                    __hash_file(h, join(root, fn))
+        elif isfile(path):
+            __hash_file(h, path)
+        else:
+            h.update(b'\0missing')
+    for key in keys:
+        h.update(str(key).encode('utf-8'))
+    return h.hexdigest()
+
+
+def get_stamp(path, stage):
+    """
+    This function gets the stamp of a stage, that is, the key of its inputs when it last completed successfully.
+
+    :param path: path to the folder holding the stamps (i.e. the experiment or one of its simulations)
+    :param stage: name of the stage
+    :return: the key of the stamp or None if the stage never completed
+    """
+    stamp = join(path, STAMPS_FOLDER, stage)
+    if not exists(stamp):
+        return
+    with open(stamp) as f:
+        return f.read().strip() or None
+
+
+def set_stamp(path, stage, key):
+    """
+    This function sets the stamp of a stage once it completed successfully.
+
+    :param path: path to the folder holding the stamps (i.e. the experiment or one of its simulations)
+    :param stage: name of the stage
+    :param key: key of the inputs of the stage (see get_stamp_key)
+    """
+    stamps = join(path, STAMPS_FOLDER)
+    if not exists(stamps):
+        makedirs(stamps)
+    with open(join(stamps, stage), 'w') as f:
+        f.write(key)
+
+
+def remove_stamps(path, *stages):
+    """
+    This function removes the stamps of the given stages (e.g. when they become stale).
+
+    :param path: path to the folder holding the stamps (i.e. the experiment or one of its simulations)
+    :param stages: names of the stages
+    """
+    remove_files(join(path, STAMPS_FOLDER), *stages)
@@ -0,0 +1,83 @@
+# -*- coding: utf8 -*-
+import numpy
+from os import getpid, listdir, makedirs, rename
+from os.path import exists, isdir, join, splitext
+
+from core.common.helpers import remove_folder
+from core.conf.constants import EXPERIMENT_FOLDER
+from core.utils.rpla import get_experiments
+
+
+__all__ = [
+    'load_campaign_results',
+    'read_results',
+    'write_results',
+]
+
+
+# ********************************************** COLUMNAR STORE ************************************************
+def write_results(path, name, columns):
+    """
+    This function writes a table of results (to ./results) in a columnar binary format, that is, a folder holding
+     one NumPy file per column. The table is written into a temporary folder which is then renamed so that readers
+     never see a partially written table.
+
+    :param path: path to the experiment (including [with-|without-malicious])
+    :param name: name of the table (e.g. 'powertracker')
+    :param columns: NumPy structured array or dictionary of arrays with the same length
+    """
+    if isinstance(columns, numpy.ndarray):
+        columns = {f: columns[f] for f in columns.dtype.names}
+    table = join(path, 'results', name)
+    tmp = join(path, 'results', '.{}.{}.tmp'.format(name, getpid()))
+    makedirs(tmp)
+    for field, values in columns.items():
+        numpy.save(join(tmp, '{}.npy'.format(field)), numpy.ascontiguousarray(values))
+    remove_folder(table)
+    rename(tmp, table)
+
+
+def read_results(path, name, fields=None, mmap=True):
+    """
+    This function reads a table of results (from ./results) written by write_results. Columns are memory-mapped
+     by default so that only the accessed parts are actually read from the disk.
+
+    :param path: path to the experiment (including [with-|without-malicious])
+    :param name: name of the table (e.g. 'powertracker')
+    :param fields: list of columns to be read (None means all the columns)
+    :param mmap: specify whether the columns are to be memory-mapped (read-only) or loaded in memory
+    :return: dictionary of arrays with the column names as keys or None if the table does not exist
+    """
+    table = join(path, 'results', name)
+    if not isdir(table):
+        return
+    columns = {}
+    for field in fields or sorted(splitext(fn)[0] for fn in listdir(table) if fn.endswith('.npy')):
+        try:
+            columns[field] = numpy.load(join(table, '{}.npy'.format(field)), mmap_mode='r' if mmap else None)
+        except ValueError:  # occurs when memory-mapping an empty column
+            columns[field] = numpy.load(join(table, '{}.npy'.format(field)))
+    return columns
+
+
+def load_campaign_results(exp_file, name, fields=None):
+    """
+    This function reads a table of results for all the simulations of a campaign, e.g. for comparing experiments
+     without parsing their text outputs again.
+
+    :param exp_file: input JSON simulation campaign file
+    :param name: name of the table (e.g. 'powertracker')
+    :param fields: list of columns to be read (None means all the columns)
+    :return: dictionary with the experiments as keys and, as values, dictionaries with the simulations
+              ('with-malicious' and 'without-malicious') as keys and the read tables as values
+    """
+    results = {}
+    for exp in sorted((get_experiments(exp_file) or {}).keys()):
+        for sim in ['with-malicious', 'without-malicious']:
+            sim_path = join(EXPERIMENT_FOLDER, exp, sim)
+            if not exists(sim_path):
+                continue
+            table = read_results(sim_path, name, fields)
+            if table is not None:
+                results.setdefault(exp, {})[sim] = table
+    return results
@@ -0,0 +1,124 @@
+# -*- coding: utf8 -*-
+from contextlib import contextmanager
+from fcntl import flock, LOCK_EX, LOCK_UN
+from json import dumps, loads
+from os import getpid, makedirs, rename
+from os.path import exists, join
+from time import time
+
+from core.conf.constants import EXPERIMENT_FOLDER
+from core.conf.logconfig import logger
+from core.utils.rpla import get_experiments
+
+
+__all__ = [
+    'get_campaign_timings',
+    'read_timings',
+    'record_timing',
+    'timed',
+]
+
+
+TIMINGS_FILE = join('results', 'timings.json')
+
+
+# ************************************************ TIMING SPANS ************************************************
+def read_timings(path):
+    """
+    This function reads the timings of an experiment (from ./results/timings.json).
+
+    :param path: path to the experiment
+    :return: dictionary with the span labels as keys and dictionaries with keys 'stage', 'span', 'start',
+              'duration' and 'status' as values
+    """
+    try:
+        with open(join(path, TIMINGS_FILE)) as f:
+            return loads(f.read())
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def __write_timing(path, label, entry):
+    """
+    This private function adds (or replaces) a timing entry of an experiment. As the stages of an experiment may run
+     in parallel processes, the read-modify-write of the timings file is made under an exclusive lock and the file
+     is then atomically replaced.
+
+    :param path: path to the experiment
+    :param label: label of the span
+    :param entry: timing entry (see read_timings)
+    """
+    results = join(path, 'results')
+    if not exists(results):
+        makedirs(results)
+    with open(join(results, '.timings.lock'), 'a') as lock:
+        flock(lock, LOCK_EX)
+        try:
+            timings = read_timings(path)
+            timings[label] = entry
+            tmp = '{}.{}.tmp'.format(join(path, TIMINGS_FILE), getpid())
+            with open(tmp, 'w') as f:
+                f.write(dumps(timings, indent=2, sort_keys=True))
+            rename(tmp, join(path, TIMINGS_FILE))
+        finally:
+            flock(lock, LOCK_UN)
+
+
+def record_timing(path, stage, span, start, duration, status, *labels):
+    """
+    This function records the timing of a span of a stage in the timings of an experiment (e.g. for a span measured
+     by another process, like a simulation run in a batch of simulations).
+
+    :param path: path to the experiment
+    :param stage: name of the stage (e.g. 'make' or 'simulate')
+    :param span: name of the span inside the stage (e.g. 'compile' or 'cooja')
+    :param start: start time of the span (in seconds since the epoch)
+    :param duration: duration of the span (in seconds)
+    :param status: 'SUCCESS' or 'FAIL'
+    :param labels: additional labels distinguishing spans of the same name (e.g. the simulation and the replicate)
+    """
+    label = '/'.join([stage] + [str(l) for l in labels] + [span])
+    logger.debug(" > {} took {:.2f}s".format(label, duration))
+    try:
+        __write_timing(path, label, {'stage': stage, 'span': span, 'start': start, 'duration': duration,
+                                     'status': status})
+    except (IOError, OSError) as e:
+        logger.warning(" > Timing of {} could not be recorded ({})".format(label, e))
+
+
+@contextmanager
+def timed(path, stage, span, *labels):
+    """
+    This context manager measures the duration of a span of a stage (e.g. the compilation of the motes while making
+     an experiment) and records it in the timings of the experiment, whether the span succeeds or fails.
+
+    :param path: path to the experiment
+    :param stage: name of the stage (e.g. 'make' or 'simulate')
+    :param span: name of the span inside the stage (e.g. 'compile' or 'cooja')
+    :param labels: additional labels distinguishing spans of the same name (e.g. the simulation and the replicate)
+    """
+    start, status = time(), 'FAIL'
+    try:
+        yield
+        status = 'SUCCESS'
+    finally:
+        record_timing(path, stage, span, start, time() - start, status, *labels)
+
+
+def get_campaign_timings(exp_file):
+    """
+    This function summarizes the timings of the experiments of a campaign per stage and span.
+
+    :param exp_file: input JSON simulation campaign file
+    :return: dictionary with tuples (stage, span) as keys and dictionaries with keys 'count', 'total', 'max' and
+              'failed' as values
+    """
+    summary = {}
+    for exp in sorted(k for k in (get_experiments(exp_file) or {}).keys() if k != 'BASE'):
+        for entry in read_timings(join(EXPERIMENT_FOLDER, exp)).values():
+            s = summary.setdefault((entry['stage'], entry['span']), {'count': 0, 'total': 0., 'max': 0., 'failed': 0})
+            s['count'] += 1
+            s['total'] += entry['duration']
+            s['max'] = max(s['max'], entry['duration'])
+            s['failed'] += entry['status'] != 'SUCCESS'
+    return summary
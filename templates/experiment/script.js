@@ -3,64 +3,132 @@
 try { load("nashorn:mozilla_compat.js"); } catch(e) {}
 importPackage(java.io);
 
-// get plugin instances
-visualizer = mote.getSimulation().getCooja().getStartedPlugin("VisualizerScreenshot");
+// get plugin instances{% if screenshots %}
+visualizer = mote.getSimulation().getCooja().getStartedPlugin("VisualizerScreenshot");{% endif %}
 powertracker = mote.getSimulation().getCooja().getStartedPlugin("PowerTracker");
 
-// create log file handlers
-log.log("Opening log file writers...\n");
-log_serial = new FileWriter("./data/serial.log");                // open serial log file
-log_rpl = new FileWriter("./data/rpl.log");                      // open RPL messages log file
-log_relationships = new FileWriter("./data/relationships.log");  // open mote relationships log file
-log_power = new FileWriter("./data/powertracker.log");           // open power tracker logfile
+// resolve the folder of the simulation (set by Cooja when running simulations in batch, otherwise the working
+//  directory)
+var simdir = java.lang.System.getProperty("rpla.simdir", ".");
 
-// re-frame visualizer view
+// create buffered log file handlers (flushed when their buffer is full, at each sampling period and when closed)
+log.log("Opening log file writers...\n");
+var buffer = {{ buffer_size }};
+log_serial = new BufferedWriter(new FileWriter(simdir + "/data/serial.log"), buffer);        // open serial log file
+log_rpl = new BufferedWriter(new FileWriter(simdir + "/data/rpl.log"), buffer);              // open RPL messages log file
+log_relationships = new BufferedWriter(new FileWriter(simdir + "/data/relationships.log"), buffer);  // open mote relationships log file
+log_power = new BufferedWriter(new FileWriter(simdir + "/data/powertracker.log"), buffer);   // open power tracker logfile
+{% if event_log %}
+// create the binary event log, made of fixed-width big-endian records (see EVENT_DTYPE in core/utils/parser.py)
+//  formatted as [time (long), mote id (int), event type (int), 5 values (long)] ; it replaces relationships and
+//  power tracker logs
+log_events = new DataOutputStream(new BufferedOutputStream(new FileOutputStream(simdir + "/data/events.bin"), buffer));
+var EVENT_RELATIONSHIP = 1, EVENT_POWER = 2, POWER_ITEMS = ["MONITORED", "ON", "TX", "RX", "INT"];
+function write_event(t, mote_id, type, values) {
+  log_events.writeLong(t);
+  log_events.writeInt(mote_id);
+  log_events.writeInt(type);
+  for (var k = 0; k < 5; k++) { log_events.writeLong(k < values.length ? values[k] : 0); }
+}
+function write_power_events(t, statistics) {
+  var lines = String(statistics).split("\n"), items = {}, m, k;
+  for (k = 0; k < lines.length; k++) {
+    m = /^[A-Za-z0-9]+_(\d+) (MONITORED|ON|TX|RX|INT) (\d+)/.exec(lines[k]);
+    if (m) { (items[m[1]] = items[m[1]] || {})[m[2]] = parseInt(m[3], 10); }
+  }
+  for (var mote_id in items) {
+    var values = [];
+    for (k = 0; k < POWER_ITEMS.length && items[mote_id][POWER_ITEMS[k]] !== undefined; k++) {
+      values.push(items[mote_id][POWER_ITEMS[k]]);
+    }
+    if (values.length == POWER_ITEMS.length) { write_event(t, parseInt(mote_id, 10), EVENT_POWER, values); }
+  }
+}
+{% endif %}
+{% if screenshots %}// re-frame visualizer view
 visualizer.resetViewport = 1;
 visualizer.repaint();
 
-// set timeout and declare variables
+{% endif %}// set timeout and declare variables
 TIMEOUT({{ timeout }}, log.testOK());
-var c = 0, i = 1, period = {{ sampling_period }}, screenshot = false, pad = "00000", nbr = "";
+var c = 0, i = 1, period = {{ sampling_period }}, screenshot = false, pad = "00000", nbr = "", statistics = "";
+{% if convergence_window %}
+// steady state detection: the simulation ends early once no parent change occurred and the average radio duty cycle
+//  of the motes stayed within the tolerance (relatively to its value at the start of the window) for a whole window
+var conv_window = {{ convergence_window }}, tolerance = {{ convergence_tolerance }}, converged = false;
+var last_change = 0, stable_since = 0, duty = -1, d = 0;
+function get_duty_cycle(statistics) {
+  var lines = String(statistics).split("\n"), on = 0, monitored = 0, m;
+  for (var k = 0; k < lines.length; k++) {
+    m = /^[A-Za-z0-9]+_\d+ (MONITORED|ON) (\d+)/.exec(lines[k]);
+    if (m && m[1] == "ON") { on += parseInt(m[2], 10); } else if (m) { monitored += parseInt(m[2], 10); }
+  }
+  return monitored > 0 ? on / monitored : 0;
+}
+{% endif %}
+// close the writers (this flushes what remains in their buffers) and record the actual simulated duration
+function close_writers(state) {
+  log_serial.close();
+  log_rpl.close();
+  log_relationships.close();
+  log_power.close();{% if event_log %}
+  log_events.close();{% endif %}
+  log_duration = new FileWriter(simdir + "/data/convergence.log");
+  log_duration.write(mote.getSimulation().getSimulationTimeMillis() + "\t" + state + "\n");
+  log_duration.close();
+  log.log("File writers closed\n");
+}
 
 // now, start the test
-log.log("Starting stript...\n");
-visualizer.takeScreenshot("./data/network_" + pad + ".png", 0, 0);
+log.log("Starting stript...\n");{% if screenshots %}
+visualizer.takeScreenshot(simdir + "/data/network_" + pad + ".png", 0, 0);{% endif %}
 while(1) {
   try {
     // first, log to serial file
     line = time + "\tID:" + id.toString() + "\t" + msg + "\n"
     if (msg.startsWith("#L ")) {
-      log_relationships.write(line);
-      log_relationships.flush();
-      screenshot = true;
+{% if event_log %}      fields = String(msg).split(/\s+/);
+      write_event(time, id, EVENT_RELATIONSHIP, [parseInt(fields[1], 10), parseInt(fields[2], 10)]);
+{% else %}      log_relationships.write(line);
+{% endif %}{% if convergence_window %}      last_change = time;
+{% endif %}      screenshot = true;
     } else if (msg.startsWith("RPL: ")) {
-      log_rpl.write(line);
-      log_rpl.flush();
-    } else {
-      log_serial.write(line);
-      log_serial.flush();
-    }
+{% if log_rpl %}      log_rpl.write(line);
+{% endif %}    } else {
+{% if log_serial %}      log_serial.write(line);
+{% endif %}    }
     YIELD();
-    // then, log power statistics
+    // then, log power statistics and flush the log files
     if (c < time) {
-      log_power.write(powertracker.radioStatistics());
-      log_power.flush();
+      statistics = powertracker.radioStatistics();
+{% if event_log %}      write_power_events(time, statistics);
+      log_events.flush();{% else %}      log_power.write(statistics);{% endif %}
+      log_serial.flush();
+      log_rpl.flush();
+      log_relationships.flush();
+      log_power.flush();{% if screenshots %}
       if (screenshot) {
         nbr = "" + i;
         nbr = pad.substring(0, pad.length - nbr.length) + nbr;
-        visualizer.takeScreenshot("./data/network_" + nbr + ".png", 0, 0);
+        visualizer.takeScreenshot(simdir + "/data/network_" + nbr + ".png", 0, 0);
         i += 1;
-      }
+      }{% endif %}{% if convergence_window %}
+      d = get_duty_cycle(statistics);
+      if (duty < 0 || Math.abs(d - duty) > tolerance * duty) { duty = d; stable_since = time; }
+      converged = last_change > 0 && time - last_change >= conv_window && time - stable_since >= conv_window;{% endif %}
       c += period;
-    }
+    }{% if convergence_window %}
+    if (converged) { break; }{% endif %}
   } catch (e) {
-    log_serial.close();
-    log_rpl.close();
-    log_relationships.close();
-    log_power.close();
-    log.log("File writers closed\n");
+    // e.g. when TIMEOUT is reached
+    close_writers("TIMEOUT");
     if (c == 0) { log.testFailed(); } else { break; }
     break;
   }
-}
+}{% if convergence_window %}
+if (converged) {
+  log.log("Steady state reached, ending the simulation\n");
+  close_writers("CONVERGED");
+  log.testOK();
+}{% endif %}
 log.log("Done.");
@@ -4,11 +4,11 @@
   <project EXPORT="discard">[CONTIKI_DIR]/tools/cooja/apps/mspsim</project>
   <project EXPORT="discard">[CONTIKI_DIR]/tools/cooja/apps/avrora</project>
   <project EXPORT="discard">[CONTIKI_DIR]/tools/cooja/apps/powertracker</project>
-  <project EXPORT="discard">[CONTIKI_DIR]/tools/cooja/apps/serial_socket</project>
-  <project EXPORT="discard">[CONTIKI_DIR]/tools/cooja/apps/visualizer_screenshot</project>
+  <project EXPORT="discard">[CONTIKI_DIR]/tools/cooja/apps/serial_socket</project>{% if screenshots %}
+  <project EXPORT="discard">[CONTIKI_DIR]/tools/cooja/apps/visualizer_screenshot</project>{% endif %}
   <simulation>
     <title>{{ title }}</title>
-    <randomseed>generated</randomseed>
+    <randomseed>{{ random_seed }}</randomseed>
     <motedelay_us>1000000</motedelay_us>
     <radiomedium>
       org.contikios.cooja.radiomediums.UDGM
@@ -99,7 +99,7 @@
     <location_x>680</location_x>
     <location_y>450</location_y>
     <z>2</z>
-  </plugin>
+  </plugin>{% if screenshots %}
   <plugin>
     VisualizerScreenshot
     <plugin_config>
@@ -116,7 +116,7 @@
     <location_x>1</location_x>
     <location_y>1</location_y>
     <z>1</z>
-  </plugin>
+  </plugin>{% endif %}
   <plugin>
     org.contikios.cooja.plugins.LogListener
     <plugin_config>
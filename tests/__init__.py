@@ -6,3 +6,11 @@ setup(silent=True)
 from .setup import Test1Config, Test2CoojaSetup
 from .experiment import Test3Make, Test4Remake, Test5Clean
 from .campaign import Test6Prepare, Test7Drop
+from .snapshots import TestContikiSnapshots
+from .scheduler import TestScheduler
+from .stamps import TestStamps
+from .topologies import TestTopologies
+from .csc import TestSimulationFile
+from .store import TestColumnarStore
+from .blocks import TestBuildingBlocks
+from .replicates import TestReplicates
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from core.common.helpers import replace_in_file
+from core.utils.rpla import get_constants_and_replacements
+
+
+RPL_PRIVATE_H = """#define RPL_MAX_RANKINC             (7 * RPL_MIN_HOPRANKINC)
+#define INFINITE_RANK                   0xffff
+#define RPL_DEFAULT_LIFETIME_UNIT       0xffff
+"""
+
+
+class TestBuildingBlocks(unittest.TestCase):
+    """ Constants and replacements of the building blocks """
+
+    def test1_single_replacement(self):
+        """ > Is a block with a single replacement collected as a list of pairs ? """
+        constants, replacements = get_constants_and_replacements(['increased-version'])
+        self.assertEqual(constants, {})
+        self.assertEqual(replacements, {'rpl-icmp6.c': [["dag->version;", "dag->version++;"]]})
+
+    def test2_list_of_replacements(self):
+        """ > Is a block with a list of replacements collected as a flat list of pairs ? """
+        constants, replacements = get_constants_and_replacements(['decreased-rank'])
+        self.assertEqual(constants, {'RPL_CONF_MIN_HOPRANKINC': 0})
+        self.assertEqual(len(replacements['rpl-private.h']), 2)
+        self.assertTrue(all(len(pair) == 2 and not isinstance(pair[0], list)
+                            for pairs in replacements.values() for pair in pairs))
+
+    def test3_merged_replacements(self):
+        """ > Are the replacements of several blocks merged per file, without duplicates ? """
+        _, replacements = get_constants_and_replacements(['hello-flood', 'decreased-rank', 'decreased-rank'])
+        self.assertEqual([s for s, d in replacements['rpl-timers.c']], ["next_dis++;", "rpl_recalculate_ranks();"])
+        self.assertEqual(len(replacements['rpl-private.h']), 2)
+
+    def test4_applied_replacements(self):
+        """ > Are the collected replacements applicable to the ContikiRPL files ? """
+        _, replacements = get_constants_and_replacements(['decreased-rank'])
+        tmp = mkdtemp()
+        try:
+            path = join(tmp, 'rpl-private.h')
+            with open(path, 'w') as f:
+                f.write(RPL_PRIVATE_H)
+            self.assertEqual(replace_in_file(path, replacements['rpl-private.h']), [])
+            with open(path) as f:
+                self.assertEqual(f.read().splitlines(), ["#define RPL_MAX_RANKINC 0", "#define INFINITE_RANK 256",
+                                                         "#define RPL_DEFAULT_LIFETIME_UNIT       0xffff"])
+        finally:
+            rmtree(tmp)
+
+    def test5_replacements_order(self):
+        """ > Does the first matching replacement apply, with the first group of a regex as the replaced part ? """
+        tmp = mkdtemp()
+        try:
+            path = join(tmp, 'rpl-timers.c')
+            with open(path, 'w') as f:
+                f.write("next_dis++; dis_output(NULL);\n#define DEBUG DEBUG_NONE\nrpl_recalculate_ranks();\n")
+            replacements = [["dis_output(NULL);", "/* DIS */"], ["next_dis++;", None],
+                            [r"^#define DEBUG DEBUG_([A-Z]+)$", "PRINT"], ["(never)", "matched"]]
+            self.assertEqual(replace_in_file(path, replacements), ["next_dis++;", "(never)"])
+            with open(path) as f:
+                self.assertEqual(f.read().splitlines(), ["next_dis++; /* DIS */", "#define DEBUG DEBUG_PRINT",
+                                                         "rpl_recalculate_ranks();"])
+        finally:
+            rmtree(tmp)
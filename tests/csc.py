@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from core.utils.csc import SimulationFile
+
+
+MOTE = """    <mote>
+      <interface_config>
+        org.contikios.cooja.interfaces.Position
+        <x>{x}</x>
+        <y>{y}</y>
+        <z>0.0</z>
+      </interface_config>
+      <interface_config>
+        org.contikios.cooja.mspmote.interfaces.MspMoteID
+        <id>{id}</id>
+      </interface_config>
+      <motetype_identifier>{type}</motetype_identifier>
+    </mote>
+"""
+PLUGIN = """  <plugin>
+    org.contikios.cooja.plugins.Visualizer
+    <plugin_config>
+      <mote>0</mote>
+      <mote>1</mote>
+    </plugin_config>
+    <z>2</z>
+  </plugin>
+"""
+CONTENT = "<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n<simconf>\n  <simulation>\n{}  </simulation>\n{}</simconf>\n" \
+    .format(MOTE.format(x=0.0, y=0.0, id=0, type='root') + MOTE.format(x=' 12.5', y='-7.25 ', id=1, type='sensor'),
+            PLUGIN)
+
+
+class TestSimulationFile(unittest.TestCase):
+    """ Model of a Cooja simulation file """
+
+    def setUp(self):
+        self.tmp = mkdtemp()
+        self.path = join(self.tmp, 'simulation.csc')
+        with open(self.path, 'w') as f:
+            f.write(CONTENT)
+
+    def tearDown(self):
+        rmtree(self.tmp)
+
+    def read(self):
+        with open(self.path) as f:
+            return f.read()
+
+    def test1_parsing(self):
+        """ > Are the motes parsed, except the blocks without an id ? """
+        simulation = SimulationFile(self.path)
+        self.assertEqual(list(simulation.motes.keys()), [0, 1])
+        self.assertEqual(simulation.motes[1]['motetype_identifier'], 'sensor')
+        self.assertEqual(simulation.positions, {0: (0., 0.), 1: (12.5, -7.25)})
+
+    def test2_round_trip(self):
+        """ > Is an unchanged simulation file written back byte for byte ? """
+        simulation = SimulationFile(self.path)
+        self.assertEqual(simulation.set_positions({0: (0.0, 0.0), 1: (12.5, -7.25)}), 0)
+        simulation.save()
+        self.assertEqual(self.read(), CONTENT)
+
+    def test3_set_positions(self):
+        """ > Are only the coordinates of the known motes changed ? """
+        simulation = SimulationFile(self.path)
+        self.assertEqual(simulation.set_positions({'1': (3.0, 4.0), 2: (5.0, 6.0)}), 2)
+        simulation.save()
+        self.assertEqual(SimulationFile(self.path).positions, {0: (0., 0.), 1: (3., 4.)})
+        expected = CONTENT.replace('<x> 12.5</x>', '<x>3.0</x>').replace('<y>-7.25 </y>', '<y>4.0</y>')
+        self.assertEqual(self.read(), expected)
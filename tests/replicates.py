@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from jinja2 import DictLoader, Environment
+from os import makedirs
+from os.path import islink, join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from core.utils.rpla import list_replicates, render_replicates
+
+
+NAMES = ["Makefile", "script.js", "simulation.csc"]
+
+
+class TestReplicates(unittest.TestCase):
+    """ Replicates of a simulation """
+
+    def setUp(self):
+        self.tmp = mkdtemp()
+        self.path = join(self.tmp, 'with-malicious')
+        makedirs(join(self.path, 'motes'))
+        self.env = Environment(loader=DictLoader({n: "{{ random_seed }}" for n in NAMES}))
+        self.templates = {n: {} for n in NAMES}
+
+    def tearDown(self):
+        rmtree(self.tmp)
+
+    def render(self, seeds):
+        render_replicates(self.path, self.env, self.templates, seeds)
+        return [r[len(self.path):] for r in list_replicates(self.path)]
+
+    def test1_rendered(self):
+        """ > Does each replicate get its own seed and the motes of the simulation ? """
+        self.assertEqual(self.render([1, 2, 3]), ['', '/replicates/2', '/replicates/3'])
+        self.assertTrue(islink(join(self.path, 'replicates', '2', 'motes')))
+        with open(join(self.path, 'replicates', '3', 'simulation.csc')) as f:
+            self.assertEqual(f.read(), '3')
+
+    def test2_rendered_again(self):
+        """ > Are the replicates rendered again, without the ones of a former larger repeat ? """
+        self.render([1, 2, 3])
+        self.assertEqual(self.render([4, 5, 6]), ['', '/replicates/2', '/replicates/3'])
+        self.assertEqual(self.render([7, 8]), ['', '/replicates/2'])
+        self.assertEqual(self.render([9]), [''])
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from os.path import join
+from shutil import rmtree
+from subprocess import Popen
+from tempfile import mkdtemp
+from time import sleep, time
+
+from core.utils.behaviors import MultiprocessedCommand
+from core.utils.scheduler import CampaignScheduler
+
+
+def span(duration=0.3, **kwargs):
+    start = time()
+    sleep(duration)
+    return 'SUCCESS', (start, time())
+
+
+def fail():
+    return 'FAIL', "Failed on purpose"
+
+
+def leave():
+    raise SystemExit(1)
+
+
+def expire():
+    return 'TIMEOUT', "Cooja exceeded its budget"
+
+
+def overlap(a, b):
+    return a[0] < b[1] and b[0] < a[1]
+
+
+class Console(object):
+    """ Stand-in for a console, only holding its list of tasks and its scheduler. """
+    def __init__(self, **kwargs):
+        self.tasklist = {}
+        self.scheduler = CampaignScheduler(**kwargs)
+
+
+class TestScheduler(unittest.TestCase):
+    """ Campaign scheduler """
+
+    def test1_dependencies_order(self):
+        """ > Is a task run only once its dependencies succeeded ? """
+        s = CampaignScheduler(jobs=4, limits={'make': 2}, memory=10 ** 6)
+        s.add('a', 'make', span)
+        s.add('b', 'make', span)
+        s.add('c', 'simulate', span, depends=['a', 'b'])
+        s.add('d', 'parse', span, depends=['c'])
+        results = s.run()
+        self.assertTrue(all(status == 'SUCCESS' for status, _ in results.values()))
+        self.assertTrue(overlap(results['a'][1], results['b'][1]))
+        self.assertGreaterEqual(results['c'][1][0], max(results['a'][1][1], results['b'][1][1]))
+        self.assertGreaterEqual(results['d'][1][0], results['c'][1][1])
+
+    def test2_stage_limits(self):
+        """ > Are the running tasks of a stage limited ? """
+        s = CampaignScheduler(jobs=4, limits={'make': 1, 'simulate': 4}, memory=10 ** 6)
+        for i in range(3):
+            s.add('make{}'.format(i), 'make', span)
+            s.add('simulate{}'.format(i), 'simulate', span)
+        results = s.run()
+        makes = [results['make{}'.format(i)][1] for i in range(3)]
+        self.assertFalse(any(overlap(a, b) for i, a in enumerate(makes) for b in makes[i + 1:]))
+        self.assertTrue(any(overlap(results['simulate0'][1], results['simulate{}'.format(i)][1])
+                            for i in range(1, 3)))
+
+    def test3_memory_budget(self):
+        """ > Are the running tasks kept within the memory budget ? """
+        s = CampaignScheduler(jobs=4, limits={'simulate': 4}, memory=100)
+        s.add('large1', 'simulate', span, memory=60)
+        s.add('large2', 'simulate', span, memory=60)
+        s.add('huge', 'simulate', span, memory=200)
+        results = s.run()
+        self.assertEqual(results['huge'][0], 'SUCCESS')
+        self.assertFalse(overlap(results['large1'][1], results['large2'][1]))
+        self.assertFalse(any(overlap(results['huge'][1], results[n][1]) for n in ['large1', 'large2']))
+
+    def test4_failing_tasks(self):
+        """ > Does a failing task, even outside of its function, cancel its dependents without blocking ? """
+        s = CampaignScheduler(jobs=2)
+        s.add('failed', 'make', fail)
+        s.add('exited', 'make', leave)
+        s.add('unpicklable', 'make', span, args=(lambda: None, ))
+        for name in ['failed', 'exited', 'unpicklable']:
+            s.add(name + '-child', 'simulate', span, depends=[name])
+        s.add('grandchild', 'parse', span, depends=['failed-child'])
+        s.add('independent', 'make', span, args=(0, ))
+        results = s.run()
+        for name in ['failed', 'exited', 'unpicklable']:
+            self.assertEqual(results[name][0], 'FAIL')
+            self.assertEqual(results[name + '-child'][0], 'CANCELLED')
+        self.assertEqual(results['grandchild'][0], 'CANCELLED')
+        self.assertEqual(results['independent'][0], 'SUCCESS')
+
+    def test5_console_tasks(self):
+        """ > Are the tasks followed in the list of tasks of the console, timeouts included ? """
+        console, s = Console(), CampaignScheduler(jobs=2)
+        s.add('exp', 'make', span)
+        s.add('exp[simulate]', 'simulate', expire, depends=['exp'])
+        s.add('exp[parse]', 'parse', span, depends=['exp[simulate]'])
+        s.start(console).join()
+        tasks = {str(t): info for t, info in console.tasklist.items()}
+        self.assertEqual(sorted(tasks.keys()), ['exp[make]', 'exp[parse]', 'exp[simulate]'])
+        self.assertEqual([tasks[n]['status'] for n in ['exp[make]', 'exp[simulate]', 'exp[parse]']],
+                         ['SUCCESS', 'TIMEOUT', 'CANCELLED'])
+        self.assertTrue(all(info['expires'] is not None for info in tasks.values()))
+
+    def test6_console_kill(self):
+        """ > Does killing a task from the console kill the processes of its PID files ? """
+        tmp, process = mkdtemp(), Popen(['sleep', '30'])
+        try:
+            with open(join(tmp, '.run'), 'w') as f:
+                f.write(str(process.pid))
+            console, s = Console(), CampaignScheduler()
+            s.add('exp[simulate]', 'simulate', span, (1., ), pids=[join(tmp, '.run')])
+            thread = s.start(console)
+            command = list(console.tasklist.keys())[0]
+            while console.tasklist[command]['status'] != 'PENDING':
+                sleep(.05)
+            command.kill()
+            self.assertIsNotNone(process.wait())
+            thread.join()
+            self.assertEqual(console.tasklist[command]['status'], 'KILLED')
+        finally:
+            if process.poll() is None:
+                process.kill()
+            rmtree(tmp)
+
+    def test7_shared_scheduler(self):
+        """ > Are the tasks added while the graph is run picked up by the same thread ? """
+        console, s = Console(), CampaignScheduler(jobs=2)
+        s.add('first', 'simulate', span, (.5, ))
+        thread = s.start(console)
+        with self.assertRaises(ValueError):
+            s.add('first', 'simulate', span)
+        s.add('second', 'simulate', span, depends=['first'])
+        self.assertIs(s.start(console), thread)
+        thread.join()
+        self.assertEqual([s.tasks[n]['status'] for n in ['first', 'second']], ['SUCCESS', 'SUCCESS'])
+        self.assertEqual(len(console.tasklist), 2)
+        # a task that is over can be scheduled again, by a new thread
+        s.add('first', 'simulate', span)
+        again = s.start(console)
+        self.assertIsNot(again, thread)
+        again.join()
+        self.assertEqual(s.tasks['first']['status'], 'SUCCESS')
+
+    def test8_console_commands(self):
+        """ > Are the multi-processed commands of the console admitted by its scheduler ? """
+        console = Console(jobs=4, limits={'span': 4}, memory=100)
+        commands = [MultiprocessedCommand(console, span, name, None) for name in ['exp1', 'exp2']]
+        for command in commands:
+            command.run(.3)
+        self.assertEqual(sorted(console.scheduler.tasks.keys()), ['exp1[span]', 'exp2[span]'])
+        console.scheduler.thread.join()
+        self.assertEqual([console.tasklist[c]['status'] for c in commands], ['SUCCESS', 'SUCCESS'])
+        self.assertTrue(all(console.tasklist[c]['expires'] is not None for c in commands))
+
+    def test9_soft_dependencies(self):
+        """ > Is a task only ordered after its soft dependencies, even failed ones ? """
+        s = CampaignScheduler(jobs=4, memory=10 ** 6)
+        s.add('first', 'make', span)
+        s.add('failed', 'make', fail)
+        s.add('second', 'make', span, after=['first', 'failed'])
+        results = s.run()
+        self.assertEqual(results['failed'][0], 'FAIL')
+        self.assertEqual(results['second'][0], 'SUCCESS')
+        self.assertGreaterEqual(results['second'][1][0], results['first'][1][1])
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from os import access, makedirs, stat, symlink, W_OK
+from os.path import islink, join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from core.common.helpers import link_folder
+
+
+class TestContikiSnapshots(unittest.TestCase):
+    """ Contiki snapshots deployed as hard-link overlays """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = mkdtemp()
+        cls.src, cls.dst = join(cls.tmp, 'contiki'), join(cls.tmp, 'overlay')
+        for folder in ['core/net/rpl', 'core/sys']:
+            makedirs(join(cls.src, folder))
+        for fn in ['core/net/rpl/rpl.c', 'core/sys/process.c']:
+            with open(join(cls.src, fn), 'w') as f:
+                f.write(fn)
+        symlink('process.c', join(cls.src, 'core', 'sys', 'alias.c'))
+        link_folder(cls.src, cls.dst, copies=['core/net/rpl'])
+
+    @classmethod
+    def tearDownClass(cls):
+        rmtree(cls.tmp)
+
+    def test1_files_linked(self):
+        """ > Are the files outside the copied folders hard-linked to the snapshot ? """
+        fn = join('core', 'sys', 'process.c')
+        self.assertEqual(stat(join(self.src, fn)).st_ino, stat(join(self.dst, fn)).st_ino)
+
+    def test2_folders_copied(self):
+        """ > Are the files of the copied folders independent and writable ? """
+        fn = join('core', 'net', 'rpl', 'rpl.c')
+        self.assertNotEqual(stat(join(self.src, fn)).st_ino, stat(join(self.dst, fn)).st_ino)
+        self.assertTrue(access(join(self.dst, fn), W_OK))
+        with open(join(self.dst, fn), 'w') as f:
+            f.write('altered')
+        with open(join(self.src, fn)) as f:
+            self.assertEqual(f.read(), 'core/net/rpl/rpl.c')
+
+    def test3_symlinks_preserved(self):
+        """ > Are the symbolic links kept as such ? """
+        self.assertTrue(islink(join(self.dst, 'core', 'sys', 'alias.c')))
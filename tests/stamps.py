@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from os import makedirs
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from core.utils.stamps import get_stamp, get_stamp_key, remove_stamps, set_stamp
+
+
+class TestStamps(unittest.TestCase):
+    """ Stamps of the stages of a run """
+
+    def setUp(self):
+        self.path = mkdtemp()
+        makedirs(join(self.path, 'data'))
+        for fn in ['simulation.csc', join('data', 'serial.log')]:
+            self.write(fn, fn)
+
+    def tearDown(self):
+        rmtree(self.path)
+
+    def write(self, fn, content):
+        with open(join(self.path, fn), 'w') as f:
+            f.write(content)
+
+    def keys(self):
+        """ Emulate the simulate and parse stages of a simulation, the latter depending on the former. """
+        simulate = get_stamp_key([join(self.path, 'simulation.csc')])
+        return simulate, get_stamp_key([join(self.path, 'data')], simulate)
+
+    def test1_stamp_lifecycle(self):
+        """ > Is a stamp set, read and removed ? """
+        self.assertIsNone(get_stamp(self.path, 'simulate'))
+        set_stamp(self.path, 'simulate', 'key')
+        self.assertEqual(get_stamp(self.path, 'simulate'), 'key')
+        remove_stamps(self.path, 'simulate', 'parse')
+        self.assertIsNone(get_stamp(self.path, 'simulate'))
+
+    def test2_key_stable(self):
+        """ > Is the key of unchanged inputs stable ? """
+        self.assertEqual(self.keys(), self.keys())
+
+    def test3_key_content(self):
+        """ > Does the key change with the content of the files, recursively, and with missing files ? """
+        simulate, parse = self.keys()
+        self.write(join('data', 'serial.log'), 'altered')
+        self.assertEqual(self.keys()[0], simulate)
+        self.assertNotEqual(self.keys()[1], parse)
+        self.assertNotEqual(get_stamp_key([join(self.path, 'missing')]), get_stamp_key([]))
+
+    def test4_resume(self):
+        """ > Does a run resume from the first stale stage ? """
+        for stage, key in zip(['simulate', 'parse'], self.keys()):
+            set_stamp(self.path, stage, key)
+        # nothing changed: both stages are up to date
+        self.assertEqual([get_stamp(self.path, s) for s in ['simulate', 'parse']], list(self.keys()))
+        # the simulation changed: both stages are stale, as the key of parse depends on the one of simulate
+        self.write('simulation.csc', 'altered')
+        simulate, parse = self.keys()
+        self.assertNotEqual(get_stamp(self.path, 'simulate'), simulate)
+        self.assertNotEqual(get_stamp(self.path, 'parse'), parse)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from numpy import arange, array, zeros
+from numpy.testing import assert_array_equal
+from os import listdir
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from core.utils.store import read_results, write_results
+
+
+class TestColumnarStore(unittest.TestCase):
+    """ Columnar store of the results """
+
+    def setUp(self):
+        self.path = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.path)
+
+    def test1_round_trip(self):
+        """ > Is a table written from a dictionary read back, column by column ? """
+        columns = {'id': arange(5), 'value': arange(5) / 2.}
+        write_results(self.path, 'table', columns)
+        self.assertEqual(sorted(listdir(join(self.path, 'results', 'table'))), ['id.npy', 'value.npy'])
+        table = read_results(self.path, 'table')
+        self.assertEqual(sorted(table.keys()), ['id', 'value'])
+        for field, values in columns.items():
+            assert_array_equal(table[field], values)
+        self.assertEqual(list(read_results(self.path, 'table', fields=['value']).keys()), ['value'])
+
+    def test2_structured_array(self):
+        """ > Is a table written from a structured array and loaded in memory if required ? """
+        columns = zeros(3, dtype=[('id', int), ('time', float)])
+        columns['id'], columns['time'] = [1, 2, 3], [.5, 1., 1.5]
+        write_results(self.path, 'table', columns)
+        table = read_results(self.path, 'table', mmap=False)
+        assert_array_equal(table['id'], [1, 2, 3])
+        assert_array_equal(table['time'], [.5, 1., 1.5])
+
+    def test3_overwrite(self):
+        """ > Is a table replaced as a whole, without leaving temporary folders ? """
+        write_results(self.path, 'table', {'old': arange(3)})
+        write_results(self.path, 'table', {'new': array([], dtype=float)})
+        self.assertEqual(listdir(join(self.path, 'results')), ['table'])
+        table = read_results(self.path, 'table')
+        self.assertEqual(list(table.keys()), ['new'])
+        self.assertEqual(len(table['new']), 0)
+
+    def test4_missing_table(self):
+        """ > Is a missing table read as None ? """
+        self.assertIsNone(read_results(self.path, 'missing'))
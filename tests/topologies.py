@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import unittest
+from numpy import array, inf
+
+from core.common.wsngenerator import generate_motes, get_unreachable_motes, TOPOLOGIES
+from core.conf.constants import DEFAULTS
+
+
+MIN_RANGE, TX_RANGE = 20., 50.
+
+
+def min_distance(positions):
+    positions, d = array(positions), inf
+    for i in range(len(positions) - 1):
+        d = min(d, (((positions[i + 1:] - positions[i]) ** 2).sum(axis=1) ** .5).min())
+    return d
+
+
+class TestTopologies(unittest.TestCase):
+    """ Topology generators """
+
+    def test1_constraints(self):
+        """ > Are the motes kept apart, in the area and connected ? """
+        for name, generator in sorted(TOPOLOGIES.items()):
+            for n, max_range in [(10, 100.), (500, 1000.)]:
+                positions = generator(n, MIN_RANGE, max_range, TX_RANGE)
+                self.assertEqual(len(positions), n, name)
+                positions = [(0., 0.)] + positions.tolist()
+                self.assertGreaterEqual(min_distance(positions), MIN_RANGE, name)
+                self.assertLessEqual(abs(array(positions)).max(), max_range, name)
+                self.assertEqual(get_unreachable_motes(positions, TX_RANGE), [], name)
+
+    def test2_no_room(self):
+        """ > Is a WSN whose motes do not fit in the area rejected ? """
+        for name in TOPOLOGIES.keys():
+            with self.assertRaises(ValueError):
+                generate_motes(defaults=DEFAULTS, n=500, min_range=MIN_RANGE, max_range=100., tx_range=TX_RANGE,
+                               topology=name)
+
+    def test3_disconnected(self):
+        """ > Is a random WSN that cannot be connected rejected ? """
+        with self.assertRaises(ValueError):
+            generate_motes(defaults=DEFAULTS, n=10, min_range=MIN_RANGE, max_range=1000., tx_range=MIN_RANGE / 2,
+                           topology='random')
+
+    def test4_motes(self):
+        """ > Does the WSN hold the root, the legitimate motes and the malicious mote, whatever the topology ? """
+        for name in TOPOLOGIES.keys():
+            motes = generate_motes(defaults=DEFAULTS, topology=name)
+            self.assertEqual([m['id'] for m in motes], list(range(DEFAULTS["number-motes"] + 2)), name)
+            self.assertEqual([m['type'] for m in motes if m['type'] != 'sensor'], ['root', 'malicious'], name)